@@ -0,0 +1,91 @@
+"""
+Admission control and per-route query budgets
+
+Endpoints are split into two classes:
+- interactive: reviewer paths (review queue, submit, conversation detail, users, settings)
+- analytics:   dashboard / leaderboard / comparison / large list queries
+
+Each class sets a statement_timeout that the data layer applies on every
+connection checkout. Analytics requests are additionally capped per process
+with a short wait queue; beyond it they get 503 + Retry-After. The cap is kept
+below the connection pool size so interactive requests always find a connection.
+"""
+import asyncio
+import logging
+from fastapi import Depends, HTTPException
+from config import get_settings
+from database import pool_max_size, statement_timeout_ms
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class AdmissionLimiter:
+    """Concurrency cap with a bounded, time-limited wait queue"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int,
+                 queue_timeout_seconds: float, retry_after_seconds: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+
+    def _reject(self, reason: str):
+        logger.warning(f"Admission rejected ({self.name}): {reason}")
+        raise HTTPException(
+            status_code=503,
+            detail="سرور در حال حاضر مشغول است، لطفا کمی بعد دوباره تلاش کنید",
+            headers={"Retry-After": str(self.retry_after_seconds)}
+        )
+
+    async def acquire(self):
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._reject("queue full")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._reject("queue wait timed out")
+        finally:
+            self._waiting -= 1
+
+    def release(self):
+        self._semaphore.release()
+
+    @property
+    def stats(self) -> dict:
+        in_flight = self.max_concurrent - self._semaphore._value
+        return {"in_flight": in_flight, "waiting": self._waiting, "max_concurrent": self.max_concurrent}
+
+
+analytics_limiter = AdmissionLimiter(
+    "analytics",
+    # Pools shrink with the worker count; always leave a connection for interactive requests
+    max_concurrent=max(1, min(settings.ANALYTICS_MAX_CONCURRENT, pool_max_size() - 1)),
+    max_queue=settings.ANALYTICS_MAX_QUEUE,
+    queue_timeout_seconds=settings.ANALYTICS_QUEUE_TIMEOUT_SECONDS,
+    retry_after_seconds=settings.ANALYTICS_RETRY_AFTER_SECONDS
+)
+
+
+async def _interactive_request():
+    statement_timeout_ms.set(settings.INTERACTIVE_STATEMENT_TIMEOUT_MS)
+
+
+async def _analytics_request():
+    await analytics_limiter.acquire()
+    statement_timeout_ms.set(settings.ANALYTICS_STATEMENT_TIMEOUT_MS)
+    try:
+        yield
+    finally:
+        analytics_limiter.release()
+
+
+# Router/route dependencies
+interactive = Depends(_interactive_request)
+analytics = Depends(_analytics_request)
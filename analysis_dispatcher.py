@@ -0,0 +1,272 @@
+"""
+Batch analysis dispatcher for the n8n analysis webhook
+
+POST /conversations/analyze/batch only enqueues rows in analysis_jobs (one per
+unique_id, so re-submitting never double-analyzes) and returns immediately.
+This worker drains the table at a controlled rate:
+- jobs are claimed with FOR UPDATE SKIP LOCKED and a lease, so several pods can
+  run the worker and a crashed pod's jobs are picked up after the lease expires
+- one shared httpx.AsyncClient reuses connections to the webhook
+- concurrency is bounded and requests pass through a token-bucket rate limiter
+- transient failures (timeouts, 429, 5xx) retry with exponential backoff + jitter
+"""
+import asyncio
+import logging
+import random
+from typing import List, Optional
+from config import get_settings
+from database import execute_query
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def enqueue_batch(batch_id: str, unique_ids: List[str]) -> List[dict]:
+    """
+    Insert jobs for a batch; returns one row per unique id with its job
+
+    queued is true for the jobs (re)queued under batch_id. Skipped ids carry the
+    job and batch they already belong to (job_id is NULL and status 'analyzed'
+    for calls analyzed without a job), so callers can follow them there.
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement
+    unique_ids = list(dict.fromkeys(uid.strip() for uid in unique_ids if uid and uid.strip()))
+    if not unique_ids:
+        return []
+
+    # The outer SELECT sees analysis_jobs as it was before the INSERT, which is
+    # exactly the existing job of every skipped id
+    query = """
+        WITH queued AS (
+            INSERT INTO analysis_jobs (batch_id, unique_id)
+            SELECT %s, u.unique_id
+            FROM unnest(%s::text[]) AS u(unique_id)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM conversations_log cl
+                WHERE cl.unique_id = u.unique_id AND cl.is_analyzed = true
+            )
+            ON CONFLICT (unique_id) DO UPDATE
+            SET batch_id = EXCLUDED.batch_id,
+                status = 'queued',
+                attempts = 0,
+                last_error = NULL,
+                last_status_code = NULL,
+                next_attempt_at = NOW(),
+                locked_until = NULL,
+                completed_at = NULL,
+                updated_at = NOW()
+            WHERE analysis_jobs.status = 'failed'
+            RETURNING id, batch_id, unique_id, status
+        )
+        SELECT
+            u.unique_id,
+            coalesce(q.id, j.id) AS job_id,
+            coalesce(q.batch_id, j.batch_id) AS batch_id,
+            coalesce(q.status, j.status, 'analyzed') AS status,
+            q.id IS NOT NULL AS queued
+        FROM unnest(%s::text[]) WITH ORDINALITY AS u(unique_id, position)
+        LEFT JOIN queued q ON q.unique_id = u.unique_id
+        LEFT JOIN analysis_jobs j ON q.id IS NULL AND j.unique_id = u.unique_id
+        ORDER BY u.position
+    """
+    return execute_query(query, (batch_id, unique_ids, unique_ids), fetch_all=True) or []
+
+
+def _claim_jobs(limit: int) -> List[dict]:
+    query = """
+        UPDATE analysis_jobs
+        SET status = 'running',
+            attempts = attempts + 1,
+            locked_until = NOW() + make_interval(secs => %s),
+            updated_at = NOW()
+        WHERE id IN (
+            SELECT id
+            FROM analysis_jobs
+            WHERE (status = 'queued' AND next_attempt_at <= NOW())
+                OR (status = 'running' AND locked_until < NOW())
+            ORDER BY next_attempt_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, unique_id, attempts
+    """
+    return execute_query(query, (settings.ANALYSIS_JOB_LEASE_SECONDS, limit), fetch_all=True) or []
+
+
+def _mark_succeeded(job_id: str, status_code: int):
+    query = """
+        UPDATE analysis_jobs
+        SET status = 'succeeded', last_status_code = %s, last_error = NULL,
+            locked_until = NULL, completed_at = NOW(), updated_at = NOW()
+        WHERE id = %s
+    """
+    execute_query(query, (status_code, job_id), fetch_all=False)
+
+
+def _mark_retry(job_id: str, delay_seconds: float, status_code: Optional[int], error: str):
+    query = """
+        UPDATE analysis_jobs
+        SET status = 'queued', last_status_code = %s, last_error = %s, locked_until = NULL,
+            next_attempt_at = NOW() + make_interval(secs => %s), updated_at = NOW()
+        WHERE id = %s
+    """
+    execute_query(query, (status_code, error[:500], delay_seconds, job_id), fetch_all=False)
+
+
+def _mark_failed(job_id: str, status_code: Optional[int], error: str):
+    query = """
+        UPDATE analysis_jobs
+        SET status = 'failed', last_status_code = %s, last_error = %s,
+            locked_until = NULL, completed_at = NOW(), updated_at = NOW()
+        WHERE id = %s
+    """
+    execute_query(query, (status_code, error[:500], job_id), fetch_all=False)
+
+
+def _backoff_seconds(attempts: int) -> float:
+    delay = settings.ANALYSIS_DISPATCH_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0))
+    delay = min(delay, settings.ANALYSIS_DISPATCH_BACKOFF_MAX_SECONDS)
+    # Full jitter keeps retries from a large batch from arriving in waves
+    return random.uniform(delay / 2, delay)
+
+
+class TokenBucket:
+    """Async token bucket limiting request starts per second"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = None
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self._updated is not None:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AnalysisDispatcher:
+    """Polls analysis_jobs and calls the webhook with bounded concurrency"""
+
+    def __init__(self):
+        # Every worker process runs a dispatcher; the configured limits are per pod
+        workers = max(settings.WEB_WORKERS, 1)
+        self.concurrency = max(1, -(-settings.ANALYSIS_DISPATCH_CONCURRENCY // workers))
+        self.rate = settings.ANALYSIS_DISPATCH_RATE_PER_SECOND / workers
+        self._bucket = TokenBucket(self.rate, self.concurrency)
+        self._client = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._in_flight = set()
+
+    async def start(self):
+        # Imported here so the API process does not pay for httpx unless the dispatcher runs
+        import httpx
+
+        self._stopping = asyncio.Event()
+        self._client = httpx.AsyncClient(
+            timeout=settings.ANALYSIS_WEBHOOK_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        )
+        self._task = asyncio.create_task(self._run(), name="analysis-dispatcher")
+        logger.info(
+            f"Analysis dispatcher started (concurrency={self.concurrency}, "
+            f"rate={self.rate:g}/s)"
+        )
+
+    async def stop(self, timeout: float = 10.0):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        if self._in_flight:
+            # Unfinished jobs keep their lease and are retried after it expires
+            await asyncio.wait(self._in_flight, timeout=timeout)
+        await self._client.aclose()
+        self._task = None
+        logger.info("Analysis dispatcher stopped")
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._in_flight)
+            if free <= 0:
+                await asyncio.wait(self._in_flight, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            try:
+                jobs = await asyncio.to_thread(_claim_jobs, free)
+            except Exception as e:
+                logger.error(f"Failed to claim analysis jobs: {e}")
+                jobs = []
+
+            for job in jobs:
+                task = asyncio.create_task(self._process(job))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+            if not jobs:
+                await self._sleep(settings.ANALYSIS_DISPATCH_POLL_SECONDS)
+
+    async def _process(self, job: dict):
+        import httpx
+
+        job_id = job['id']
+        status_code = None
+        try:
+            await self._bucket.acquire()
+            response = await self._client.request(
+                settings.ANALYSIS_WEBHOOK_METHOD,
+                settings.ANALYSIS_WEBHOOK_URL,
+                params={"unique_id": job['unique_id']}
+            )
+            status_code = response.status_code
+
+            if response.is_success:
+                try:
+                    await asyncio.to_thread(_mark_succeeded, job_id, status_code)
+                except Exception as e:
+                    # Lease expiry would re-dispatch it; log loudly so it can be reconciled
+                    logger.error(f"Analysis job {job_id} succeeded but could not be recorded: {e}")
+                return
+
+            error = f"HTTP {status_code}: {response.text[:200]}"
+            retryable = status_code in RETRYABLE_STATUS_CODES
+        except httpx.HTTPError as e:
+            error = f"{type(e).__name__}: {e}"
+            retryable = True
+        except Exception as e:
+            # Anything else is a bug or a malformed response: record it instead of
+            # leaving the job running until its lease expires
+            logger.exception(f"Analysis job {job['unique_id']} failed unexpectedly")
+            error = f"{type(e).__name__}: {e}"
+            retryable = False
+
+        try:
+            if retryable and job['attempts'] < settings.ANALYSIS_DISPATCH_MAX_ATTEMPTS:
+                delay = _backoff_seconds(job['attempts'])
+                logger.warning(f"Analysis job {job['unique_id']} attempt {job['attempts']} failed, retry in {delay:.0f}s: {error}")
+                await asyncio.to_thread(_mark_retry, job_id, delay, status_code, error)
+            else:
+                logger.error(f"Analysis job {job['unique_id']} failed permanently: {error}")
+                await asyncio.to_thread(_mark_failed, job_id, status_code, error)
+        except Exception as e:
+            logger.error(f"Failed to record result for analysis job {job_id}: {e}")
+
+
+dispatcher = AnalysisDispatcher()
@@ -0,0 +1,3 @@
+"""
+Windowed analytics served from the daily rollup tables
+"""
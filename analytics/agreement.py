@@ -0,0 +1,162 @@
+"""
+AI vs human agreement over reviewed conversations
+
+All reviewed pairs for the filter are fetched in one query straight into column
+arrays (database.fetch_columns, NaN for missing scores). Per-group statistics
+are computed with bincount / add.at over a group index, so the cost is a handful
+of vector passes regardless of how many agents or reviewers are in the window.
+
+Per metric: count, MAE, bias (human - AI), Pearson correlation, Cohen's kappa
+and quadratic-weighted kappa on binned scores, and the AI x human confusion
+matrix (rows = AI bin, columns = human bin).
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from analytics.windows import Window
+from database import fetch_columns
+
+CRITERIA = ['opening', 'listening', 'empathy', 'response_process', 'system_updation', 'closing']
+
+# metric -> (AI column, human column, bin width used for kappa / confusion matrix)
+METRICS = {
+    **{name: (f"ca.{name}_score", f"crh.{name}_score_override", 1.0) for name in CRITERIA},
+    'final': ("ca.final_percentage_score", "crh.final_percentage_score_human", 10.0),
+}
+
+GROUP_COLUMNS = {
+    'agent': "cl.agent_sender",
+    'reviewer': "crh.reviewer_id",
+}
+
+
+def fetch_pairs(
+    window: Optional[Window],
+    agent: Optional[str] = None,
+    reviewer: Optional[str] = None,
+    group_by: Optional[str] = None
+) -> Dict[str, np.ndarray]:
+    """Columns {group, <metric>_ai, <metric>_human} for every reviewed analysis in the filter"""
+    where_clauses = []
+    params = []
+
+    if window is not None:
+        window_sql, window_params = window.timestamp_filter("ca.created_at")
+        where_clauses.append(window_sql)
+        params.extend(window_params)
+    if agent:
+        where_clauses.append("cl.agent_sender = %s")
+        params.append(agent)
+    if reviewer:
+        where_clauses.append("crh.reviewer_id = %s")
+        params.append(reviewer)
+
+    where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    group_sql = f"{GROUP_COLUMNS[group_by]}::text" if group_by else "NULL::text"
+    score_sql = ",\n                ".join(
+        f"{ai}::float8 AS {name}_ai, {human}::float8 AS {name}_human"
+        for name, (ai, human, _) in METRICS.items()
+    )
+
+    query = f"""
+        SELECT
+            {group_sql} AS grp,
+            {score_sql}
+        FROM conversation_analysis ca
+        INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+        INNER JOIN conversation_review_human crh ON crh.analysis_id = ca.id
+        {where_sql}
+    """
+    columns = fetch_columns(query, tuple(params) if params else None, read_only=True)
+    return columns
+
+
+def _kappas(matrices: np.ndarray) -> tuple:
+    """Cohen's kappa and quadratic-weighted kappa for a stack of K x K confusion matrices"""
+    n = matrices.sum(axis=(1, 2))
+    k = matrices.shape[1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = matrices / n[:, None, None]
+        expected = observed.sum(axis=2)[:, :, None] * observed.sum(axis=1)[:, None, :]
+
+        p_o = np.trace(observed, axis1=1, axis2=2)
+        p_e = np.trace(expected, axis1=1, axis2=2)
+        kappa = (p_o - p_e) / (1 - p_e)
+
+        idx = np.arange(k)
+        weights = (idx[:, None] - idx[None, :]) ** 2 / max(k - 1, 1) ** 2
+        weighted = 1 - (weights * observed).sum(axis=(1, 2)) / (weights * expected).sum(axis=(1, 2))
+    return kappa, weighted
+
+
+def _metric_stats(ai: np.ndarray, human: np.ndarray, groups: np.ndarray, group_count: int,
+                  bin_width: float, include_matrix: bool) -> List[dict]:
+    valid = ~np.isnan(ai) & ~np.isnan(human)
+    x, y, g = ai[valid], human[valid], groups[valid]
+
+    def per_group(weights=None):
+        return np.bincount(g, weights=weights, minlength=group_count)
+
+    n = per_group()
+    diff = y - x
+    sx, sy = per_group(x), per_group(y)
+    sxx, syy, sxy = per_group(x * x), per_group(y * y), per_group(x * y)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mae = per_group(np.abs(diff)) / n
+        bias = per_group(diff) / n
+        correlation = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+
+    ai_bins = np.floor(np.clip(x, 0, None) / bin_width).astype(np.int64)
+    human_bins = np.floor(np.clip(y, 0, None) / bin_width).astype(np.int64)
+    k = int(max(ai_bins.max(initial=0), human_bins.max(initial=0))) + 1
+    matrices = np.zeros((group_count, k, k), dtype=np.int64)
+    np.add.at(matrices, (g, ai_bins, human_bins), 1)
+    kappa, weighted_kappa = _kappas(matrices.astype(float))
+
+    def clean(value):
+        return None if not np.isfinite(value) else round(float(value), 4)
+
+    stats = []
+    for i in range(group_count):
+        entry = {
+            "count": int(n[i]),
+            "mae": clean(mae[i]),
+            "bias": clean(bias[i]),
+            "correlation": clean(correlation[i]),
+            "kappa": clean(kappa[i]),
+            "weightedKappa": clean(weighted_kappa[i]),
+        }
+        if include_matrix:
+            entry["bins"] = [b * bin_width for b in range(k)]
+            entry["confusionMatrix"] = matrices[i].tolist()
+        stats.append(entry)
+    return stats
+
+
+def compute_agreement(columns: Dict[str, np.ndarray], grouped: bool = False, include_matrix: bool = True) -> List[dict]:
+    """
+    One entry per group, or a single entry with group None when not grouped
+
+    Rows without a group key (NULL agent or reviewer) count in the ungrouped
+    result only; astype(str) would otherwise report them as a group named "None".
+    """
+    if grouped:
+        present = np.fromiter((key is not None for key in columns['grp']), dtype=bool, count=len(columns['grp']))
+        if not present.all():
+            columns = {name: values[present] for name, values in columns.items()}
+        keys, groups = np.unique(columns['grp'].astype(str), return_inverse=True)
+        keys = [str(key) for key in keys]
+    else:
+        keys, groups = [None], np.zeros(len(columns['grp']), dtype=np.int64)
+    group_count = len(keys)
+
+    counts = np.bincount(groups, minlength=group_count)
+    results = [{"group": key, "count": int(count), "metrics": {}} for key, count in zip(keys, counts)]
+    for name, (_, _, bin_width) in METRICS.items():
+        stats = _metric_stats(columns[f"{name}_ai"], columns[f"{name}_human"], groups, group_count,
+                              bin_width, include_matrix)
+        for result, entry in zip(results, stats):
+            result["metrics"][name] = entry
+    return results
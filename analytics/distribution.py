@@ -0,0 +1,94 @@
+"""
+Score distributions from agent_daily_score_hist
+
+Scores are kept as 1-point histograms (bucket b counts scores in [b, b + 1),
+bucket 100 holds exactly 100) per agent, day and source. Any window merges by
+summing bucket counts, so percentiles cost a GROUP BY over at most
+agents x days x 202 small rows; values are interpolated inside the bucket and
+are accurate to one score point.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from analytics.windows import Window
+from database import execute_query
+
+BUCKETS = 101
+SOURCES = ('ai', 'human')
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+
+def fetch_histograms(
+    window: Optional[Window],
+    agent: Optional[str] = None,
+    by_agent: bool = False
+) -> Dict[Optional[str], Dict[str, List[int]]]:
+    """{agent or None: {source: [count per bucket]}} for the window"""
+    where_clauses = []
+    params = []
+
+    if window is not None:
+        day_sql, day_params = window.day_filter("h.day")
+        where_clauses.append(day_sql)
+        params.extend(day_params)
+    if agent:
+        where_clauses.append("h.agent_sender = %s")
+        params.append(agent)
+
+    where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    agent_sql = "h.agent_sender" if by_agent else "NULL::text"
+
+    query = f"""
+        SELECT {agent_sql} AS agent_sender, h.source, h.bucket, SUM(h.count) AS count
+        FROM agent_daily_score_hist h
+        {where_sql}
+        GROUP BY 1, h.source, h.bucket
+    """
+    rows = execute_query(query, tuple(params) if params else None, fetch_all=True, read_only=True,
+                         row_type='tuple') or []
+
+    histograms = {}
+    for agent_sender, source, bucket, count in rows:
+        per_agent = histograms.setdefault(agent_sender, {source: [0] * BUCKETS for source in SOURCES})
+        per_agent[source][int(bucket)] = int(count)
+    return histograms
+
+
+def percentile(histogram: Sequence[int], pct: float) -> Optional[float]:
+    """Linear interpolation inside the bucket containing the pct-th value"""
+    total = sum(histogram)
+    if total == 0:
+        return None
+
+    target = pct / 100 * total
+    cumulative = 0
+    for bucket, count in enumerate(histogram):
+        if count and cumulative + count >= target:
+            return min(100.0, bucket + (target - cumulative) / count)
+        cumulative += count
+    return 100.0
+
+
+def rebucket(histogram: Sequence[int], bucket_size: int) -> List[dict]:
+    """Coarser buckets for display; the last bucket is closed at 100"""
+    result = []
+    for start in range(0, 100, bucket_size):
+        end = min(start + bucket_size, 100)
+        stop = end + 1 if end == 100 else end
+        result.append({"from": start, "to": end, "count": sum(histogram[start:stop])})
+    return result
+
+
+def summarize(
+    histogram: Sequence[int],
+    bucket_size: int = 10,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> dict:
+    total = sum(histogram)
+    # Bucket midpoints; bucket 100 is the exact score 100
+    weighted = sum(count * (bucket + 0.5 if bucket < 100 else 100) for bucket, count in enumerate(histogram))
+    return {
+        "count": total,
+        "mean": weighted / total if total else None,
+        "percentiles": {f"p{p:g}": percentile(histogram, p) for p in percentiles},
+        "histogram": rebucket(histogram, bucket_size),
+    }
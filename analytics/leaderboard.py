@@ -0,0 +1,147 @@
+"""
+Agent leaderboard over agent_daily_stats
+
+A window is answered by summing the per-day partials of each agent, so the cost
+depends on agents x days in the window rather than on call volume. The previous
+period of equal length is summed in the same statement (FILTER aggregates) and
+ranked the same way to produce rank deltas.
+"""
+from typing import Dict, List, Optional
+
+from analytics.windows import Window
+from database import execute_query
+
+# (response field, rollup column prefix) for averaged metrics
+AVERAGE_METRICS = [
+    ("averageScore", "score"),
+    ("averageOpeningScore", "opening"),
+    ("averageListeningScore", "listening"),
+    ("averageEmpathyScore", "empathy"),
+    ("averageResponseScore", "response_process"),
+    ("averageClosingScore", "closing"),
+    ("averageSilencePercent", "silence"),
+]
+
+SORTABLE_METRICS = (
+    ["totalConversations"]
+    + [field for field, _ in AVERAGE_METRICS]
+    + ["sentimentImprovementPercent"]
+)
+
+_SUMMED_COLUMNS = (
+    ["conversations", "start_negative", "end_positive"]
+    + [f"{prefix}_{part}" for _, prefix in AVERAGE_METRICS for part in ("sum", "count")]
+)
+
+
+def _aggregates(condition: Optional[str], alias_prefix: str) -> str:
+    filter_sql = f" FILTER (WHERE {condition})" if condition else ""
+    return ",\n                ".join(
+        f"SUM(s.{column}){filter_sql} AS {alias_prefix}{column}" for column in _SUMMED_COLUMNS
+    )
+
+
+def fetch_window_partials(window: Optional[Window], agent: Optional[str] = None, read_only: bool = True) -> List[dict]:
+    """Per-agent sums for the window (cur_*) and the preceding equal-length period (prev_*)"""
+    params = []
+    agent_sql = ""
+
+    if window is None:
+        bounds_sql = ""
+        from_sql = "agent_daily_stats s"
+        where_sql = "TRUE"
+        columns = _aggregates(None, "cur_")
+    else:
+        bounds_sql = f"""
+            WITH bounds AS (
+                SELECT start_day, end_day, start_day - (end_day - start_day + 1) AS prev_start_day
+                FROM (SELECT {window.start_sql} AS start_day, {window.end_sql} AS end_day) w
+            )"""
+        params.extend(window.params)
+        from_sql = "agent_daily_stats s CROSS JOIN bounds b"
+        where_sql = "s.day >= b.prev_start_day AND s.day <= b.end_day"
+        columns = _aggregates("s.day >= b.start_day", "cur_") + ",\n                " + \
+            _aggregates("s.day < b.start_day", "prev_")
+
+    if agent:
+        agent_sql = " AND s.agent_sender = %s"
+        params.append(agent)
+
+    query = f"""{bounds_sql}
+            SELECT
+                s.agent_sender,
+                {columns}
+            FROM {from_sql}
+            WHERE {where_sql}{agent_sql}
+            GROUP BY s.agent_sender
+        """
+    return execute_query(query, tuple(params) if params else None, fetch_all=True, read_only=read_only) or []
+
+
+def _metrics(row: dict, prefix: str) -> Optional[dict]:
+    conversations = int(row.get(f"{prefix}conversations") or 0)
+    if conversations == 0:
+        return None
+
+    metrics = {"totalConversations": conversations}
+    for field, column in AVERAGE_METRICS:
+        count = int(row.get(f"{prefix}{column}_count") or 0)
+        metrics[field] = float(row[f"{prefix}{column}_sum"]) / count if count else 0.0
+
+    start_negative = int(row.get(f"{prefix}start_negative") or 0)
+    end_positive = int(row.get(f"{prefix}end_positive") or 0)
+    metrics["sentimentImprovementPercent"] = (end_positive / start_negative) * 100 if start_negative else 0.0
+    return metrics
+
+
+def rank(entries: Dict[str, dict], sort_by: str, descending: bool = True) -> Dict[str, int]:
+    """Competition ranking (1, 2, 2, 4): equal values share the better rank"""
+    ordered = sorted(
+        entries.items(),
+        key=lambda item: ((-1 if descending else 1) * round(item[1][sort_by], 6), item[0])
+    )
+    ranks = {}
+    previous_value = None
+    previous_rank = 0
+    for position, (agent, metrics) in enumerate(ordered, start=1):
+        value = round(metrics[sort_by], 6)
+        if value != previous_value:
+            previous_rank = position
+            previous_value = value
+        ranks[agent] = previous_rank
+    return ranks
+
+
+def build_leaderboard(
+    rows: List[dict],
+    sort_by: str = "averageScore",
+    descending: bool = True,
+    limit: Optional[int] = None
+) -> List[dict]:
+    current = {}
+    previous = {}
+    for row in rows:
+        agent = str(row["agent_sender"])
+        metrics = _metrics(row, "cur_")
+        if metrics:
+            current[agent] = metrics
+        metrics = _metrics(row, "prev_")
+        if metrics:
+            previous[agent] = metrics
+
+    current_ranks = rank(current, sort_by, descending)
+    previous_ranks = rank(previous, sort_by, descending) if previous else {}
+
+    leaderboard = []
+    for agent, position in sorted(current_ranks.items(), key=lambda item: (item[1], item[0])):
+        previous_rank = previous_ranks.get(agent)
+        leaderboard.append({
+            "rank": position,
+            "agentExtension": agent,
+            **current[agent],
+            "previousRank": previous_rank,
+            # Positive = moved up compared with the previous period
+            "rankDelta": previous_rank - position if previous_rank is not None else None,
+        })
+
+    return leaderboard[:limit] if limit else leaderboard
@@ -0,0 +1,179 @@
+"""
+Agent profile: everything the profile page shows, in one statement
+
+The agent's analyses for the window are read once into a CTE that is referenced
+by every section (KPIs, AI and human criteria averages, sentiment, top topics),
+so PostgreSQL materializes it and scans the agent's rows a single time. The
+daily trend comes from agent_daily_stats in the same statement; the rank is
+taken from the leaderboard over the same rollup so it always matches
+/leaderboard/agents.
+"""
+from typing import List, Optional
+
+from analytics.leaderboard import build_leaderboard, fetch_window_partials
+from analytics.windows import Window
+from database import execute_query
+
+CRITERIA = ['opening', 'listening', 'empathy', 'response_process', 'system_updation', 'closing']
+
+# Trend length when no window is given (all time)
+DEFAULT_TREND_DAYS = 30
+
+SENTIMENT_LABELS = ('positive', 'negative', 'neutral')
+
+
+def _camel(name: str) -> str:
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
+def fetch_profile(agent: str, window: Optional[Window], topics_limit: int = 10, read_only: bool = True) -> dict:
+    """One row with the KPI aggregates plus sentiment, topics and trend as JSON"""
+    params = [agent]
+    window_sql = ""
+    if window is not None:
+        filter_sql, filter_params = window.timestamp_filter("ca.created_at")
+        window_sql = f" AND {filter_sql}"
+        params.extend(filter_params)
+    params.append(topics_limit)
+
+    params.append(agent)
+    if window is not None:
+        trend_sql, trend_params = window.day_filter("s.day")
+        params.extend(trend_params)
+    else:
+        trend_sql = f"s.day > CURRENT_DATE - {DEFAULT_TREND_DAYS}"
+
+    criteria_sql = ",\n                ".join(
+        f"AVG({name}_score) AS ai_{name}, AVG({name}_score_override) AS human_{name}" for name in CRITERIA
+    )
+
+    query = f"""
+        WITH agent_rows AS (
+            SELECT
+                ca.final_percentage_score, ca.conversation_score_ai, ca.process_score_human,
+                ca.other_criteria_score_human, ca.final_score_combined,
+                ca.opening_score, ca.listening_score, ca.empathy_score,
+                ca.response_process_score, ca.system_updation_score, ca.closing_score,
+                ca.customer_sentiment_label, ca.customer_sentiment_start, ca.customer_sentiment_end,
+                ca.main_topic, ca.review_status,
+                cl.silence_percentage, cl.longest_silence_gap_seconds, cl.total_silence_seconds,
+                crh.opening_score_override, crh.listening_score_override, crh.empathy_score_override,
+                crh.response_process_score_override, crh.system_updation_score_override,
+                crh.closing_score_override, crh.final_percentage_score_human
+            FROM conversation_analysis ca
+            INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+            LEFT JOIN conversation_review_human crh ON crh.analysis_id = ca.id
+            WHERE cl.agent_sender = %s{window_sql}
+        ),
+        kpis AS (
+            SELECT
+                COUNT(*) AS total_conversations,
+                COUNT(*) FILTER (WHERE review_status = 'review_completed') AS reviewed_conversations,
+                AVG(final_percentage_score) AS average_score,
+                AVG(final_percentage_score_human) AS average_score_human,
+                AVG(conversation_score_ai) AS average_conversation_score_ai,
+                AVG(process_score_human) AS average_process_score_human,
+                AVG(other_criteria_score_human) AS average_other_criteria_score_human,
+                AVG(final_score_combined) AS average_final_score_combined,
+                AVG(silence_percentage) AS average_silence_percentage,
+                AVG(longest_silence_gap_seconds) AS average_longest_silence,
+                SUM(total_silence_seconds) AS total_silence_seconds,
+                COUNT(*) FILTER (WHERE customer_sentiment_start = 'positive') AS start_sentiment_positive,
+                COUNT(*) FILTER (WHERE customer_sentiment_start = 'negative') AS start_sentiment_negative,
+                COUNT(*) FILTER (WHERE customer_sentiment_end = 'positive') AS end_sentiment_positive,
+                COUNT(*) FILTER (WHERE customer_sentiment_end = 'negative') AS end_sentiment_negative,
+                {criteria_sql}
+            FROM agent_rows
+        ),
+        sentiment AS (
+            SELECT coalesce(jsonb_object_agg(customer_sentiment_label, count), '{{}}') AS sentiment
+            FROM (
+                SELECT customer_sentiment_label, COUNT(*) AS count
+                FROM agent_rows
+                WHERE customer_sentiment_label IS NOT NULL
+                GROUP BY customer_sentiment_label
+            ) s
+        ),
+        topics AS (
+            SELECT coalesce(jsonb_agg(jsonb_build_object('main_topic', main_topic, 'count', count)
+                                      ORDER BY count DESC, main_topic), '[]') AS topics
+            FROM (
+                SELECT main_topic, COUNT(*) AS count
+                FROM agent_rows
+                WHERE main_topic IS NOT NULL AND main_topic != ''
+                GROUP BY main_topic
+                ORDER BY COUNT(*) DESC, main_topic
+                LIMIT %s
+            ) t
+        ),
+        trend AS (
+            SELECT coalesce(jsonb_agg(jsonb_build_object(
+                'date', s.day,
+                'conversation_count', s.conversations,
+                'average_score', CASE WHEN s.score_count > 0 THEN s.score_sum / s.score_count END,
+                'average_silence_percentage', CASE WHEN s.silence_count > 0 THEN s.silence_sum / s.silence_count END
+            ) ORDER BY s.day), '[]') AS trend
+            FROM agent_daily_stats s
+            WHERE s.agent_sender = %s AND {trend_sql}
+        )
+        SELECT kpis.*, sentiment.sentiment, topics.topics, trend.trend
+        FROM kpis, sentiment, topics, trend
+    """
+    return execute_query(query, tuple(params), fetch_one=True, read_only=read_only) or {}
+
+
+def fetch_rank(agent: str, window: Optional[Window], read_only: bool = True) -> dict:
+    """The agent's leaderboard entry (by averageScore) for the window"""
+    leaderboard = build_leaderboard(fetch_window_partials(window, read_only=read_only))
+    entry = next((row for row in leaderboard if row["agentExtension"] == agent), None)
+    return {
+        "rank": entry["rank"] if entry else None,
+        "previousRank": entry["previousRank"] if entry else None,
+        "rankDelta": entry["rankDelta"] if entry else None,
+        "totalAgents": len(leaderboard),
+    }
+
+
+def _number(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def build_profile(agent: str, row: dict, rank: dict) -> dict:
+    start_negative = int(row.get('start_sentiment_negative') or 0)
+    end_positive = int(row.get('end_sentiment_positive') or 0)
+
+    kpis = {
+        "totalConversations": int(row.get('total_conversations') or 0),
+        "reviewedConversations": int(row.get('reviewed_conversations') or 0),
+        "averageScore": float(row.get('average_score') or 0),
+        "averageScoreHuman": _number(row.get('average_score_human')),
+        "averageConversationScoreAI": float(row.get('average_conversation_score_ai') or 0),
+        "averageProcessScoreHuman": float(row.get('average_process_score_human') or 0),
+        "averageOtherCriteriaScoreHuman": float(row.get('average_other_criteria_score_human') or 0),
+        "averageFinalScoreCombined": float(row.get('average_final_score_combined') or 0),
+        "averageSilencePercentage": float(row.get('average_silence_percentage') or 0),
+        "averageLongestSilence": float(row.get('average_longest_silence') or 0),
+        "totalSilenceSeconds": float(row.get('total_silence_seconds') or 0),
+        "startSentimentPositive": int(row.get('start_sentiment_positive') or 0),
+        "startSentimentNegative": start_negative,
+        "endSentimentPositive": end_positive,
+        "endSentimentNegative": int(row.get('end_sentiment_negative') or 0),
+        "sentimentImprovement": (end_positive / start_negative) * 100 if start_negative else 0,
+    }
+
+    sentiment = row.get('sentiment') or {}
+    trend: List[dict] = row.get('trend') or []
+
+    return {
+        "agentExtension": agent,
+        "kpis": kpis,
+        "criteria": {
+            "ai": {_camel(name): _number(row.get(f"ai_{name}")) for name in CRITERIA},
+            "human": {_camel(name): _number(row.get(f"human_{name}")) for name in CRITERIA},
+        },
+        "sentiment": {label: int(sentiment.get(label, 0)) for label in SENTIMENT_LABELS},
+        "topics": row.get('topics') or [],
+        "rank": rank,
+        "trend": trend,
+    }
@@ -0,0 +1,194 @@
+"""
+Silence analytics over packed silence intervals
+
+Every call in the filter is fetched with its conversations_log.silence_ms array
+(flat [start, end, start, end, ...] milliseconds, see
+migrations/add_silence_intervals.sql) and its duration. All gaps are flattened
+into one start/end array with a call index, so the statistics below are a few
+vector passes (bincount / add.at) however many calls and gaps are in the window.
+
+- gap_histogram: gap lengths bucketed by fixed edges in seconds
+- silence_by_phase: silence inside the opening / middle / closing share of each call
+- agent_distributions: per-agent spread of silence percentage and gap lengths
+"""
+from itertools import chain
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from analytics.windows import Window
+from database import fetch_columns
+
+# Gap length bucket edges in seconds; the last bucket is open-ended
+DEFAULT_EDGES = (0, 1, 2, 3, 5, 10, 20, 30, 60)
+
+# name -> (from, to) as fractions of the call duration
+PHASES = {
+    'opening': (0.0, 0.15),
+    'middle': (0.15, 0.85),
+    'closing': (0.85, 1.0),
+}
+
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+
+class Gaps:
+    """All gaps of a set of calls: per-gap arrays in seconds plus per-call arrays"""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        packed = columns['silence_ms']
+        self.agents = columns['agent_sender']
+        self.durations = columns['duration']
+        self.calls = len(packed)
+
+        counts = np.fromiter((len(value) // 2 for value in packed), dtype=np.int64, count=self.calls)
+        flat = np.fromiter(chain.from_iterable(value[:2 * (len(value) // 2)] for value in packed),
+                           dtype=np.float64, count=2 * int(counts.sum())) / 1000
+
+        self.starts = flat[0::2]
+        self.ends = np.maximum(flat[1::2], self.starts)
+        self.lengths = self.ends - self.starts
+        self.call_index = np.repeat(np.arange(self.calls), counts)
+
+    def per_call(self, weights: np.ndarray) -> np.ndarray:
+        return np.bincount(self.call_index, weights=weights, minlength=self.calls)
+
+
+def fetch_gaps(window: Optional[Window], agent: Optional[str] = None) -> Gaps:
+    """Gaps of every call in the window that has a duration"""
+    where_clauses = ["cl.total_duration_seconds > 0", "cl.silence_ms IS NOT NULL"]
+    params = []
+
+    if window is not None:
+        window_sql, window_params = window.timestamp_filter("cl.created_at")
+        where_clauses.append(window_sql)
+        params.extend(window_params)
+    if agent:
+        where_clauses.append("cl.agent_sender = %s")
+        params.append(agent)
+
+    query = f"""
+        SELECT
+            cl.agent_sender::text AS agent_sender,
+            cl.total_duration_seconds::float8 AS duration,
+            cl.silence_ms
+        FROM conversations_log cl
+        WHERE {" AND ".join(where_clauses)}
+    """
+    return Gaps(fetch_columns(query, tuple(params), read_only=True))
+
+
+def clean(value, digits: int = 2):
+    return None if value is None or not np.isfinite(value) else round(float(value), digits)
+
+
+def _percentiles(values: np.ndarray, percentiles: Sequence[float]) -> dict:
+    if not len(values):
+        return {f"p{p:g}": None for p in percentiles}
+    return {f"p{p:g}": clean(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+
+
+def gap_histogram(gaps: Gaps, edges: Sequence[float] = DEFAULT_EDGES) -> dict:
+    """Gap count and total silence per length bucket, plus overall gap length statistics"""
+    edges = np.asarray(edges, dtype=np.float64)
+    buckets = np.clip(np.searchsorted(edges, gaps.lengths, side='right') - 1, 0, len(edges) - 1)
+    counts = np.bincount(buckets, minlength=len(edges))
+    seconds = np.bincount(buckets, weights=gaps.lengths, minlength=len(edges))
+    total = len(gaps.lengths)
+
+    histogram = []
+    for i, start in enumerate(edges):
+        histogram.append({
+            "from": float(start),
+            "to": float(edges[i + 1]) if i + 1 < len(edges) else None,
+            "count": int(counts[i]),
+            "share": clean(counts[i] / total * 100) if total else None,
+            "silenceSeconds": clean(seconds[i]),
+        })
+
+    return {
+        "gaps": total,
+        "meanSeconds": clean(gaps.lengths.mean()) if total else None,
+        "percentiles": _percentiles(gaps.lengths, (50, 90, 99)),
+        "histogram": histogram,
+    }
+
+
+def silence_by_phase(gaps: Gaps) -> List[dict]:
+    """
+    Silence inside each phase of the call, as pooled seconds and percentage of phase
+    time, the mean per-call percentage, and the number of gaps starting in the phase
+    """
+    durations = gaps.durations
+    gap_durations = durations[gaps.call_index]
+    result = []
+    for name, (start, end) in PHASES.items():
+        phase_start = start * gap_durations
+        phase_end = end * gap_durations
+        overlap = np.clip(np.minimum(gaps.ends, phase_end) - np.maximum(gaps.starts, phase_start), 0, None)
+        per_call = gaps.per_call(overlap)
+        phase_seconds = (end - start) * durations
+
+        starting = (gaps.starts >= phase_start) & (gaps.starts < phase_end)
+        if end == 1.0:
+            starting |= gaps.starts >= phase_end
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pooled = per_call.sum() / phase_seconds.sum() * 100
+            mean_call = np.mean(per_call / phase_seconds * 100) if gaps.calls else np.nan
+
+        result.append({
+            "phase": name,
+            "from": start,
+            "to": end,
+            "silenceSeconds": clean(per_call.sum()),
+            "silencePercentage": clean(pooled),
+            "meanCallPercentage": clean(mean_call),
+            "gaps": int(starting.sum()),
+        })
+    return result
+
+
+def agent_distributions(
+    gaps: Gaps,
+    long_gap_seconds: float = 10.0,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> List[dict]:
+    """Per agent: silence percentage percentiles, gap length, longest gap and long-gap call share"""
+    if not gaps.calls:
+        return []
+
+    keys, groups = np.unique(gaps.agents.astype(str), return_inverse=True)
+    group_count = len(keys)
+
+    silence_pct = np.minimum(gaps.per_call(gaps.lengths) / gaps.durations * 100, 100)
+    longest = np.zeros(gaps.calls)
+    np.maximum.at(longest, gaps.call_index, gaps.lengths)
+
+    calls = np.bincount(groups, minlength=group_count)
+    gap_groups = groups[gaps.call_index]
+    gap_counts = np.bincount(gap_groups, minlength=group_count)
+    gap_seconds = np.bincount(gap_groups, weights=gaps.lengths, minlength=group_count)
+    long_calls = np.bincount(groups, weights=longest >= long_gap_seconds, minlength=group_count)
+
+    # Calls sorted by agent, so each agent's calls are one contiguous slice
+    order = np.argsort(groups, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(calls)))
+
+    result = []
+    for i, key in enumerate(keys):
+        members = order[bounds[i]:bounds[i + 1]]
+        result.append({
+            "agentExtension": str(key),
+            "calls": int(calls[i]),
+            "gaps": int(gap_counts[i]),
+            "gapsPerCall": clean(gap_counts[i] / calls[i]),
+            "meanGapSeconds": clean(gap_seconds[i] / gap_counts[i]) if gap_counts[i] else None,
+            "silencePercentage": {
+                "mean": clean(silence_pct[members].mean()),
+                **_percentiles(silence_pct[members], percentiles),
+            },
+            "longestGapSeconds": _percentiles(longest[members], (50, 90)),
+            "longGapCallShare": clean(long_calls[i] / calls[i] * 100),
+        })
+    return result
@@ -0,0 +1,53 @@
+"""
+Date windows over the daily rollups
+
+The routes accept the same date_range / start_date / end_date parameters
+everywhere; resolve_window turns them into an inclusive range of days expressed
+in SQL (relative windows stay relative to the database's CURRENT_DATE so the
+app and database never disagree on "today").
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Window:
+    """Inclusive [start, end] day range as SQL date expressions plus their params"""
+    start_sql: str
+    end_sql: str
+    params: Tuple = ()
+
+    @property
+    def key(self) -> tuple:
+        return (self.start_sql, self.end_sql) + tuple(self.params)
+
+    def day_filter(self, column: str) -> Tuple[str, Tuple]:
+        """WHERE fragment restricting a DATE column to the window"""
+        return f"{column} >= {self.start_sql} AND {column} <= {self.end_sql}", tuple(self.params)
+
+    def timestamp_filter(self, column: str) -> Tuple[str, Tuple]:
+        """WHERE fragment restricting a timestamp column to the window's days"""
+        return f"{column} >= {self.start_sql} AND {column} < ({self.end_sql}) + 1", tuple(self.params)
+
+
+# Same boundaries as the per-route filters: 'last7days' is CURRENT_DATE - 7 .. today
+RELATIVE_WINDOWS = {
+    'today': ("CURRENT_DATE", "CURRENT_DATE"),
+    'yesterday': ("CURRENT_DATE - 1", "CURRENT_DATE - 1"),
+    'last7days': ("CURRENT_DATE - 7", "CURRENT_DATE"),
+    'last30days': ("CURRENT_DATE - 30", "CURRENT_DATE"),
+}
+
+
+def resolve_window(
+    date_range: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Optional[Window]:
+    """Window for the request, or None for all time"""
+    if date_range in RELATIVE_WINDOWS:
+        start_sql, end_sql = RELATIVE_WINDOWS[date_range]
+        return Window(start_sql, end_sql)
+    if date_range == 'custom' and start_date and end_date:
+        return Window("%s::date", "%s::date", (start_date, end_date))
+    return None
@@ -0,0 +1 @@
+"""Benchmark and load-test tooling (see bench/README.md)"""
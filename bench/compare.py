@@ -0,0 +1,65 @@
+"""
+Compare two benchmark result files from bench/run.py
+
+    python -m bench.compare bench/results/<before>.json bench/results/<after>.json
+
+Prints per-endpoint p50/p95/p99, throughput and DB round trips side by side
+with the relative change; regressions beyond --threshold percent are flagged.
+"""
+import argparse
+import json
+
+
+def _change(before, after) -> str:
+    if before in (None, 0) or after is None:
+        return '-'
+    return f"{100 * (after - before) / before:+.0f}%"
+
+
+def compare(before: dict, after: dict, threshold: float):
+    print(f"before: {before['meta']['revision']} ({before['meta']['mode']}, {before['meta']['timestamp']})")
+    print(f"after:  {after['meta']['revision']} ({after['meta']['mode']}, {after['meta']['timestamp']})\n")
+
+    header = f"{'endpoint':32} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'rps':>14} {'db_q':>10}"
+    print(header)
+    print('-' * len(header))
+
+    regressions = []
+    for name in sorted(set(before['endpoints']) | set(after['endpoints'])):
+        b = before['endpoints'].get(name)
+        a = after['endpoints'].get(name)
+        if not b or not a:
+            print(f"{name:32} {'only in ' + ('after' if a else 'before'):>16}")
+            continue
+
+        cells = []
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            cells.append(f"{a[key]:>8.1f} {_change(b[key], a[key]):>7}")
+        cells.append(f"{a['throughput_rps']:>7.1f} {_change(b['throughput_rps'], a['throughput_rps']):>6}")
+        db_q = a.get('db_queries_per_request')
+        cells.append(f"{db_q:>10.1f}" if db_q is not None else f"{'-':>10}")
+        print(f"{name:32} " + ' '.join(cells))
+
+        if b['p95_ms'] and 100 * (a['p95_ms'] - b['p95_ms']) / b['p95_ms'] > threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"\np95 regressions over {threshold:.0f}%: {', '.join(regressions)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Flag p95 regressions above this percent")
+    args = parser.parse_args()
+
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+    compare(before, after, args.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure the cost of importing the app
+
+    python -m bench.importtime
+    python -m bench.importtime --module main --top 25 --runs 5
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and
+prints the slowest modules by cumulative import time plus the total, and the
+median wall time of the runs. Nothing connects to the database at import time,
+so this works without one.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _run_once(module: str):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    # "import time: self [us] | cumulative | imported package"
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us), len(name) - len(name.lstrip()))
+    return wall_ms, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time of the app")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20, help="Number of modules to list")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time; the last one is reported")
+    args = parser.parse_args()
+
+    walls = []
+    modules = {}
+    for _ in range(max(1, args.runs)):
+        wall_ms, modules = _run_once(args.module)
+        walls.append(wall_ms)
+
+    print(f"{'module':48} {'self ms':>9} {'cumulative ms':>14}")
+    ranked = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)
+    for name, (self_us, cumulative_us, _) in ranked[:args.top]:
+        print(f"{name:48} {self_us / 1000:>9.1f} {cumulative_us / 1000:>14.1f}")
+
+    # Top-level entries (least indented) add up to the whole import
+    top_level = min(indent for _, _, indent in modules.values())
+    total_us = sum(cumulative for _, cumulative, indent in modules.values() if indent == top_level)
+    print(f"\nimport {args.module}: {total_us / 1000:.1f} ms in {len(modules)} modules")
+    print(f"interpreter start + import, median of {len(walls)}: {statistics.median(walls):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Load profiles for bench/run.py
+
+Each Endpoint describes one route: how often it is hit in the mixed profile
+(weight), and how to build its path/params/body from sample data collected
+from the running API before the run. Writes are excluded unless requested.
+"""
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+
+@dataclass
+class Samples:
+    agents: list = field(default_factory=list)
+    analysis_ids: list = field(default_factory=list)
+    reviewed_ids: list = field(default_factory=list)
+    reviewer_ids: list = field(default_factory=list)
+    unanalyzed_ids: list = field(default_factory=list)
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    params: Optional[dict] = None
+    json: Optional[object] = None
+
+
+@dataclass
+class Endpoint:
+    name: str
+    weight: float
+    build: Callable[[random.Random, Samples], Request]
+    write: bool = False
+
+
+DATE_RANGES = ['today', 'last7days', 'last30days', None]
+
+# Phrases from the seeder's vocabulary (bench/seed.py WORDS and FEEDBACK)
+FEEDBACK_TERMS = ['سکوت طولانی', '"ثبت در سیستم"', 'همدلی', 'اطلاعات نادرست']
+SEARCH_TERMS = ['مرجوعی', 'کد رهگیری', '"بازگشت وجه"', 'تاخیر ارسال', 'پرداخت -تراکنش', 'شکایت or لغو']
+
+
+def _agent(rng: random.Random, samples: Samples, p_all: float = 0.5):
+    if not samples.agents or rng.random() < p_all:
+        return None
+    return rng.choice(samples.agents)
+
+
+def _agent_params(rng: random.Random, samples: Samples, p_all: float = 0.5) -> Optional[dict]:
+    agent = _agent(rng, samples, p_all)
+    return {'agent_id': agent} if agent else None
+
+
+def _filters(rng: random.Random, samples: Samples) -> dict:
+    params = {}
+    agent = _agent(rng, samples)
+    if agent:
+        params['agent_id'] = agent
+    date_range = rng.choice(DATE_RANGES)
+    if date_range:
+        params['date_range'] = date_range
+    return params
+
+
+def _pick(rng: random.Random, values: list, fallback: str = '00000000-0000-0000-0000-000000000000'):
+    return rng.choice(values) if values else fallback
+
+
+def _submit_body(rng: random.Random, samples: Samples) -> dict:
+    scores = {f"{c}_score_override": rng.randint(0, 4) for c in
+              ['opening', 'listening', 'empathy', 'response_process', 'system_updation', 'closing']}
+    return {
+        "analysis_id": _pick(rng, samples.analysis_ids),
+        "reviewer_id": _pick(rng, samples.reviewer_ids),
+        **scores,
+        "total_weighted_score_human": 150,
+        "final_percentage_score_human": 75,
+        "other_criteria_weighted_score_human": 80,
+        "other_criteria_percentage_score_human": 70,
+    }
+
+
+ENDPOINTS = [
+    # Reviewer (interactive) paths
+    Endpoint("reviews.pending", 4, lambda r, s: Request("GET", "/reviews/pending", _agent_params(r, s, 0.8))),
+    Endpoint("reviews.analysis", 3, lambda r, s: Request("GET", f"/reviews/analysis/{_pick(r, s.reviewed_ids)}")),
+    Endpoint("conversations.detail", 6, lambda r, s: Request("GET", f"/conversations/analyzed/{_pick(r, s.analysis_ids)}")),
+    Endpoint("comparison.detail", 2, lambda r, s: Request("GET", f"/comparison/conversation/{_pick(r, s.reviewed_ids)}")),
+    Endpoint("conversations.batch", 1, lambda r, s: Request("POST", "/conversations/analyzed/batch", json={"analysis_ids": r.sample(s.analysis_ids, min(50, len(s.analysis_ids)))})),
+    Endpoint("settings.weights", 2, lambda r, s: Request("GET", "/settings/weights")),
+    Endpoint("settings.max_score", 1, lambda r, s: Request("GET", "/settings/max-score")),
+    Endpoint("users.list", 0.5, lambda r, s: Request("GET", "/users/")),
+    Endpoint("agents.list", 3, lambda r, s: Request("GET", "/agents/list")),
+    Endpoint("agents.profile", 2, lambda r, s: Request("GET", f"/agents/{_pick(r, s.agents)}/profile", {"date_range": r.choice(DATE_RANGES[:3])})),
+
+    # Lists
+    Endpoint("conversations.analyzed", 4, lambda r, s: Request("GET", "/conversations/analyzed", {**_filters(r, s), "page": r.randint(1, 3), "page_size": 100})),
+    Endpoint("conversations.unanalyzed", 1, lambda r, s: Request("GET", "/conversations/unanalyzed", {"page": 1, "page_size": 100})),
+    Endpoint("reviews.feedback_search", 1, lambda r, s: Request("GET", "/reviews/feedback/search", {**_filters(r, s), "q": r.choice(FEEDBACK_TERMS), "source": r.choice(["all", "human", "ai"])})),
+    Endpoint("reviews.completed", 1, lambda r, s: Request("GET", "/reviews/completed", _agent_params(r, s, 0.0))),
+    Endpoint("conversations.search", 2, lambda r, s: Request("GET", "/conversations/search", {**_filters(r, s), "q": r.choice(SEARCH_TERMS), "sort": r.choice(["relevance", "recent"])})),
+    Endpoint("comparison.reviewed", 2, lambda r, s: Request("GET", "/comparison/reviewed-conversations", {**_filters(r, s), "page_size": 100})),
+    Endpoint("comparison.agreement", 1, lambda r, s: Request("GET", "/comparison/agreement", {"date_range": r.choice(["last7days", "last30days"])})),
+    Endpoint("comparison.agreement.grouped", 1, lambda r, s: Request("GET", "/comparison/agreement", {"date_range": "last30days", "group_by": r.choice(["agent", "reviewer"])})),
+
+    # Dashboard / leaderboard polling
+    Endpoint("dashboard.kpis", 4, lambda r, s: Request("GET", "/dashboard/kpis", _filters(r, s))),
+    Endpoint("dashboard.score_trends", 2, lambda r, s: Request("GET", "/dashboard/score-trends", {"date_range": r.choice(['last7days', 'last30days'])})),
+    Endpoint("dashboard.criteria", 2, lambda r, s: Request("GET", "/dashboard/criteria-scores", _filters(r, s))),
+    Endpoint("dashboard.human_criteria", 2, lambda r, s: Request("GET", "/dashboard/human-criteria-scores", _filters(r, s))),
+    Endpoint("dashboard.sentiment", 2, lambda r, s: Request("GET", "/dashboard/sentiment-distribution", _filters(r, s))),
+    Endpoint("dashboard.topics", 2, lambda r, s: Request("GET", "/dashboard/top-topics", _filters(r, s))),
+    Endpoint("dashboard.score_distribution", 2, lambda r, s: Request("GET", "/dashboard/score-distribution", _filters(r, s))),
+    Endpoint("dashboard.silence", 1, lambda r, s: Request("GET", "/dashboard/silence", _filters(r, s))),
+    Endpoint("leaderboard.agents", 3, lambda r, s: Request("GET", "/leaderboard/agents", {"date_range": r.choice(DATE_RANGES[:3])})),
+    Endpoint("leaderboard.agents.top", 1, lambda r, s: Request("GET", "/leaderboard/agents", {"date_range": "last30days", "sort_by": r.choice(["averageScore", "totalConversations", "averageSilencePercent"]), "limit": 10})),
+
+    # Writes (only with --include-writes; they modify the seeded data)
+    Endpoint("reviews.submit", 1, lambda r, s: Request("POST", "/reviews/submit", json=_submit_body(r, s)), write=True),
+    Endpoint("reviews.claim", 1, lambda r, s: Request("POST", "/reviews/claim", {"reviewer_id": _pick(r, s.reviewer_ids), "n": 10}), write=True),
+    Endpoint("conversations.analyze_batch", 0.2, lambda r, s: Request("POST", "/conversations/analyze/batch", json=r.sample(s.unanalyzed_ids, min(20, len(s.unanalyzed_ids)))), write=True),
+]
+
+
+def select_endpoints(include_writes: bool = False, only: Optional[list] = None) -> list:
+    endpoints = [e for e in ENDPOINTS if include_writes or not e.write]
+    if only:
+        endpoints = [e for e in endpoints if any(e.name.startswith(prefix) for prefix in only)]
+    return endpoints
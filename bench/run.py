@@ -0,0 +1,233 @@
+"""
+Drive the API with a repeatable load profile and report per-endpoint latency
+
+    EXPOSE_DB_STATS=true python -m uvicorn main:app          # server under test
+    python -m bench.run --mode mixed --duration 60 --concurrency 16
+    python -m bench.run --mode sweep --requests 200 --concurrency 8
+    python -m bench.compare bench/results/<before>.json bench/results/<after>.json
+
+mixed: workers pick endpoints by weight (bench/profile.py) for --duration seconds
+sweep: every endpoint in isolation for --requests requests each
+
+Reports p50/p95/p99 latency, throughput, error count and DB round trips per
+request (from the X-DB-Queries header) and saves the results as JSON under
+bench/results/ named after the current commit.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.profile import Samples, select_endpoints
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (k - lower)
+
+
+def git_revision() -> str:
+    try:
+        sha = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet']) != 0
+        return f"{sha}-dirty" if dirty else sha
+    except Exception:
+        return "unknown"
+
+
+async def collect_samples(client: httpx.AsyncClient) -> Samples:
+    """Gather IDs from the API so requests hit real rows"""
+    async def get(path, params=None):
+        response = await client.get(path, params=params)
+        response.raise_for_status()
+        return response.json()
+
+    samples = Samples()
+    samples.agents = (await get('/agents/list'))['agents']
+    samples.analysis_ids = [row['id'] for row in (await get('/conversations/analyzed', {'page_size': 200}))['data']]
+    samples.reviewed_ids = [row['id'] for row in (await get('/comparison/reviewed-conversations', {'page_size': 200}))['data']]
+    samples.reviewer_ids = [row['id'] for row in await get('/users/')]
+    samples.unanalyzed_ids = [row['unique_id'] for row in (await get('/conversations/unanalyzed', {'page_size': 200}))['data']]
+    return samples
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.db_queries = defaultdict(list)
+        self.db_time = defaultdict(list)
+
+    async def send(self, client: httpx.AsyncClient, endpoint, rng: random.Random, samples: Samples, record: bool = True):
+        request = endpoint.build(rng, samples)
+        started = time.perf_counter()
+        try:
+            response = await client.request(request.method, request.path, params=request.params, json=request.json)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 'error'
+        elapsed = time.perf_counter() - started
+
+        if not record:
+            return
+        self.latencies[endpoint.name].append(elapsed)
+        self.statuses[endpoint.name][str(status)] += 1
+        if response is None or response.status_code >= 400:
+            self.errors[endpoint.name] += 1
+        if response is not None and 'x-db-queries' in response.headers:
+            self.db_queries[endpoint.name].append(int(response.headers['x-db-queries']))
+            self.db_time[endpoint.name].append(float(response.headers.get('x-db-time-ms', 0)))
+
+    def summary(self, elapsed_by_endpoint: dict) -> dict:
+        result = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            queries = self.db_queries.get(name)
+            db_time = self.db_time.get(name)
+            result[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "statuses": dict(self.statuses[name]),
+                "throughput_rps": len(values) / elapsed_by_endpoint[name] if elapsed_by_endpoint.get(name) else 0,
+                "mean_ms": 1000 * sum(values) / len(values),
+                "p50_ms": 1000 * percentile(values, 50),
+                "p95_ms": 1000 * percentile(values, 95),
+                "p99_ms": 1000 * percentile(values, 99),
+                "max_ms": 1000 * values[-1],
+                "db_queries_per_request": sum(queries) / len(queries) if queries else None,
+                "db_time_ms_per_request": sum(db_time) / len(db_time) if db_time else None,
+            }
+        return result
+
+
+async def run_mixed(client, endpoints, samples, args, recorder: Recorder) -> float:
+    weights = [e.weight for e in endpoints]
+    loop = asyncio.get_running_loop()
+    warmup_until = loop.time() + args.warmup
+    deadline = warmup_until + args.duration
+
+    async def worker(worker_id: int):
+        rng = random.Random(args.seed * 1000 + worker_id)
+        while loop.time() < deadline:
+            endpoint = rng.choices(endpoints, weights=weights)[0]
+            await recorder.send(client, endpoint, rng, samples, record=loop.time() >= warmup_until)
+
+    await asyncio.gather(*(worker(i) for i in range(args.concurrency)))
+    return args.duration
+
+
+async def run_sweep(client, endpoints, samples, args, recorder: Recorder) -> dict:
+    elapsed = {}
+    for endpoint in endpoints:
+        rng = random.Random(args.seed)
+        for _ in range(min(args.warmup_requests, args.requests)):
+            await recorder.send(client, endpoint, rng, samples, record=False)
+
+        remaining = iter(range(args.requests))
+
+        async def worker():
+            for _ in remaining:
+                await recorder.send(client, endpoint, rng, samples)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed[endpoint.name] = time.perf_counter() - started
+        print(f"  {endpoint.name}: {args.requests} requests in {elapsed[endpoint.name]:.1f}s")
+    return elapsed
+
+
+def print_report(summary: dict):
+    header = f"{'endpoint':32} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'db_q':>6}"
+    print(header)
+    print('-' * len(header))
+    for name, row in summary.items():
+        db_q = f"{row['db_queries_per_request']:.1f}" if row['db_queries_per_request'] is not None else '-'
+        print(f"{name:32} {row['requests']:>6} {row['errors']:>5} {row['throughput_rps']:>8.1f} "
+              f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {db_q:>6}")
+
+
+async def main_async(args):
+    endpoints = select_endpoints(args.include_writes, args.only)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        samples = await collect_samples(client)
+        print(f"Samples: {len(samples.agents)} agents, {len(samples.analysis_ids)} analyses, "
+              f"{len(samples.reviewed_ids)} reviewed, {len(samples.reviewer_ids)} users")
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        if args.mode == 'mixed':
+            duration = await run_mixed(client, endpoints, samples, args, recorder)
+            elapsed = {e.name: duration for e in endpoints}
+        else:
+            elapsed = await run_sweep(client, endpoints, samples, args, recorder)
+        wall = time.perf_counter() - started
+
+    summary = recorder.summary(elapsed)
+    total = sum(row['requests'] for row in summary.values())
+    print_report(summary)
+    print(f"\nTotal: {total} requests, {total / (args.duration if args.mode == 'mixed' else wall):.1f} req/s")
+
+    result = {
+        "meta": {
+            "revision": git_revision(),
+            "label": args.label,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "base_url": args.base_url,
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "duration": args.duration if args.mode == 'mixed' else wall,
+            "requests_per_endpoint": args.requests if args.mode == 'sweep' else None,
+            "include_writes": args.include_writes,
+            "seed": args.seed,
+        },
+        "endpoints": summary,
+    }
+
+    os.makedirs(args.out, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    name = f"{stamp}-{result['meta']['revision']}-{args.mode}{'-' + args.label if args.label else ''}.json"
+    path = os.path.join(args.out, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Saved {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the QC Panel API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--mode", choices=['mixed', 'sweep'], default='mixed')
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=60, help="mixed: measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="mixed: unmeasured seconds before the run")
+    parser.add_argument("--requests", type=int, default=200, help="sweep: requests per endpoint")
+    parser.add_argument("--warmup-requests", type=int, default=10, help="sweep: unmeasured requests per endpoint")
+    parser.add_argument("--only", nargs='*', help="Endpoint name prefixes, e.g. dashboard reviews.pending")
+    parser.add_argument("--include-writes", action="store_true", help="Also drive write endpoints (modifies data)")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default=None)
+    parser.add_argument("--out", default=RESULTS_DIR)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
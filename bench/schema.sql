@@ -0,0 +1,116 @@
+-- Base schema for local benchmark databases
+-- Mirrors the production tables the API reads and writes; the migrations in
+-- migrations/ are applied on top of it by bench/seed.py.
+-- The schema variable is POSTGRES_SCHEMA, filled in by the seeder (or psql -v schema=...).
+
+CREATE SCHEMA IF NOT EXISTS :schema;
+SET search_path TO :schema, public;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'analysis_review_status') THEN
+        CREATE TYPE analysis_review_status AS ENUM ('pending_review', 'review_completed', 'approved');
+    END IF;
+END $$;
+
+CREATE TABLE IF NOT EXISTS qc_users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    username TEXT NOT NULL UNIQUE,
+    password_hash TEXT,
+    full_name TEXT,
+    role TEXT NOT NULL DEFAULT 'agent',
+    is_active BOOLEAN NOT NULL DEFAULT true,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS qc_settings (
+    setting_key TEXT PRIMARY KEY,
+    setting_value JSONB NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_by TEXT
+);
+
+CREATE TABLE IF NOT EXISTS conversations_log (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    unique_id TEXT NOT NULL UNIQUE,
+    agent_sender TEXT,
+    is_analyzed BOOLEAN NOT NULL DEFAULT false,
+    qc_status TEXT,
+    conversation_data JSONB,
+    total_duration_seconds NUMERIC,
+    total_silence_seconds NUMERIC,
+    longest_silence_gap_seconds NUMERIC,
+    silence_percentage NUMERIC,
+    silence_timeline JSONB,
+    user_sentiment_overall TEXT,
+    agent_tone TEXT,
+    agent_energy TEXT,
+    agent_clarity TEXT,
+    agent_patience TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_log_created_at ON conversations_log (created_at);
+CREATE INDEX IF NOT EXISTS idx_conversations_log_agent_sender ON conversations_log (agent_sender);
+
+CREATE TABLE IF NOT EXISTS conversation_analysis (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    conversation_id UUID NOT NULL REFERENCES conversations_log (id),
+    opening_score NUMERIC,
+    listening_score NUMERIC,
+    empathy_score NUMERIC,
+    response_process_score NUMERIC,
+    system_updation_score NUMERIC,
+    closing_score NUMERIC,
+    opening_justification TEXT,
+    listening_justification TEXT,
+    empathy_justification TEXT,
+    response_process_justification TEXT,
+    system_updation_justification TEXT,
+    closing_justification TEXT,
+    total_weighted_score NUMERIC,
+    final_percentage_score NUMERIC,
+    conversation_score_ai NUMERIC,
+    process_score_human NUMERIC,
+    other_criteria_score_human NUMERIC,
+    final_score_combined NUMERIC,
+    customer_sentiment_label TEXT,
+    customer_sentiment_start TEXT,
+    customer_sentiment_end TEXT,
+    main_topic TEXT,
+    strengths TEXT,
+    areas_for_improvement TEXT,
+    review_status analysis_review_status NOT NULL DEFAULT 'pending_review',
+    weights_snapshot JSONB
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversation_analysis_conversation_id ON conversation_analysis (conversation_id);
+CREATE INDEX IF NOT EXISTS idx_conversation_analysis_created_at ON conversation_analysis (created_at);
+
+CREATE TABLE IF NOT EXISTS conversation_review_human (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    analysis_id UUID NOT NULL UNIQUE REFERENCES conversation_analysis (id),
+    reviewer_id UUID REFERENCES qc_users (id),
+    opening_score_override NUMERIC,
+    listening_score_override NUMERIC,
+    empathy_score_override NUMERIC,
+    response_process_score_override NUMERIC,
+    system_updation_score_override NUMERIC,
+    closing_score_override NUMERIC,
+    opening_justification_override TEXT,
+    listening_justification_override TEXT,
+    empathy_justification_override TEXT,
+    response_process_justification_override TEXT,
+    system_updation_justification_override TEXT,
+    closing_justification_override TEXT,
+    strengths_override TEXT,
+    areas_for_improvement_override TEXT,
+    total_weighted_score_human NUMERIC,
+    final_percentage_score_human NUMERIC,
+    other_criteria_weighted_score_human NUMERIC,
+    other_criteria_percentage_score_human NUMERIC,
+    weights_snapshot JSONB,
+    max_possible_overall_score NUMERIC
+);
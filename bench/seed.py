@@ -0,0 +1,301 @@
+"""
+Seed a local Postgres with a realistic synthetic QC dataset
+
+    python -m bench.seed --calls 50000 --agents 40 --reset
+
+Connection settings come from the usual POSTGRES_* environment / .env. The
+seeder refuses to touch a non-local host unless --force is given.
+
+Creates the base schema (bench/schema.sql), applies migrations/ in order, then
+bulk-loads qc_users, qc_settings, conversations_log, conversation_analysis and
+conversation_review_human with COPY. All randomness is seeded so the same
+arguments always produce the same dataset.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_settings
+from database import get_db_connection
+
+settings = get_settings()
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Applied in this order on top of bench/schema.sql
+MIGRATIONS = [
+    'migrations/add_completed_to_review_status.sql',
+    'migrations/add_review_claims.sql',
+    'migrations/add_change_notifications.sql',
+    'migrations/add_analysis_jobs.sql',
+    'migrations/add_agent_directory.sql',
+    'migrations/add_agent_daily_stats.sql',
+    'migrations/add_score_histograms.sql',
+    'migrations/add_transcript_search.sql',
+    'migrations/add_feedback_search.sql',
+    'migrations/add_bulk_ingest.sql',
+    'migrations/add_silence_intervals.sql',
+]
+
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1', 'postgres'}
+
+WEIGHTS = {"opening": 2, "listening": 12, "empathy": 10, "responseProcess": 15, "systemUpdation": 12, "closing": 4}
+WEIGHTS_SNAPSHOT = {"opening": 2, "listening": 12, "empathy": 10, "response_process": 15, "system_updation": 12, "closing": 4}
+MAX_SCORE = 4
+CRITERIA = ['opening', 'listening', 'empathy', 'response_process', 'system_updation', 'closing']
+
+WORDS = (
+    "سلام وقت بخیر ممنون سفارش پیگیری ارسال مرسوله کد رهگیری بسته غرفه فروشنده خریدار "
+    "مرجوعی بازگشت وجه کیف پول پرداخت تراکنش حساب کاربری رمز عبور پیامک تایید تاخیر "
+    "تحویل آدرس پستی شماره تماس مشکل شکایت درخواست بررسی همکاران واحد مالی پشتیبانی "
+    "لطفا صبر کنید الان چک می‌کنم متاسفانه حتما بله خیر امروز فردا هفته آینده تخفیف کد "
+    "محصول کیفیت آسیب دیده جایگزین لغو سفارش ثبت شد انجام شد خداحافظ روز خوبی داشته باشید"
+).split()
+
+TOPICS = [
+    "پیگیری سفارش", "مرجوعی کالا", "بازگشت وجه", "مشکل پرداخت", "تاخیر ارسال",
+    "تغییر آدرس", "لغو سفارش", "شکایت از فروشنده", "کد تخفیف", "حساب کاربری",
+]
+
+FEEDBACK = [
+    "احوالپرسی مناسب بود", "به صحبت مشتری به خوبی گوش داد", "همدلی کافی نشان نداد",
+    "فرایند پاسخگویی طولانی بود", "ثبت در سیستم انجام نشد", "خداحافظی کامل نبود",
+    "اطلاعات نادرست به مشتری داده شد", "سکوت طولانی در میانه تماس", "پیگیری مناسب انجام شد",
+]
+
+SENTIMENTS = ['positive', 'neutral', 'negative']
+
+
+def _rows_to_csv(rows) -> io.StringIO:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if v is None else v for v in row])
+    buffer.seek(0)
+    return buffer
+
+
+def _copy(conn, table: str, columns, rows):
+    if not rows:
+        return
+    with conn.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+            _rows_to_csv(rows)
+        )
+
+
+def _run_sql_file(conn, path: str, schema: str = None):
+    with open(os.path.join(ROOT, path), 'r', encoding='utf-8') as f:
+        sql = f.read()
+    if schema:
+        # psql-style :schema variable
+        sql = re.sub(r':schema\b', schema, sql)
+    with conn.cursor() as cursor:
+        cursor.execute(sql)
+    conn.commit()
+    print(f"  applied {path}")
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _transcript(rng: random.Random, turns: int, words_per_turn: int):
+    t = 0.0
+    messages = []
+    for i in range(turns):
+        duration = rng.uniform(2, 12)
+        messages.append({
+            "role": "agent" if i % 2 == 0 else "customer",
+            "text": _sentence(rng, max(1, int(rng.gauss(words_per_turn, words_per_turn / 3)))),
+            "start": round(t, 2),
+            "end": round(t + duration, 2),
+        })
+        t += duration + rng.uniform(0, 3)
+    return messages, t
+
+
+def _silence(rng: random.Random, total_duration: float):
+    gaps = []
+    t = rng.uniform(0, 10)
+    while t < total_duration - 5:
+        length = rng.expovariate(1 / 3.0)
+        if rng.random() < 0.05:
+            length += rng.uniform(10, 40)
+        end = min(t + length, total_duration)
+        gaps.append({"start": round(t, 2), "end": round(end, 2), "duration": round(end - t, 2)})
+        t = end + rng.uniform(5, 40)
+    return gaps
+
+
+def seed(args):
+    rng = random.Random(args.seed)
+
+    if settings.POSTGRES_HOST not in LOCAL_HOSTS and not args.force:
+        sys.exit(f"Refusing to seed non-local host {settings.POSTGRES_HOST} (use --force)")
+
+    conn = get_db_connection()
+    try:
+        if args.reset:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {settings.POSTGRES_SCHEMA} CASCADE")
+            conn.commit()
+            print(f"Dropped schema {settings.POSTGRES_SCHEMA}")
+
+        print("Applying schema and migrations...")
+        _run_sql_file(conn, 'bench/schema.sql', schema=settings.POSTGRES_SCHEMA)
+        for path in MIGRATIONS:
+            _run_sql_file(conn, path)
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {settings.POSTGRES_SCHEMA}, public")
+
+        # Users: reviewers plus an admin
+        reviewers = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(args.reviewers)]
+        users = [(uid, f"reviewer{i + 1}", "password", f"ناظر {i + 1}", "qc", True) for i, uid in enumerate(reviewers)]
+        users.append((str(uuid.UUID(int=rng.getrandbits(128))), "admin", "password", "مدیر سیستم", "admin", True))
+        _copy(conn, 'qc_users', ['id', 'username', 'password_hash', 'full_name', 'role', 'is_active'], users)
+
+        _copy(conn, 'qc_settings', ['setting_key', 'setting_value', 'updated_by'], [
+            ('weights', json.dumps(WEIGHTS), 'seed'),
+            ('max_score_per_metric', json.dumps(MAX_SCORE), 'seed'),
+        ])
+
+        # Agents differ in skill so leaderboards and distributions have shape
+        agents = [str(1000 + i) for i in range(1, args.agents + 1)]
+        skill = {agent: rng.uniform(1.8, 3.6) for agent in agents}
+        agent_weights = [rng.paretovariate(1.5) for _ in agents]
+
+        now = datetime.now(timezone.utc)
+        counts = {'calls': 0, 'analyses': 0, 'reviews': 0}
+
+        for chunk_start in range(0, args.calls, args.chunk_size):
+            chunk = range(chunk_start, min(chunk_start + args.chunk_size, args.calls))
+            calls, analyses, reviews = [], [], []
+
+            for n in chunk:
+                call_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                agent = rng.choices(agents, weights=agent_weights)[0]
+                created_at = now - timedelta(seconds=rng.uniform(0, args.days * 86400))
+                turns = max(2, int(rng.gauss(args.turns, args.turns / 3)))
+                transcript, duration = _transcript(rng, turns, args.words_per_turn)
+                gaps = _silence(rng, duration)
+                total_silence = sum(g['duration'] for g in gaps)
+                analyzed = rng.random() < args.analyzed_ratio
+                reviewed = analyzed and rng.random() < args.review_ratio
+
+                calls.append((
+                    call_id, created_at.isoformat(), f"{created_at.timestamp():.7f}.{n}", agent, analyzed,
+                    'completed' if reviewed else None,
+                    json.dumps(transcript, ensure_ascii=False), round(duration, 2), round(total_silence, 2),
+                    round(max((g['duration'] for g in gaps), default=0), 2),
+                    round(100 * total_silence / duration, 2) if duration else 0,
+                    json.dumps(gaps), rng.choice(SENTIMENTS),
+                    rng.choice(['calm', 'friendly', 'neutral', 'tense']), rng.choice(['low', 'medium', 'high']),
+                    rng.choice(['clear', 'unclear']), rng.choice(['patient', 'impatient']),
+                ))
+
+                if not analyzed:
+                    continue
+
+                analysis_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                scores = {c: max(0, min(MAX_SCORE, round(rng.gauss(skill[agent], 0.8)))) for c in CRITERIA}
+                weighted = sum(scores[c] * WEIGHTS_SNAPSHOT[c] for c in CRITERIA)
+                max_total = MAX_SCORE * sum(WEIGHTS_SNAPSHOT.values())
+                percentage = round(100 * weighted / max_total, 2)
+                status = rng.choice(['completed', 'review_completed']) if reviewed else 'pending_review'
+                start_sentiment = rng.choices(SENTIMENTS, weights=[2, 3, 2])[0]
+
+                analyses.append((
+                    analysis_id, (created_at + timedelta(minutes=rng.uniform(1, 30))).isoformat(), call_id,
+                    *[scores[c] for c in CRITERIA],
+                    *[_sentence(rng, 15) for _ in CRITERIA],
+                    weighted, percentage, percentage, round(rng.uniform(50, 100), 2), round(rng.uniform(50, 100), 2),
+                    percentage,
+                    rng.choice(SENTIMENTS), start_sentiment, rng.choices(SENTIMENTS, weights=[4, 3, 1])[0],
+                    rng.choice(TOPICS), rng.choice(FEEDBACK), rng.choice(FEEDBACK), status,
+                    json.dumps(WEIGHTS_SNAPSHOT),
+                ))
+                counts['analyses'] += 1
+
+                if not reviewed:
+                    continue
+
+                overrides = {c: max(0, min(MAX_SCORE, scores[c] + rng.choice([-1, 0, 0, 0, 1]))) for c in CRITERIA}
+                weighted_human = sum(overrides[c] * WEIGHTS_SNAPSHOT[c] for c in CRITERIA)
+                reviews.append((
+                    str(uuid.UUID(int=rng.getrandbits(128))), analysis_id, rng.choice(reviewers),
+                    *[overrides[c] for c in CRITERIA],
+                    *[rng.choice(FEEDBACK) if rng.random() < 0.5 else None for _ in CRITERIA],
+                    rng.choice(FEEDBACK), rng.choice(FEEDBACK),
+                    weighted_human, round(100 * weighted_human / max_total, 2), weighted_human, round(100 * weighted_human / max_total, 2),
+                    json.dumps(WEIGHTS_SNAPSHOT), max_total,
+                ))
+                counts['reviews'] += 1
+
+            _copy(conn, 'conversations_log', [
+                'id', 'created_at', 'unique_id', 'agent_sender', 'is_analyzed', 'qc_status',
+                'conversation_data', 'total_duration_seconds', 'total_silence_seconds',
+                'longest_silence_gap_seconds', 'silence_percentage', 'silence_timeline',
+                'user_sentiment_overall', 'agent_tone', 'agent_energy', 'agent_clarity', 'agent_patience',
+            ], calls)
+            _copy(conn, 'conversation_analysis', [
+                'id', 'created_at', 'conversation_id',
+                *[f"{c}_score" for c in CRITERIA], *[f"{c}_justification" for c in CRITERIA],
+                'total_weighted_score', 'final_percentage_score', 'conversation_score_ai',
+                'process_score_human', 'other_criteria_score_human', 'final_score_combined',
+                'customer_sentiment_label', 'customer_sentiment_start', 'customer_sentiment_end',
+                'main_topic', 'strengths', 'areas_for_improvement', 'review_status', 'weights_snapshot',
+            ], analyses)
+            _copy(conn, 'conversation_review_human', [
+                'id', 'analysis_id', 'reviewer_id',
+                *[f"{c}_score_override" for c in CRITERIA], *[f"{c}_justification_override" for c in CRITERIA],
+                'strengths_override', 'areas_for_improvement_override',
+                'total_weighted_score_human', 'final_percentage_score_human',
+                'other_criteria_weighted_score_human', 'other_criteria_percentage_score_human',
+                'weights_snapshot', 'max_possible_overall_score',
+            ], reviews)
+            conn.commit()
+
+            counts['calls'] += len(calls)
+            print(f"  {counts['calls']}/{args.calls} calls, {counts['analyses']} analyses, {counts['reviews']} reviews")
+
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        conn.commit()
+
+        print(f"Seeded {counts['calls']} calls, {counts['analyses']} analyses, {counts['reviews']} reviews, "
+              f"{len(agents)} agents, {len(users)} users")
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a local database with synthetic QC data")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--agents", type=int, default=30)
+    parser.add_argument("--reviewers", type=int, default=5)
+    parser.add_argument("--days", type=int, default=60, help="Spread calls over the last N days")
+    parser.add_argument("--turns", type=int, default=24, help="Mean transcript turns per call")
+    parser.add_argument("--words-per-turn", type=int, default=12)
+    parser.add_argument("--analyzed-ratio", type=float, default=0.85)
+    parser.add_argument("--review-ratio", type=float, default=0.3, help="Fraction of analyses with a human review")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate the schema first")
+    parser.add_argument("--force", action="store_true", help="Allow seeding a non-local host")
+    seed(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -12,9 +12,27 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "PGbackofficeDDDDakfj9123jdmkkkbAckBack"
     POSTGRES_SCHEMA: str = "call"
 
+    # Read replicas (JSON list of hosts); read-only endpoints are routed here
+    POSTGRES_REPLICA_HOSTS: list = []
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # Fall back to primary beyond this lag
+    REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 10.0
+
+    # Connection pool (per host, per worker process)
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_POOL_CHECKOUT_TIMEOUT_SECONDS: float = 10.0
+    DB_MAX_TOTAL_CONNECTIONS: int = 0  # Per host for the whole pod; 0 = no cap. Pools shrink to fit WEB_WORKERS
+
+    # Serving (see gunicorn.conf.py)
+    WEB_WORKERS: int = 1  # Processes serving this pod; exported by gunicorn.conf.py
+    WEB_MAX_WORKERS: int = 8  # Upper bound when workers are derived from the CPU quota
+    WORKER_MAX_REQUESTS: int = 20000  # Recycle a worker after this many requests; 0 = never
+    WORKER_MAX_REQUESTS_JITTER: int = 2000
+
     # API Configuration
     API_HOST: str = "0.0.0.0"
     API_PORT: int = 8000
+    API_RELOAD: bool = False  # Auto-reload for `python main.py` during development
 
     # CORS Configuration
     CORS_ORIGINS: list = [
@@ -28,9 +46,84 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = "your-secret-key-change-this-in-production"
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
+    JWT_VERIFIED_CACHE_SIZE: int = 4096
+    JWT_REVOCATION_REFRESH_SECONDS: float = 30.0  # Deactivated users lose access within this window
+    AUTH_REQUIRED: bool = False  # Require a bearer token on all data routes (see security.py)
+
+    # Passwords (see passwords.py)
+    BCRYPT_ROUNDS: int = 12  # Existing hashes with another cost are rehashed on next login
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Beyond this, hashing requests get 503 + Retry-After
+    LOGIN_RATE_WINDOW_SECONDS: float = 300.0
+    LOGIN_MAX_FAILURES_PER_USER: int = 5  # Beyond this, attempts are delayed 1s, 2s, 4s, ... (no lockout)
+    LOGIN_MAX_DELAY_SECONDS: float = 10.0
+    LOGIN_MAX_FAILURES_PER_IP: int = 30  # Failed logins per client IP before 429
+    # Proxies whose X-Forwarded-For is trusted for the client IP (uvicorn/gunicorn
+    # forwarded_allow_ips); the pod is only reached through the ingress
+    FORWARDED_ALLOW_IPS: str = "*"
+
+    # Query budgets and admission control (see admission.py)
+    INTERACTIVE_STATEMENT_TIMEOUT_MS: int = 5000
+    ANALYTICS_STATEMENT_TIMEOUT_MS: int = 15000
+    ANALYTICS_MAX_CONCURRENT: int = 4  # Keep below DB_POOL_MAX_SIZE to reserve connections for reviewers
+    ANALYTICS_MAX_QUEUE: int = 8
+    ANALYTICS_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    ANALYTICS_RETRY_AFTER_SECONDS: int = 5
+
+    # Review work queue (POST /reviews/claim)
+    REVIEW_CLAIM_LEASE_SECONDS: int = 900
+    REVIEW_CLAIM_MAX_BATCH: int = 50
+
+    # Change events (GET /events/stream, fed by LISTEN/NOTIFY)
+    EVENTS_ENABLED: bool = True
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+    EVENTS_RETRY_MS: int = 5000
+    EVENTS_SUBSCRIBER_QUEUE_SIZE: int = 100
+
+    # Batch analysis dispatcher (n8n webhook, see analysis_dispatcher.py)
+    ANALYSIS_DISPATCH_ENABLED: bool = True
+    ANALYSIS_WEBHOOK_URL: str = "https://n8n.basalam.dev/webhook/analysis"
+    ANALYSIS_WEBHOOK_METHOD: str = "GET"
+    ANALYSIS_WEBHOOK_TIMEOUT_SECONDS: float = 30.0
+    ANALYSIS_DISPATCH_CONCURRENCY: int = 4
+    ANALYSIS_DISPATCH_RATE_PER_SECOND: float = 2.0  # Per pod, split across WEB_WORKERS
+    ANALYSIS_DISPATCH_MAX_ATTEMPTS: int = 5
+    ANALYSIS_DISPATCH_BACKOFF_SECONDS: float = 5.0
+    ANALYSIS_DISPATCH_BACKOFF_MAX_SECONDS: float = 300.0
+    ANALYSIS_DISPATCH_POLL_SECONDS: float = 2.0
+    ANALYSIS_JOB_LEASE_SECONDS: int = 120
+    ANALYSIS_BATCH_MAX_IDS: int = 10000
+
+    # Bulk ingestion (POST /ingest/*, see ingest.py)
+    INGEST_MAX_ROWS: int = 50000
+    INGEST_MAX_BODY_MB: int = 512
+    INGEST_STATEMENT_TIMEOUT_MS: int = 300000
+
+    # Caches
+    AGENTS_CACHE_TTL_SECONDS: float = 300.0
+    DETAIL_CACHE_SIZE: int = 500  # Conversation detail rows (with transcript), see conversation_detail.py
+    DETAIL_CACHE_TTL_SECONDS: float = 300.0
+    DETAIL_BATCH_MAX_IDS: int = 200  # /conversations/analyzed/batch
+    AGENT_PROFILE_CACHE_SIZE: int = 500  # (agent, window) entries, see /agents/{agent_sender}/profile
+    AGENT_PROFILE_CACHE_TTL_SECONDS: float = 120.0  # Also bounds how stale a rank can be
+
+    # Startup / shutdown (see lifecycle.py)
+    WARMUP_RETRY_SECONDS: float = 2.0
+    SHUTDOWN_DRAIN_SECONDS: float = 20.0  # Keep below the server's graceful-shutdown timeout
+
+    # Probes (see health.py); state is cached, probes never open connections
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
+    HEALTH_DEEP_CHECK: bool = True  # SELECT 1 on a pooled connection when idle for an interval
+
+    # Benchmarking: add X-DB-Queries / X-DB-Time-Ms headers to every response
+    EXPOSE_DB_STATS: bool = False
 
-    # Logging Configuration
+    # Logging Configuration (see logging_setup.py)
     LOG_LEVEL: str = "INFO"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
+    LOG_FORMAT: str = "json"  # json, text
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped instead of blocking requests
+    LOG_SAMPLE_RATES: dict = {"access": 0.05}  # logger name -> fraction of INFO/DEBUG records kept
+    LOG_SLOW_REQUEST_MS: int = 1000  # Slower requests are always logged (WARNING)
 
     model_config = SettingsConfigDict(
         env_file=".env",
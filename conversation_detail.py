@@ -0,0 +1,219 @@
+"""
+Shared loader for the single-conversation detail row
+
+The ca + cl + crh + qu join (with the transcript) backs /conversations/analyzed/{id},
+/comparison/conversation/{id} and, with a list filter, /reviews/completed.
+Single rows are kept in a bounded LRU keyed by analysis_id, so a reviewer
+reopening a conversation does not re-run the join; concurrent loads of the same
+id share one query (single-flight).
+
+Entries are invalidated when this process writes the analysis (submit_review,
+claims) and on change events from other pods (analysis_* / review_submitted).
+A freshly invalidated id is read from the primary for REPLICA_MAX_LAG_SECONDS,
+so a replica that has not caught up cannot put the old row back in the cache.
+Cached rows are shared: callers must copy before modifying.
+"""
+import threading
+from typing import Dict, List, Optional
+
+from cache import TTLCache
+from config import get_settings
+from database import execute_query
+from events import broker
+
+settings = get_settings()
+
+DETAIL_COLUMNS = """
+    ca.*,
+    cl.conversation_data,
+    cl.agent_sender,
+    cl.unique_id,
+    cl.total_duration_seconds,
+    cl.total_silence_seconds,
+    cl.longest_silence_gap_seconds,
+    cl.silence_percentage,
+    cl.silence_timeline,
+    cl.user_sentiment_overall,
+    cl.agent_tone,
+    cl.agent_energy,
+    cl.agent_clarity,
+    cl.agent_patience,
+    crh.id as human_review_id,
+    crh.opening_score_override,
+    crh.listening_score_override,
+    crh.empathy_score_override,
+    crh.response_process_score_override,
+    crh.system_updation_score_override,
+    crh.closing_score_override,
+    crh.opening_justification_override,
+    crh.listening_justification_override,
+    crh.empathy_justification_override,
+    crh.response_process_justification_override,
+    crh.system_updation_justification_override,
+    crh.closing_justification_override,
+    crh.strengths_override,
+    crh.areas_for_improvement_override,
+    crh.total_weighted_score_human,
+    crh.final_percentage_score_human,
+    crh.other_criteria_weighted_score_human,
+    crh.other_criteria_percentage_score_human,
+    crh.reviewer_id,
+    qu.full_name as reviewer_full_name,
+    qu.username as reviewer_username,
+    cl.created_at as created_at
+"""
+
+DETAIL_FROM = """
+    FROM conversation_analysis ca
+    INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+    LEFT JOIN conversation_review_human crh ON ca.id = crh.analysis_id
+    LEFT JOIN qc_users qu ON crh.reviewer_id = qu.id
+"""
+
+# Append a WHERE clause (and ORDER BY) for list queries
+DETAIL_SELECT = f"SELECT {DETAIL_COLUMNS} {DETAIL_FROM}"
+
+# The bulk of each row; list and batch callers can leave them out
+TRANSCRIPT_COLUMNS = ("conversation_data", "silence_timeline")
+
+DETAIL_COLUMNS_LIGHT = ",".join(
+    column for column in DETAIL_COLUMNS.split(",") if column.strip().split(".")[-1] not in TRANSCRIPT_COLUMNS
+)
+DETAIL_SELECT_LIGHT = f"SELECT {DETAIL_COLUMNS_LIGHT} {DETAIL_FROM}"
+
+
+# silence_timeline replaced by its packed form, the silence_ms INT[] of
+# [start, end, ...] milliseconds (migrations/add_silence_intervals.sql)
+DETAIL_SELECT_PACKED = DETAIL_SELECT.replace("cl.silence_timeline,", "cl.silence_ms,")
+
+
+def detail_select(include_transcript: bool = True, packed_silence: bool = False) -> str:
+    if not include_transcript:
+        return DETAIL_SELECT_LIGHT
+    return DETAIL_SELECT_PACKED if packed_silence else DETAIL_SELECT
+
+_cache = TTLCache(maxsize=settings.DETAIL_CACHE_SIZE, ttl=settings.DETAIL_CACHE_TTL_SECONDS)
+
+# analysis_id -> True while replicas may still serve the pre-write row
+_recent_writes = TTLCache(maxsize=10000, ttl=settings.REPLICA_MAX_LAG_SECONDS)
+
+
+class _Load:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.stale = False
+
+
+_loads = {}
+_loads_lock = threading.Lock()
+# Bumped on every invalidation; a batch load only caches if it did not change meanwhile
+_generation = 0
+
+
+def _query(analysis_id: str) -> Optional[dict]:
+    read_only = _recent_writes.get(analysis_id) is None
+    return execute_query(f"{DETAIL_SELECT} WHERE ca.id = %s", (analysis_id,), fetch_one=True, read_only=read_only)
+
+
+def load(analysis_id: str) -> Optional[dict]:
+    """Detail row for an analysis, or None if it does not exist (misses are not cached)"""
+    analysis_id = str(analysis_id).lower()
+    row = _cache.get(analysis_id)
+    if row is not None:
+        return row
+
+    with _loads_lock:
+        current = _loads.get(analysis_id)
+        leader = current is None
+        if leader:
+            current = _loads[analysis_id] = _Load()
+
+    if not leader:
+        current.done.wait()
+        if current.error is not None:
+            raise current.error
+        return current.result
+
+    try:
+        current.result = _query(analysis_id)
+        with _loads_lock:
+            # An invalidation during the query means the row may predate the write
+            if current.result is not None and not current.stale:
+                _cache.set(analysis_id, current.result)
+        return current.result
+    except Exception as e:
+        current.error = e
+        raise
+    finally:
+        with _loads_lock:
+            if _loads.get(analysis_id) is current:
+                del _loads[analysis_id]
+        current.done.set()
+
+
+def load_many(analysis_ids: List[str], include_transcript: bool = True) -> Dict[str, dict]:
+    """
+    Detail rows keyed by lowercased analysis_id, for the ids that exist
+
+    Cached rows are reused and the rest come from one ANY(...) query. Without
+    the transcript, cached rows are returned as trimmed copies and fetched rows
+    (which lack those columns) are not cached.
+    """
+    found = {}
+    misses = []
+    for analysis_id in analysis_ids:
+        analysis_id = str(analysis_id).lower()
+        row = _cache.get(analysis_id)
+        if row is None:
+            misses.append(analysis_id)
+        elif include_transcript:
+            found[analysis_id] = row
+        else:
+            found[analysis_id] = {k: v for k, v in row.items() if k not in TRANSCRIPT_COLUMNS}
+
+    if misses:
+        with _loads_lock:
+            generation = _generation
+        read_only = not any(_recent_writes.get(analysis_id) for analysis_id in misses)
+        rows = execute_query(
+            f"{detail_select(include_transcript)} WHERE ca.id = ANY(%s::uuid[])",
+            (misses,), fetch_all=True, read_only=read_only
+        ) or []
+        with _loads_lock:
+            cacheable = include_transcript and generation == _generation
+            for row in rows:
+                analysis_id = str(row['id']).lower()
+                found[analysis_id] = row
+                if cacheable:
+                    _cache.set(analysis_id, row)
+
+    return found
+
+
+def invalidate(analysis_id: str):
+    """Drop the cached row; loads already running are not cached and new callers query again"""
+    global _generation
+    analysis_id = str(analysis_id).lower()
+    _recent_writes.set(analysis_id, True)
+    with _loads_lock:
+        _generation += 1
+        current = _loads.pop(analysis_id, None)
+        if current is not None:
+            current.stale = True
+    _cache.invalidate(analysis_id)
+
+
+def stats() -> dict:
+    return _cache.stats
+
+
+def _on_event(event: dict):
+    if event.get('type') == 'resync':
+        _cache.clear()
+    elif event.get('analysis_id') is not None:
+        invalidate(event['analysis_id'])
+
+
+broker.add_handler(_on_event)
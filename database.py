@@ -1,30 +1,85 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import NamedTupleCursor, RealDictCursor
+import psycopg2.pool
+from psycopg2.pool import ThreadedConnectionPool
 from contextlib import contextmanager
 from config import get_settings
+import contextvars
+import itertools
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+# Connection pools keyed by host; created lazily on first checkout
+_pools = {}
+_pools_lock = threading.Lock()
 
-def get_db_connection():
-    """Create and return a database connection"""
+# Replica lag bookkeeping: host -> (checked_at, lag_seconds or None if unreachable)
+_replica_lag = {}
+_replica_lag_lock = threading.Lock()
+_replica_cycle = itertools.count()
+
+# Outcome of checkouts per host, read by health.py: host -> {last_success, last_failure, last_error}
+_host_health = {}
+
+# statement_timeout (ms) applied to every checkout made while handling the current request
+statement_timeout_ms = contextvars.ContextVar("statement_timeout_ms", default=None)
+
+
+class QueryStats:
+    """Per-request database round-trip counter (shared across threads via the context)"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+    def record(self, elapsed: float):
+        self.queries += 1
+        self.db_time += elapsed
+
+
+query_stats = contextvars.ContextVar("query_stats", default=None)
+
+
+def _record_query(started: float):
+    stats = query_stats.get()
+    if stats is not None:
+        stats.record(time.perf_counter() - started)
+
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+def _connection_kwargs(host: str) -> dict:
+    return dict(
+        host=host,
+        port=settings.POSTGRES_PORT,
+        database=settings.POSTGRES_DATABASE,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        options=f'-c search_path={settings.POSTGRES_SCHEMA},public',
+        connect_timeout=10
+    )
+
+
+def get_db_connection(host: str = None):
+    """Create and return a standalone (unpooled) database connection"""
+    host = host or settings.POSTGRES_HOST
     try:
-        logger.debug(f"Attempting to connect to database: {settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DATABASE}")
-
-        conn = psycopg2.connect(
-            host=settings.POSTGRES_HOST,
-            port=settings.POSTGRES_PORT,
-            database=settings.POSTGRES_DATABASE,
-            user=settings.POSTGRES_USER,
-            password=settings.POSTGRES_PASSWORD,
-            options=f'-c search_path={settings.POSTGRES_SCHEMA},public',
-            connect_timeout=10
-        )
-
-        logger.info(f"Database connection established: {settings.POSTGRES_HOST}/{settings.POSTGRES_DATABASE}")
+        logger.debug("Attempting to connect to database: %s:%s/%s", host, settings.POSTGRES_PORT, settings.POSTGRES_DATABASE)
+
+        conn = psycopg2.connect(**_connection_kwargs(host))
+
+        logger.info(f"Database connection established: {host}/{settings.POSTGRES_DATABASE}")
         return conn
 
     except psycopg2.OperationalError as e:
@@ -38,47 +93,270 @@ def get_db_connection():
         raise
 
 
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """ThreadedConnectionPool that waits for a free connection instead of raising PoolError"""
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=settings.DB_POOL_CHECKOUT_TIMEOUT_SECONDS):
+            raise psycopg2.pool.PoolError("connection pool exhausted (checkout timed out)")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
+def pool_max_size() -> int:
+    """DB_POOL_MAX_SIZE, reduced so the pod's WEB_WORKERS together stay within DB_MAX_TOTAL_CONNECTIONS"""
+    size = settings.DB_POOL_MAX_SIZE
+    if settings.DB_MAX_TOTAL_CONNECTIONS > 0:
+        # Each worker also holds one unpooled LISTEN connection for events
+        per_worker = settings.DB_MAX_TOTAL_CONNECTIONS // max(settings.WEB_WORKERS, 1)
+        size = min(size, per_worker - (1 if settings.EVENTS_ENABLED else 0))
+    return max(size, 1)
+
+
+def _get_pool(host: str) -> BlockingConnectionPool:
+    """Return the connection pool for a host, creating it on first use"""
+    pool = _pools.get(host)
+    if pool is not None:
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(host)
+        if pool is None:
+            max_size = pool_max_size()
+            logger.info(f"Creating connection pool for {host} (max {max_size})")
+            pool = BlockingConnectionPool(
+                min(settings.DB_POOL_MIN_SIZE, max_size),
+                max_size,
+                **_connection_kwargs(host)
+            )
+            _pools[host] = pool
+        return pool
+
+
+def _mark_host(host: str, error: Exception = None):
+    entry = _host_health.get(host)
+    if entry is None:
+        entry = _host_health.setdefault(host, {"last_success": None, "last_failure": None, "last_error": None})
+    if error is None:
+        entry["last_success"] = time.monotonic()
+    else:
+        entry["last_failure"] = time.monotonic()
+        entry["last_error"] = str(error)[:200]
+
+
+def _is_connection_error(error: Exception) -> bool:
+    # A cancelled statement (statement_timeout) is a query problem, not a database outage;
+    # PoolError (checkout timed out, pool closed) means this pod is saturated or stopping,
+    # and must not mark a healthy database as failing (readiness would drop every busy pod)
+    return (isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            and not isinstance(error, psycopg2.extensions.QueryCanceledError))
+
+
+def pool_stats() -> dict:
+    """Per-host pool occupancy and checkout outcome ages (seconds), without touching the database"""
+    now = time.monotonic()
+    stats = {}
+    for host in set(_pools) | set(_host_health):
+        pool = _pools.get(host)
+        health = _host_health.get(host, {})
+        stats[host] = {
+            # psycopg2 pools keep checked-out connections in _used and idle ones in _pool
+            "max": pool.maxconn if pool else None,
+            "in_use": len(pool._used) if pool else 0,
+            "idle": len(pool._pool) if pool else 0,
+            "last_success_age": now - health["last_success"] if health.get("last_success") else None,
+            "last_failure_age": now - health["last_failure"] if health.get("last_failure") else None,
+            "last_error": health.get("last_error"),
+        }
+    return stats
+
+
+def close_pools():
+    """Close every connection pool (used on shutdown)"""
+    with _pools_lock:
+        for host, pool in _pools.items():
+            try:
+                pool.closeall()
+                logger.info(f"Connection pool closed: {host}")
+            except Exception as e:
+                logger.warning(f"Error closing pool for {host}: {e}")
+        _pools.clear()
+
+
+def warm_pools():
+    """Open the primary pool (raises if unreachable) and probe replicas so the first requests skip connection setup"""
+    try:
+        pool = _get_pool(settings.POSTGRES_HOST)
+        conn = pool.getconn()
+    except Exception as e:
+        _mark_host(settings.POSTGRES_HOST, e)
+        raise
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+    finally:
+        pool.putconn(conn, close=conn.closed != 0)
+    _mark_host(settings.POSTGRES_HOST)
+
+    for host in settings.POSTGRES_REPLICA_HOSTS:
+        _replica_is_usable(host)
+
+
+def _measure_replica_lag(host: str):
+    """Return replication lag in seconds for a replica, or None if it is unreachable"""
+    conn = None
+    pool = None
+    try:
+        pool = _get_pool(host)
+        conn = pool.getconn()
+        with conn.cursor() as cursor:
+            cursor.execute(REPLICA_LAG_QUERY)
+            lag = float(cursor.fetchone()[0] or 0)
+        conn.rollback()
+        return lag
+    except Exception as e:
+        logger.warning(f"Replica lag check failed for {host}: {e}")
+        return None
+    finally:
+        if conn is not None and pool is not None:
+            pool.putconn(conn, close=conn.closed != 0)
+
+
+def _replica_is_usable(host: str) -> bool:
+    """Check (at most once per interval) that a replica is reachable and within the lag budget"""
+    now = time.monotonic()
+    with _replica_lag_lock:
+        checked_at, lag = _replica_lag.get(host, (None, None))
+        stale = checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+        if stale:
+            # Claim the refresh so concurrent callers keep using the previous value
+            _replica_lag[host] = (now, lag)
+
+    if stale:
+        lag = _measure_replica_lag(host)
+        with _replica_lag_lock:
+            _replica_lag[host] = (time.monotonic(), lag)
+        if lag is not None and lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning(f"Replica {host} lagging {lag:.1f}s, routing reads to primary")
+
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+def _choose_host(read_only: bool) -> str:
+    """Pick the host for a checkout: a healthy replica for reads, otherwise the primary"""
+    replicas = settings.POSTGRES_REPLICA_HOSTS
+    if not read_only or not replicas:
+        return settings.POSTGRES_HOST
+
+    # Round-robin over replicas, skipping unreachable or lagging ones
+    start = next(_replica_cycle)
+    for i in range(len(replicas)):
+        host = replicas[(start + i) % len(replicas)]
+        if _replica_is_usable(host):
+            return host
+
+    return settings.POSTGRES_HOST
+
+
 @contextmanager
-def get_db():
-    """Context manager for database connection"""
+def get_db(read_only: bool = False):
+    """
+    Context manager for a pooled database connection
+
+    read_only=True routes the checkout to a replica (when configured and
+    within the lag budget); writes and read-your-writes paths use the primary.
+    The request's statement_timeout budget (if any) is applied to the transaction.
+    """
+    host = _choose_host(read_only)
+    pool = None
     conn = None
     try:
-        logger.debug("Getting database connection from context manager")
-        conn = get_db_connection()
+        logger.debug("Checking out connection from pool: %s", host)
+        # Creating the pool opens its first connection, so it can fail like a checkout
+        pool = _get_pool(host)
+        conn = pool.getconn()
+        timeout_ms = statement_timeout_ms.get()
+        if timeout_ms:
+            started = time.perf_counter()
+            with conn.cursor() as cursor:
+                cursor.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+            _record_query(started)
         yield conn
         conn.commit()
+        _mark_host(host)
         logger.debug("Database transaction committed")
     except Exception as e:
+        if _is_connection_error(e):
+            _mark_host(host, e)
         logger.error(f"Database transaction error: {str(e)}")
-        if conn:
+        if conn and not conn.closed:
             conn.rollback()
             logger.warning("Database transaction rolled back")
         raise e
     finally:
         if conn:
-            conn.close()
-            logger.debug("Database connection closed")
+            # Discard broken connections instead of returning them to the pool
+            pool.putconn(conn, close=conn.closed != 0)
+            logger.debug("Database connection returned to pool")
+
+
+# Cursor per result row type; RealDictRow is already a dict, so rows are returned as built
+ROW_CURSORS = {
+    'dict': RealDictCursor,
+    'tuple': None,
+    'namedtuple': NamedTupleCursor,
+}
 
 
-def execute_query(query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = True):
-    """Execute a SQL query and return results"""
-    logger.debug(f"Executing query: {query[:100]}... with params: {params}")
+def _row_cursor(row_type: str):
+    if row_type not in ROW_CURSORS:
+        raise ValueError(f"Unknown row_type: {row_type}")
+    return ROW_CURSORS[row_type]
+
+
+def execute_query(query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = True,
+                  read_only: bool = False, row_type: str = 'dict'):
+    """
+    Execute a SQL query and return results
+
+    row_type picks the row representation: 'dict' (default, what routes return as
+    JSON), 'tuple' (cheapest; for code that unpacks positionally) or 'namedtuple'
+    (attribute access at tuple cost; serializes as a list, so not for responses).
+    """
+    logger.debug("Executing query: %.100s... with params: %s", query, params)
 
     try:
-        with get_db() as conn:
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+        with get_db(read_only=read_only) as conn:
+            with conn.cursor(cursor_factory=_row_cursor(row_type)) as cursor:
+                started = time.perf_counter()
                 cursor.execute(query, params)
+                _record_query(started)
 
                 if fetch_one:
-                    result = dict(cursor.fetchone()) if cursor.rowcount > 0 else None
-                    logger.debug(f"Query returned 1 row: {result is not None}")
+                    # description is None for statements without a result set
+                    result = cursor.fetchone() if cursor.description is not None else None
+                    logger.debug("Query returned 1 row: %s", result is not None)
                     return result
                 elif fetch_all:
-                    results = [dict(row) for row in cursor.fetchall()]
-                    logger.debug(f"Query returned {len(results)} rows")
+                    results = cursor.fetchall()
+                    logger.debug("Query returned %d rows", len(results))
                     return results
                 else:
-                    logger.debug(f"Query affected {cursor.rowcount} rows")
+                    logger.debug("Query affected %d rows", cursor.rowcount)
                     return cursor.rowcount
 
     except Exception as e:
@@ -86,20 +364,116 @@ def execute_query(query: str, params: tuple = None, fetch_one: bool = False, fet
         raise
 
 
+def iter_query(query: str, params: tuple = None, read_only: bool = True, row_type: str = 'dict',
+               chunk_size: int = 2000):
+    """
+    Yield rows of a large result from a server-side cursor, chunk_size at a time
+
+    The connection stays checked out until the generator is exhausted or closed,
+    so consume it promptly (or wrap it in contextlib.closing).
+    """
+    logger.debug("Iterating query: %.100s... with params: %s", query, params)
+
+    with get_db(read_only=read_only) as conn:
+        with conn.cursor(name=f"iter_{threading.get_ident()}_{time.monotonic_ns()}",
+                         cursor_factory=_row_cursor(row_type)) as cursor:
+            cursor.itersize = chunk_size
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            _record_query(started)
+
+            while True:
+                started = time.perf_counter()
+                rows = cursor.fetchmany(chunk_size)
+                _record_query(started)
+                yield from rows
+                if len(rows) < chunk_size:
+                    break
+
+
+# Postgres type OIDs fetched as float64 columns (NULL -> NaN): int2/4/8, float4/8, numeric
+_NUMERIC_OIDS = {20, 21, 23, 700, 701, 1700}
+
+
+def fetch_columns(query: str, params: tuple = None, dtypes: dict = None, read_only: bool = True,
+                  chunk_size: int = 10000) -> dict:
+    """
+    Execute a query and return {column: numpy array} instead of a list of row dicts
+
+    Rows are streamed from a server-side cursor in chunks of chunk_size tuples and
+    converted to arrays chunk by chunk, so no per-row dict is ever built and client
+    memory holds one chunk of tuples at a time. Numeric columns become float64
+    (cast in SQL when exactness matters); everything else is an object array unless
+    overridden in dtypes.
+    """
+    import numpy as np
+
+    logger.debug("Fetching columns: %.100s... with params: %s", query, params)
+
+    try:
+        with get_db(read_only=read_only) as conn:
+            with conn.cursor(name=f"columns_{threading.get_ident()}_{time.monotonic_ns()}") as cursor:
+                cursor.itersize = chunk_size
+                started = time.perf_counter()
+                cursor.execute(query, params)
+                _record_query(started)
+
+                chunks = None
+                names = None
+                column_dtypes = None
+                while True:
+                    started = time.perf_counter()
+                    rows = cursor.fetchmany(chunk_size)
+                    _record_query(started)
+
+                    if names is None:
+                        names = [column.name for column in cursor.description]
+                        column_dtypes = [
+                            (dtypes or {}).get(column.name, float if column.type_code in _NUMERIC_OIDS else object)
+                            for column in cursor.description
+                        ]
+                        chunks = [[] for _ in names]
+                    if not rows:
+                        break
+
+                    for index, values in enumerate(zip(*rows)):
+                        dtype = column_dtypes[index]
+                        # fromiter keeps list/dict values (json, arrays) as single objects
+                        chunks[index].append(
+                            np.fromiter(values, dtype=object, count=len(values)) if dtype is object
+                            else np.array(values, dtype=dtype)
+                        )
+                    if len(rows) < chunk_size:
+                        break
+
+                columns = {
+                    name: np.concatenate(parts) if parts else np.array([], dtype=column_dtypes[index])
+                    for index, (name, parts) in enumerate(zip(names, chunks))
+                }
+                logger.debug("Query returned %d rows as columns", len(next(iter(columns.values()), [])))
+                return columns
+
+    except Exception as e:
+        logger.error(f"Column fetch failed: {str(e)}")
+        raise
+
+
 def execute_procedure(proc_name: str, params: tuple = ()):
     """Execute a stored procedure"""
-    logger.debug(f"Executing procedure: {proc_name} with params: {params}")
+    logger.debug("Executing procedure: %s with params: %s", proc_name, params)
 
     try:
         with get_db() as conn:
             with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                started = time.perf_counter()
                 cursor.callproc(proc_name, params)
+                _record_query(started)
                 try:
-                    results = [dict(row) for row in cursor.fetchall()]
-                    logger.debug(f"Procedure returned {len(results)} rows")
+                    results = cursor.fetchall()
+                    logger.debug("Procedure returned %d rows", len(results))
                     return results
                 except:
-                    logger.debug(f"Procedure affected {cursor.rowcount} rows")
+                    logger.debug("Procedure affected %d rows", cursor.rowcount)
                     return cursor.rowcount
 
     except Exception as e:
@@ -21,83 +21,28 @@ echo "User: $(whoami)"
 echo "Python path: $(which python3)"
 echo "=========================================="
 
-# Test basic Python imports (don't test database connection)
-echo "Testing Python imports..."
-python3 << 'PYEOF'
-import sys
-import traceback
+# SERVER_MODE=gunicorn (default): one uvicorn worker per allotted CPU, see gunicorn.conf.py
+# SERVER_MODE=uvicorn: a single process
+SERVER_MODE="${SERVER_MODE:-gunicorn}"
 
-print(f"Python version: {sys.version}")
-print(f"Python executable: {sys.executable}")
-
-modules_to_test = [
-    ('fastapi', 'FastAPI'),
-    ('uvicorn', 'Uvicorn'),
-    ('psycopg2', 'PostgreSQL driver'),
-    ('pydantic', 'Pydantic'),
-]
-
-all_ok = True
-for module_name, description in modules_to_test:
-    try:
-        __import__(module_name)
-        print(f"✓ {description} ({module_name}) OK")
-    except ImportError as e:
-        print(f"✗ {description} ({module_name}) failed: {e}")
-        all_ok = False
-        sys.exit(1)
-
-# Test main app import
-try:
-    print("Testing main application import...")
-    from config import get_settings
-    print("✓ Config OK")
-
-    from main import app
-    print("✓ Main app OK")
-    print("✓ All imports successful!")
-except Exception as e:
-    print(f"✗ Main app import failed: {e}")
-    traceback.print_exc()
-    sys.exit(1)
-
-PYEOF
-
-if [ $? -ne 0 ]; then
-    echo "Import test failed. Exiting..."
-    exit 1
-fi
-
-echo "=========================================="
-echo "Starting Uvicorn server..."
 echo "=========================================="
-echo "Command: uvicorn main:app --host ${API_HOST:-0.0.0.0} --port ${API_PORT:-8000}"
+echo "Starting server (mode: ${SERVER_MODE})..."
 echo "Log level: ${LOG_LEVEL:-info}"
 echo "=========================================="
 
-# Trap signals
-trap 'echo "ENTRYPOINT: Received SIGTERM, shutting down..."; exit 0' SIGTERM
-trap 'echo "ENTRYPOINT: Received SIGINT, shutting down..."; exit 0' SIGINT
+# exec so the server is PID 1 and receives SIGTERM directly: it stops accepting,
+# lets in-flight requests finish (lifecycle.py drains) and closes the DB pools.
+# An import error still fails fast here, so no separate import test is run.
+if [ "${SERVER_MODE}" = "gunicorn" ]; then
+    exec gunicorn main:app -c gunicorn.conf.py
+fi
 
-# Start uvicorn with explicit error handling
-set +e
-python3 -m uvicorn main:app \
+exec python3 -m uvicorn main:app \
     --host "${API_HOST:-0.0.0.0}" \
     --port "${API_PORT:-8000}" \
-    --log-level "${LOG_LEVEL:-info}" \
-    --access-log \
+    --log-level "$(echo "${LOG_LEVEL:-info}" | tr '[:upper:]' '[:lower:]')" \
+    --timeout-graceful-shutdown "${GRACEFUL_SHUTDOWN_SECONDS:-25}" \
+    --proxy-headers \
+    --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-*}" \
+    --no-access-log \
     --no-use-colors
-EXIT_CODE=$?
-set -e
-
-echo "=========================================="
-echo "Uvicorn exited with code: ${EXIT_CODE}"
-echo "=========================================="
-
-if [ ${EXIT_CODE} -ne 0 ]; then
-    echo "ERROR: Uvicorn failed to start or crashed"
-    exit ${EXIT_CODE}
-fi
-
-exit 0
-
@@ -0,0 +1,170 @@
+"""
+Change events pushed to clients over Server-Sent Events
+
+Postgres triggers (migrations/add_change_notifications.sql) publish compact JSON
+payloads with pg_notify on the 'qc_events' channel. A background thread holds
+one LISTEN connection to the primary (replicas do not receive NOTIFY) and hands
+each payload to the EventBroker on the event loop, which fans it out to
+per-connection subscriber queues filtered by agent and event type.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import select
+import threading
+from typing import Callable, Optional, Set
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from config import get_settings
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+CHANNEL = "qc_events"
+
+
+class Subscription:
+    """A single client's filtered view of the event stream"""
+
+    def __init__(self, agent: Optional[str], types: Optional[Set[str]], queue_size: int):
+        self.agent = agent
+        self.types = types
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    def matches(self, event: dict) -> bool:
+        if self.types and event.get('type') not in self.types and event.get('type') != 'resync':
+            return False
+        # Events without an agent (settings, resync) go to every subscriber
+        if self.agent and event.get('agent') is not None and str(event['agent']) != self.agent:
+            return False
+        return True
+
+    def close(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def offer(self, event: dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop the backlog and ask it to refetch everything
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({'type': 'resync', 'reason': 'overflow'})
+
+
+class EventBroker:
+    """Fans events out to subscribers; must only be used from the event loop thread"""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._handlers = []
+        self._ids = itertools.count(1)
+
+    def subscribe(self, agent: Optional[str] = None, types: Optional[Set[str]] = None) -> Subscription:
+        subscription = Subscription(agent, types, settings.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def add_handler(self, handler: Callable[[dict], None]):
+        """Register an in-process consumer (e.g. cache invalidation) for every event"""
+        self._handlers.append(handler)
+
+    def publish(self, event: dict):
+        event['id'] = next(self._ids)
+
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.error(f"Event handler failed for {event.get('type')}: {e}")
+
+        for subscription in list(self._subscriptions):
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def close_all(self):
+        """End every open stream (shutdown); EventSource clients reconnect elsewhere"""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
+
+
+broker = EventBroker()
+
+
+class NotificationListener(threading.Thread):
+    """Holds a LISTEN connection and forwards notifications to the broker"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        super().__init__(name="qc-events-listener", daemon=True)
+        self._loop = loop
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _publish(self, event: dict):
+        self._loop.call_soon_threadsafe(broker.publish, event)
+
+    def _listen(self):
+        conn = get_db_connection()
+        try:
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            logger.info(f"Listening for change events on '{CHANNEL}'")
+
+            # Anything may have changed while we were disconnected
+            self._publish({'type': 'resync', 'reason': 'listener_connected'})
+
+            while not self._stop_event.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    try:
+                        self._publish(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning(f"Ignoring malformed notification payload: {notify.payload[:100]}")
+        finally:
+            conn.close()
+
+    def run(self):
+        backoff = 1
+        while not self._stop_event.is_set():
+            try:
+                self._listen()
+                backoff = 1
+            except Exception as e:
+                logger.error(f"Event listener error, reconnecting in {backoff}s: {e}")
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+_listener: Optional[NotificationListener] = None
+
+
+def start_listener(loop: asyncio.AbstractEventLoop):
+    global _listener
+    if _listener is None:
+        _listener = NotificationListener(loop)
+        _listener.start()
+
+
+def stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener.join(timeout=5)
+        _listener = None
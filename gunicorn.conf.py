@@ -0,0 +1,80 @@
+"""
+Production serving: gunicorn master with uvicorn workers
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Workers default to the pod's CPU quota (cgroup v2 cpu.max or v1 cfs quota,
+rounded up, capped at WEB_MAX_WORKERS); set WEB_WORKERS to override. The count
+is exported as WEB_WORKERS so each worker sizes its DB pools to stay within
+DB_MAX_TOTAL_CONNECTIONS and splits the per-pod dispatch limits.
+
+The app is imported once in the master (preload_app) and shared copy-on-write
+by the workers; nothing connects to the database at import time, so pools,
+the events listener and the dispatcher are created per worker in the lifespan.
+Workers are recycled after WORKER_MAX_REQUESTS (+ jitter) requests.
+"""
+import gc
+import math
+import os
+
+from config import Settings
+
+
+def cpu_quota() -> float:
+    """CPUs this container may use: cgroup quota if set, otherwise the CPUs it can run on"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return float(len(os.sched_getaffinity(0)))
+
+
+# Not get_settings(): the app must see WEB_WORKERS, which is exported below
+_settings = Settings()
+
+if os.environ.get("WEB_WORKERS"):
+    workers = max(int(os.environ["WEB_WORKERS"]), 1)
+else:
+    workers = min(max(math.ceil(cpu_quota()), 1), _settings.WEB_MAX_WORKERS)
+os.environ["WEB_WORKERS"] = str(workers)
+
+bind = f"{_settings.API_HOST}:{_settings.API_PORT}"
+worker_class = "uvicorn.workers.UvicornWorker"
+# Client address from X-Forwarded-For when the peer is a trusted proxy (the ingress)
+forwarded_allow_ips = _settings.FORWARDED_ALLOW_IPS
+preload_app = True
+
+max_requests = _settings.WORKER_MAX_REQUESTS
+max_requests_jitter = _settings.WORKER_MAX_REQUESTS_JITTER
+
+# Graceful shutdown per worker: lifecycle.drain() waits SHUTDOWN_DRAIN_SECONDS inside this
+graceful_timeout = int(os.environ.get("GRACEFUL_SHUTDOWN_SECONDS", 25))
+timeout = 60
+keepalive = 5
+
+# Request lines come from the app's sampled "access" logger (logging_setup.py)
+loglevel = _settings.LOG_LEVEL.lower()
+accesslog = None
+errorlog = "-"
+
+
+def when_ready(server):
+    # Runs in the master after the preload, before the first fork: keep the
+    # imported objects out of the GC's reach so collections in the workers do
+    # not touch (and copy) the shared pages
+    gc.freeze()
+    server.log.info(f"Serving with {workers} workers (CPU quota {cpu_quota():g}, max_requests {max_requests})")
@@ -0,0 +1,115 @@
+"""
+Health state for the probes
+
+Probes never open connections: /health/ready and /health/detailed read a
+snapshot kept by a background checker. The checker looks at pool occupancy and
+at the outcome of the last real checkout per host (recorded by database.get_db),
+so request traffic itself is the health signal. With HEALTH_DEEP_CHECK it also
+runs SELECT 1 on a pooled primary connection, but only when no checkout has
+succeeded within the last interval, i.e. at most once per interval and never on
+a busy pod.
+
+Readiness fails while warming up and while draining. With the deep check on it
+also fails while the latest outcome on the primary is a connection failure; the
+probe is what brings it back once the database recovers, so without it (no
+traffic reaches an unready pod) the database state is reported but not gated on.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+import lifecycle
+from config import get_settings
+from database import execute_query, pool_stats, statement_timeout_ms
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class HealthChecker:
+    def __init__(self, interval_seconds: float, deep_check: bool):
+        self.interval_seconds = interval_seconds
+        self.deep_check = deep_check
+        self._snapshot = {"database": "unknown", "pools": {}, "checked_at": None}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _probe_primary(self):
+        token = statement_timeout_ms.set(2000)
+        try:
+            # Outcome is recorded by get_db; failures show up in pool_stats
+            execute_query("SELECT 1", fetch_one=True)
+        except Exception as e:
+            logger.warning(f"Health probe failed: {e}")
+        finally:
+            statement_timeout_ms.reset(token)
+
+    def check_once(self):
+        primary = pool_stats().get(settings.POSTGRES_HOST, {})
+        success_age = primary.get("last_success_age")
+        if self.deep_check and lifecycle.ready.is_set() and \
+                (success_age is None or success_age >= self.interval_seconds):
+            self._probe_primary()
+
+        pools = pool_stats()
+        primary = pools.get(settings.POSTGRES_HOST, {})
+        success_age = primary.get("last_success_age")
+        failure_age = primary.get("last_failure_age")
+        if failure_age is not None and (success_age is None or failure_age < success_age):
+            database = "failing"
+        elif success_age is not None:
+            database = "ok"
+        else:
+            database = "unknown"
+
+        self._snapshot = {"database": database, "pools": pools, "checked_at": time.monotonic()}
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.check_once()
+            except Exception as e:
+                logger.warning(f"Health check error: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-checker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def readiness(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "ready": lifecycle.is_ready() and not (self.deep_check and snapshot["database"] == "failing"),
+            "warmed_up": lifecycle.ready.is_set(),
+            "draining": lifecycle.draining.is_set(),
+            "database": snapshot["database"],
+            "in_flight": lifecycle.in_flight(),
+        }
+
+    def details(self) -> dict:
+        snapshot = self._snapshot
+        checked_at = snapshot["checked_at"]
+
+        def age(value):
+            return round(value, 1) if value is not None else None
+
+        return {
+            **self.readiness(),
+            "checked_age": age(time.monotonic() - checked_at) if checked_at else None,
+            "deep_check": self.deep_check,
+            "pools": {
+                host: {**stats,
+                       "last_success_age": age(stats["last_success_age"]),
+                       "last_failure_age": age(stats["last_failure_age"])}
+                for host, stats in snapshot["pools"].items()
+            },
+        }
+
+
+checker = HealthChecker(settings.HEALTH_CHECK_INTERVAL_SECONDS, settings.HEALTH_DEEP_CHECK)
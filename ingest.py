@@ -0,0 +1,363 @@
+"""
+Bulk ingestion of call logs and AI analyses (POST /ingest/calls, /ingest/analyses)
+
+A batch is written as CSV to a spooled temp file while it is parsed, COPYed into
+a temp table and merged with set-based statements in one transaction:
+- the last row per key wins (calls: unique_id, analyses: conversation_id, or
+  the call's unique_id resolved to its id)
+- existing rows are updated where a value changed; fields that are missing or
+  null keep their current value. The remaining rows are inserted
+- ingesting analyses sets conversations_log.is_analyzed
+
+The merge runs with `qc.bulk_load` set, so the per-row triggers
+(migrations/add_bulk_ingest.sql) stay out of the way: qc_agents is updated with
+one statement, each affected agent-day rollup is refreshed once, and a single
+'resync' notification is sent for the whole batch. Batches are serialized with
+an advisory lock.
+"""
+import csv
+import json
+import logging
+import tempfile
+import uuid
+from typing import Dict
+
+import conversation_detail
+from config import get_settings
+from database import get_db
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+CALL_COLUMNS = (
+    'created_at', 'agent_sender', 'is_analyzed', 'qc_status', 'conversation_data',
+    'total_duration_seconds', 'total_silence_seconds', 'longest_silence_gap_seconds',
+    'silence_percentage', 'silence_timeline', 'user_sentiment_overall',
+    'agent_tone', 'agent_energy', 'agent_clarity', 'agent_patience',
+)
+
+CRITERIA = ('opening', 'listening', 'empathy', 'response_process', 'system_updation', 'closing')
+
+# Review workflow columns (review_status, claims) are not ingestible
+ANALYSIS_COLUMNS = (
+    'created_at',
+    *(f"{c}_score" for c in CRITERIA),
+    *(f"{c}_justification" for c in CRITERIA),
+    'total_weighted_score', 'final_percentage_score', 'conversation_score_ai',
+    'process_score_human', 'other_criteria_score_human', 'final_score_combined',
+    'customer_sentiment_label', 'customer_sentiment_start', 'customer_sentiment_end',
+    'main_topic', 'strengths', 'areas_for_improvement', 'weights_snapshot',
+)
+
+# Filled with NOW() / false when a new row leaves them out
+INSERT_DEFAULTS = {'created_at': 'NOW()', 'is_analyzed': 'false'}
+
+# Rollups of these (agent, day) pairs are recomputed after the merge
+AFFECTED_DAYS = """
+    INSERT INTO ingest_days (agent_sender, day)
+    SELECT cl.agent_sender, ca.created_at::date
+    FROM {batch} t
+    INNER JOIN conversations_log cl ON {call_match}
+    INNER JOIN conversation_analysis ca ON ca.conversation_id = cl.id
+    WHERE cl.agent_sender IS NOT NULL
+"""
+
+# Agents listed in the notification; larger batches send null (= any agent)
+NOTIFY_MAX_AGENTS = 200
+
+
+class IngestError(ValueError):
+    """A row that cannot be ingested; the whole batch is rejected"""
+
+
+class Batch:
+    """Rows of one request, validated and written as CSV for COPY"""
+
+    keys: tuple = ()
+    columns: tuple = ()
+
+    def __init__(self):
+        self.rows = 0
+        self.ignored_fields = set()
+        self._file = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024, mode='w+', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+
+    def _keys(self, row: dict) -> list:
+        raise NotImplementedError
+
+    def add(self, row):
+        if not isinstance(row, dict):
+            raise IngestError(f"ردیف {self.rows + 1}: باید یک شیء JSON باشد")
+        if self.rows >= settings.INGEST_MAX_ROWS:
+            raise IngestError(f"حداکثر {settings.INGEST_MAX_ROWS} ردیف در هر درخواست مجاز است")
+
+        self.ignored_fields.update(key for key in row if key not in self.keys and key not in self.columns)
+        values = [self.rows, *self._keys(row), *(row.get(column) for column in self.columns)]
+        self._writer.writerow([_csv_value(value) for value in values])
+        self.rows += 1
+
+    def copy_into(self, cursor, table: str):
+        self._file.seek(0)
+        cursor.copy_expert(
+            f"COPY {table} (seq, {', '.join(self.keys)}, {', '.join(self.columns)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+            self._file
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class CallBatch(Batch):
+    keys = ('unique_id',)
+    columns = CALL_COLUMNS
+
+    def _keys(self, row: dict) -> list:
+        unique_id = row.get('unique_id')
+        if not isinstance(unique_id, str) or not unique_id.strip():
+            raise IngestError(f"ردیف {self.rows + 1}: unique_id لازم است")
+        return [unique_id.strip()]
+
+
+class AnalysisBatch(Batch):
+    keys = ('conversation_id', 'unique_id')
+    columns = ANALYSIS_COLUMNS
+
+    def _keys(self, row: dict) -> list:
+        conversation_id = row.get('conversation_id')
+        unique_id = row.get('unique_id')
+        if conversation_id:
+            try:
+                conversation_id = str(uuid.UUID(str(conversation_id)))
+            except ValueError:
+                raise IngestError(f"ردیف {self.rows + 1}: conversation_id نامعتبر است")
+        elif not isinstance(unique_id, str) or not unique_id.strip():
+            raise IngestError(f"ردیف {self.rows + 1}: conversation_id یا unique_id لازم است")
+        return [conversation_id, unique_id.strip() if isinstance(unique_id, str) else None]
+
+
+def _csv_value(value):
+    # Empty strings load as NULL like missing fields
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _changed(columns, target: str) -> tuple:
+    """SET list and change test for an update where null/missing keeps the current value"""
+    merged = ", ".join(f"COALESCE(t.{c}, {target}.{c})" for c in columns)
+    current = ", ".join(f"{target}.{c}" for c in columns)
+    return f"({', '.join(columns)}) = ({merged})", f"({current}) IS DISTINCT FROM ({merged})"
+
+
+def _insert_values(columns) -> str:
+    return ", ".join(f"COALESCE(t.{c}, {INSERT_DEFAULTS[c]})" if c in INSERT_DEFAULTS else f"t.{c}" for c in columns)
+
+
+def _begin(cursor, table: str, batch: Batch, source: str):
+    """Serialize with other batches, switch the per-row triggers off and load the temp table"""
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('qc_ingest'))")
+    cursor.execute("SET LOCAL qc.bulk_load = 'on'")
+    cursor.execute("CREATE TEMP TABLE ingest_days (agent_sender TEXT, day DATE) ON COMMIT DROP")
+    cursor.execute(f"""
+        CREATE TEMP TABLE {table} ON COMMIT DROP AS
+        SELECT 0::bigint AS seq, {source}
+        WITH NO DATA
+    """)
+    batch.copy_into(cursor, table)
+
+
+def _dedupe(cursor, table: str, key: str) -> int:
+    """Keep the last row per key; returns the number of rows dropped"""
+    cursor.execute(f"""
+        DELETE FROM {table} t
+        USING {table} later
+        WHERE later.{key} = t.{key} AND later.seq > t.seq
+    """)
+    duplicates = cursor.rowcount
+    # Temp tables have no statistics until analyzed; the merge joins need them
+    cursor.execute(f"ANALYZE {table}")
+    return duplicates
+
+
+def _finish(cursor, kind: str, inserted: int, updated: int, batch_table: str, call_match: str):
+    """Refresh each affected agent-day once and send one notification for the batch"""
+    cursor.execute(AFFECTED_DAYS.format(batch=batch_table, call_match=call_match))
+    cursor.execute("""
+        SELECT refresh_agent_daily_stats(agent_sender, day), refresh_agent_daily_score_hist(agent_sender, day)
+        FROM (SELECT DISTINCT agent_sender, day FROM ingest_days) d
+    """)
+    refreshed = cursor.rowcount
+
+    if inserted or updated:
+        cursor.execute(f"""
+            SELECT pg_notify('qc_events', json_build_object(
+                'type', 'resync',
+                'reason', 'ingest',
+                'kind', %s,
+                'inserted', %s,
+                'updated', %s,
+                'agents', (
+                    SELECT CASE WHEN COUNT(*) <= %s THEN json_agg(agent_sender ORDER BY agent_sender) END
+                    FROM (SELECT DISTINCT cl.agent_sender
+                          FROM {batch_table} t INNER JOIN conversations_log cl ON {call_match}
+                          WHERE cl.agent_sender IS NOT NULL) a
+                )
+            )::text)
+        """, (kind, inserted, updated, NOTIFY_MAX_AGENTS))
+    return refreshed
+
+
+def merge_calls(batch: CallBatch) -> Dict:
+    """Upsert call logs by unique_id"""
+    set_sql, changed_sql = _changed(CALL_COLUMNS, "cl")
+    columns = ", ".join(CALL_COLUMNS)
+
+    with get_db() as conn:
+        with conn.cursor() as cursor:
+            _begin(cursor, "ingest_calls", batch,
+                   f"unique_id, {columns} FROM conversations_log")
+            duplicates = _dedupe(cursor, "ingest_calls", "unique_id")
+
+            # Rollup days under the current agent (an update may move the call)
+            cursor.execute(AFFECTED_DAYS.format(batch="ingest_calls", call_match="cl.unique_id = t.unique_id"))
+
+            cursor.execute(f"""
+                UPDATE conversations_log cl
+                SET {set_sql}
+                FROM ingest_calls t
+                WHERE cl.unique_id = t.unique_id AND {changed_sql}
+                RETURNING cl.id
+            """)
+            updated_ids = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(f"""
+                WITH inserted AS (
+                    INSERT INTO conversations_log (unique_id, {columns})
+                    SELECT t.unique_id, {_insert_values(CALL_COLUMNS)}
+                    FROM ingest_calls t
+                    WHERE NOT EXISTS (SELECT 1 FROM conversations_log cl WHERE cl.unique_id = t.unique_id)
+                    ON CONFLICT (unique_id) DO NOTHING
+                    RETURNING agent_sender, created_at
+                ),
+                directory AS (
+                    INSERT INTO qc_agents AS a (agent_sender, first_seen_at, last_seen_at, call_count)
+                    SELECT agent_sender, MIN(created_at), MAX(created_at), COUNT(*)
+                    FROM inserted
+                    WHERE agent_sender IS NOT NULL
+                    GROUP BY agent_sender
+                    ON CONFLICT (agent_sender) DO UPDATE
+                    SET first_seen_at = LEAST(a.first_seen_at, EXCLUDED.first_seen_at),
+                        last_seen_at = GREATEST(a.last_seen_at, EXCLUDED.last_seen_at),
+                        call_count = a.call_count + EXCLUDED.call_count
+                )
+                SELECT COUNT(*) FROM inserted
+            """)
+            inserted = cursor.fetchone()[0]
+
+            # Detail rows of analyses whose call changed
+            analysis_ids = []
+            if updated_ids:
+                cursor.execute("SELECT id FROM conversation_analysis WHERE conversation_id = ANY(%s::uuid[])",
+                               ([str(i) for i in updated_ids],))
+                analysis_ids = [row[0] for row in cursor.fetchall()]
+
+            refreshed = _finish(cursor, 'calls', inserted, len(updated_ids), "ingest_calls",
+                                "cl.unique_id = t.unique_id")
+
+    for analysis_id in analysis_ids:
+        conversation_detail.invalidate(analysis_id)
+
+    return _summary(batch, duplicates, inserted, len(updated_ids), refreshed)
+
+
+def merge_analyses(batch: AnalysisBatch) -> Dict:
+    """Upsert analyses by conversation_id and mark their calls analyzed"""
+    set_sql, changed_sql = _changed(ANALYSIS_COLUMNS, "ca")
+    columns = ", ".join(ANALYSIS_COLUMNS)
+
+    with get_db() as conn:
+        with conn.cursor() as cursor:
+            _begin(cursor, "ingest_analyses", batch,
+                   f"conversation_id, NULL::text AS unique_id, {columns} FROM conversation_analysis")
+
+            cursor.execute("""
+                UPDATE ingest_analyses t
+                SET conversation_id = cl.id
+                FROM conversations_log cl
+                WHERE t.conversation_id IS NULL AND cl.unique_id = t.unique_id
+            """)
+            cursor.execute("""
+                DELETE FROM ingest_analyses t
+                WHERE NOT EXISTS (SELECT 1 FROM conversations_log cl WHERE cl.id = t.conversation_id)
+                RETURNING COALESCE(t.unique_id, t.conversation_id::text)
+            """)
+            unmatched = sorted({row[0] for row in cursor.fetchall()})
+
+            duplicates = _dedupe(cursor, "ingest_analyses", "conversation_id")
+
+            cursor.execute(AFFECTED_DAYS.format(batch="ingest_analyses", call_match="cl.id = t.conversation_id"))
+
+            cursor.execute(f"""
+                UPDATE conversation_analysis ca
+                SET {set_sql}
+                FROM ingest_analyses t
+                WHERE ca.conversation_id = t.conversation_id AND {changed_sql}
+                RETURNING ca.id
+            """)
+            updated_ids = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(f"""
+                WITH inserted AS (
+                    INSERT INTO conversation_analysis (conversation_id, {columns})
+                    SELECT t.conversation_id, {_insert_values(ANALYSIS_COLUMNS)}
+                    FROM ingest_analyses t
+                    WHERE NOT EXISTS (SELECT 1 FROM conversation_analysis ca WHERE ca.conversation_id = t.conversation_id)
+                    RETURNING conversation_id
+                ),
+                directory AS (
+                    INSERT INTO qc_agents AS a (agent_sender, first_seen_at, last_seen_at, call_count, analyzed_count)
+                    SELECT cl.agent_sender, MIN(cl.created_at), MAX(cl.created_at), 0, COUNT(*)
+                    FROM inserted
+                    INNER JOIN conversations_log cl ON cl.id = inserted.conversation_id
+                    WHERE cl.agent_sender IS NOT NULL
+                    GROUP BY cl.agent_sender
+                    ON CONFLICT (agent_sender) DO UPDATE
+                    SET analyzed_count = a.analyzed_count + EXCLUDED.analyzed_count
+                )
+                SELECT COUNT(*) FROM inserted
+            """)
+            inserted = cursor.fetchone()[0]
+
+            cursor.execute("""
+                UPDATE conversations_log cl
+                SET is_analyzed = true
+                FROM ingest_analyses t
+                WHERE cl.id = t.conversation_id AND cl.is_analyzed IS DISTINCT FROM true
+            """)
+
+            refreshed = _finish(cursor, 'analyses', inserted, len(updated_ids), "ingest_analyses",
+                                "cl.id = t.conversation_id")
+
+    for analysis_id in updated_ids:
+        conversation_detail.invalidate(analysis_id)
+
+    summary = _summary(batch, duplicates, inserted, len(updated_ids), refreshed)
+    summary["unmatched"] = unmatched[:100]
+    summary["unmatched_count"] = len(unmatched)
+    return summary
+
+
+def _summary(batch: Batch, duplicates: int, inserted: int, updated: int, refreshed: int) -> Dict:
+    return {
+        "received": batch.rows,
+        "duplicates": duplicates,
+        "inserted": inserted,
+        "updated": updated,
+        "rollups_refreshed": refreshed,
+        "ignored_fields": sorted(batch.ignored_fields),
+    }
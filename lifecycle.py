@@ -0,0 +1,111 @@
+"""
+Process lifecycle: warm-up, readiness and graceful drain
+
+Startup returns as soon as the app is importable so liveness passes quickly;
+warm_up() then runs in a background thread (opens the pools, loads the caches
+the first requests would otherwise fill, imports lazily loaded libraries) and
+only then does /health/ready report ready.
+
+On SIGTERM the process starts draining: readiness flips to 503, open event
+streams are closed so clients reconnect to another pod, and uvicorn's own
+handler stops accepting connections and waits for in-flight requests. The
+lifespan shutdown additionally waits for the in-flight counter to reach zero
+(bounded by SHUTDOWN_DRAIN_SECONDS) before the pools are closed.
+"""
+import asyncio
+import logging
+import signal
+import threading
+import time
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ready = threading.Event()
+draining = threading.Event()
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def request_started():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+
+
+def request_finished():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+def in_flight() -> int:
+    return _in_flight
+
+
+def _warm_up_once():
+    from database import warm_pools
+    warm_pools()
+
+    # Caches and first-use imports the first requests would otherwise pay for
+    from routes.agents import _load_directory
+    _load_directory()
+    from security import active_users
+    active_users.ensure_fresh()
+    import jose.jwt  # noqa: F401
+    import analytics.agreement  # noqa: F401
+    from passwords import _dummy_hash
+    _dummy_hash()
+
+
+def warm_up():
+    """Retry until the database is reachable, then mark the process ready"""
+    started = time.perf_counter()
+    while not draining.is_set():
+        try:
+            _warm_up_once()
+            ready.set()
+            logger.info(f"Warm-up complete in {time.perf_counter() - started:.2f}s, ready for traffic")
+            return
+        except Exception as e:
+            logger.warning(f"Warm-up failed, retrying in {settings.WARMUP_RETRY_SECONDS:.0f}s: {e}")
+            draining.wait(settings.WARMUP_RETRY_SECONDS)
+
+
+def start_warm_up():
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+
+def is_ready() -> bool:
+    return ready.is_set() and not draining.is_set()
+
+
+def install_drain_handler(loop: asyncio.AbstractEventLoop):
+    """Chain SIGTERM/SIGINT so draining starts before uvicorn's own shutdown handler runs"""
+    from events import broker
+
+    def handler(sig, frame, previous):
+        if not draining.is_set():
+            logger.info(f"{signal.Signals(sig).name} received, draining ({in_flight()} requests in flight)")
+            draining.set()
+            loop.call_soon_threadsafe(broker.close_all)
+        if callable(previous):
+            previous(sig, frame)
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+        signal.signal(sig, lambda s, f, previous=previous: handler(s, f, previous))
+
+
+async def drain():
+    """Wait for in-flight requests to finish before resources are released"""
+    draining.set()
+    deadline = time.monotonic() + settings.SHUTDOWN_DRAIN_SECONDS
+    while in_flight() > 0 and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    if in_flight() > 0:
+        logger.warning(f"Shutting down with {in_flight()} requests still in flight")
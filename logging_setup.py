@@ -0,0 +1,186 @@
+"""
+Logging for the API process
+
+Loggers only enqueue records; a QueueListener thread formats them (JSON or
+text) and writes to stdout, so a slow or blocked stdout never stalls a request.
+The queue is bounded (LOG_QUEUE_SIZE); when it is full records are dropped and
+counted rather than blocking the caller.
+
+Every record carries the current request ID (set by the request middleware and
+inherited by threadpool calls, so DB log lines have it too). High-volume
+loggers can be sampled per logger name with LOG_SAMPLE_RATES; WARNING and above
+are never sampled out.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "color_message"
+}
+
+_listener: Optional[QueueListener] = None
+_handler: Optional["_DroppingQueueHandler"] = None
+_formatter: Optional[logging.Formatter] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the request ID of the context they were logged from"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records per logger name (prefix match on dotted names)"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split(".")
+            for i in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:i])
+                if prefix in self.rates:
+                    rate = float(self.rates[prefix])
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra={...}` fields are included as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        if getattr(record, "request_id", None):
+            line = f"{line} [{record.request_id}]"
+        return line
+
+
+class _DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now (args may change later), keep
+        # extra fields for the formatter on the listener thread
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _start_listener():
+    global _listener
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(_formatter)
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+
+def _restart_after_fork():
+    # gunicorn preloads the app and forks: the listener thread does not survive
+    # the fork, so each worker starts its own on a fresh queue
+    if _handler is not None:
+        _handler.queue = queue.Queue(maxsize=_handler.queue.maxsize)
+        _start_listener()
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", sample_rates: Optional[Dict[str, float]] = None,
+                      queue_size: int = 10000):
+    """Route the root logger through the queue; safe to call more than once"""
+    global _handler, _formatter
+    stop()
+    _formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+    _handler = _DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(RequestContextFilter())
+    if sample_rates:
+        _handler.addFilter(SamplingFilter(sample_rates))
+    _start_listener()
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+
+    # Server loggers go through the same queue instead of their own stdout
+    # handlers (a logger the server disabled, e.g. --no-access-log, stays off)
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        if server_logger.handlers:
+            server_logger.handlers = []
+            server_logger.propagate = True
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def stop():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        try:
+            listener.stop()
+        except Exception:
+            pass
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(stop)
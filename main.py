@@ -1,8 +1,13 @@
 import logging
-import sys
+import uuid
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from config import get_settings
+from database import QueryStats, query_stats
+from security import admin_user, current_user
+import health
+import lifecycle
+import logging_setup
 from routes import (
     auth,
     users,
@@ -11,54 +16,51 @@ from routes import (
     comparison,
     dashboard,
     leaderboard,
-    agents
+    agents,
+    ingest
 )
 from routes import settings as settings_routes
+import asyncio
 import time
 from contextlib import asynccontextmanager
+from fastapi.responses import JSONResponse
 
 # Initialize settings first
 settings = get_settings()
 
 # Configure logging with level from settings
-log_level = getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO)
-logging.basicConfig(
-    level=log_level,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
+logging_setup.configure_logging(
+    level=settings.LOG_LEVEL,
+    fmt=settings.LOG_FORMAT,
+    sample_rates=settings.LOG_SAMPLE_RATES,
+    queue_size=settings.LOG_QUEUE_SIZE
 )
 
 logger = logging.getLogger(__name__)
-
-# Log the configured log level
-logger.info(f"Logging configured with level: {settings.LOG_LEVEL.upper()}")
-
-# Initialize settings
-logger.info("Loading application settings...")
-logger.info(f"Settings loaded - API will run on {settings.API_HOST}:{settings.API_PORT}")
+# One line per request, sampled by LOG_SAMPLE_RATES; slow and failed requests always logged
+access_logger = logging.getLogger("access")
 
 
 # Lifespan context manager (replaces on_event)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
+    # Startup: only start background work here; warm-up runs after the server is listening
     try:
-        logger.info("=" * 50)
-        logger.info("LIFESPAN: Starting application startup sequence...")
-        logger.info("=" * 50)
-        logger.info("QC Panel API is starting...")
-        logger.info(f"Version: 1.0.0")
-        logger.info(f"Host: {settings.API_HOST}:{settings.API_PORT}")
-        logger.info(f"CORS Origins: {settings.CORS_ORIGINS}")
-        logger.info(f"Database Host: {settings.POSTGRES_HOST}")
-        logger.info(f"Database: {settings.POSTGRES_DATABASE}")
-        logger.info(f"Schema: {settings.POSTGRES_SCHEMA}")
-        logger.info("Database connection will be tested on first request")
-        logger.info("=" * 50)
-        logger.info("LIFESPAN: Startup complete, application ready!")
-        logger.info("=" * 50)
+        loop = asyncio.get_running_loop()
+        lifecycle.install_drain_handler(loop)
+        if settings.EVENTS_ENABLED:
+            from events import start_listener
+            start_listener(loop)
+        if settings.ANALYSIS_DISPATCH_ENABLED:
+            from analysis_dispatcher import dispatcher
+            await dispatcher.start()
+        lifecycle.start_warm_up()
+        health.checker.start()
+        logger.info(
+            f"QC Panel API 1.0.0 started on {settings.API_HOST}:{settings.API_PORT} "
+            f"(db {settings.POSTGRES_HOST}/{settings.POSTGRES_DATABASE}, schema {settings.POSTGRES_SCHEMA}, "
+            f"replicas {len(settings.POSTGRES_REPLICA_HOSTS)}, log level {settings.LOG_LEVEL.upper()})"
+        )
     except Exception as e:
         logger.error(f"LIFESPAN: Startup failed with error: {e}")
         logger.exception("Full traceback:")
@@ -66,51 +68,79 @@ async def lifespan(app: FastAPI):
 
     yield
 
-    # Shutdown
+    # Shutdown: stop taking work, let in-flight requests finish, then release resources
     try:
-        logger.info("=" * 50)
-        logger.info("LIFESPAN: Starting shutdown sequence...")
-        logger.info("QC Panel API is shutting down...")
-        logger.info("=" * 50)
+        await lifecycle.drain()
+        health.checker.stop()
+        from analysis_dispatcher import dispatcher
+        await dispatcher.stop()
+        from events import stop_listener
+        stop_listener()
+        import passwords
+        passwords.shutdown()
+        from database import close_pools
+        close_pools()
+        logger.info("QC Panel API stopped")
     except Exception as e:
         logger.error(f"LIFESPAN: Shutdown error: {e}")
 
 
 # Create FastAPI app with lifespan
-logger.info("Creating FastAPI application...")
 app = FastAPI(
     title="QC Panel API",
     description="Quality Control Panel Backend API",
     version="1.0.0",
     lifespan=lifespan
 )
-logger.info("FastAPI application created")
 
 # Add request logging middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
-
-    logger.info(f"Incoming request: {request.method} {request.url.path}")
+    start_time = time.perf_counter()
+    stats = QueryStats()
+    query_stats.set(stats)
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    logging_setup.request_id.set(request_id)
 
+    lifecycle.request_started()
     try:
         response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.info(
-            f"Request completed: {request.method} {request.url.path} "
-            f"Status: {response.status_code} "
-            f"Duration: {process_time:.3f}s"
-        )
-        return response
     except Exception as e:
-        logger.error(f"Request failed: {request.method} {request.url.path} Error: {str(e)}")
-        logger.exception("Request exception traceback:")
+        access_logger.exception(
+            f"{request.method} {request.url.path} failed: {e}",
+            extra={"method": request.method, "path": request.url.path, "status": 500,
+                   "duration_ms": round((time.perf_counter() - start_time) * 1000, 1),
+                   "db_queries": stats.queries}
+        )
         raise
+    finally:
+        lifecycle.request_finished()
+
+    duration_ms = (time.perf_counter() - start_time) * 1000
+    response.headers["X-Request-ID"] = request_id
+    if settings.EXPOSE_DB_STATS:
+        # Read by bench/run.py to report DB round trips per endpoint
+        response.headers["X-DB-Queries"] = str(stats.queries)
+        response.headers["X-DB-Time-Ms"] = f"{stats.db_time * 1000:.1f}"
+
+    if response.status_code >= 500:
+        level = logging.ERROR
+    elif duration_ms >= settings.LOG_SLOW_REQUEST_MS:
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    if access_logger.isEnabledFor(level):
+        access_logger.log(
+            level,
+            f"{request.method} {request.url.path} {response.status_code} {duration_ms:.0f}ms",
+            extra={"method": request.method, "path": request.url.path, "status": response.status_code,
+                   "duration_ms": round(duration_ms, 1), "db_queries": stats.queries,
+                   "db_time_ms": round(stats.db_time * 1000, 1)}
+        )
+    return response
 
-logger.info("Request logging middleware registered")
 
 # Configure CORS
-logger.info("Configuring CORS middleware...")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
@@ -118,29 +148,27 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-logger.info(f"CORS configured for origins: {settings.CORS_ORIGINS}")
 
 # Include routers
-logger.info("Registering API routes...")
+# Bearer tokens from /auth/login; the event stream checks its own (EventSource cannot send headers)
+protected = [current_user] if settings.AUTH_REQUIRED else []
+admin_only = [admin_user] if settings.AUTH_REQUIRED else []
 app.include_router(auth.router)
-logger.info("  - Auth routes registered")
-app.include_router(users.router)
-logger.info("  - Users routes registered")
-app.include_router(conversations.router)
-logger.info("  - Conversations routes registered")
-app.include_router(reviews.router)
-logger.info("  - Reviews routes registered")
-app.include_router(comparison.router)
-logger.info("  - Comparison routes registered")
-app.include_router(dashboard.router)
-logger.info("  - Dashboard routes registered")
-app.include_router(leaderboard.router)
-logger.info("  - Leaderboard routes registered")
-app.include_router(settings_routes.router)
-logger.info("  - Settings routes registered")
-app.include_router(agents.router)
-logger.info("  - Agents routes registered")
-logger.info("All routes registered successfully")
+app.include_router(users.router, dependencies=admin_only)
+app.include_router(conversations.router, dependencies=protected)
+app.include_router(reviews.router, dependencies=protected)
+app.include_router(comparison.router, dependencies=protected)
+app.include_router(dashboard.router, dependencies=protected)
+app.include_router(leaderboard.router, dependencies=protected)
+app.include_router(settings_routes.router, dependencies=protected)
+app.include_router(agents.router, dependencies=protected)
+# Bulk writes from the n8n flow (service account with the admin role); always
+# authenticated, since they overwrite call and analysis rows whatever AUTH_REQUIRED says
+app.include_router(ingest.router, dependencies=[admin_user])
+# Only the LISTEN/NOTIFY listener feeds the stream; without it the route is not mounted
+if settings.EVENTS_ENABLED:
+    from routes import events
+    app.include_router(events.router)
 
 
 @app.get("/")
@@ -165,69 +193,32 @@ async def health_check():
     }
 
 
-@app.get("/health/detailed")
-async def detailed_health_check():
-    """Detailed health check with database status"""
-    logger.info("Detailed health check started")
-    db_status = "unknown"
-    db_error = None
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness probe - cached state only: 503 while warming up, draining or (deep check) database failing"""
+    body = health.checker.readiness()
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
 
-    try:
-        logger.debug("Attempting database connection...")
-        from database import get_db_connection
-        # Run sync database call in thread pool
-        import asyncio
-        loop = asyncio.get_event_loop()
-        conn = await loop.run_in_executor(None, get_db_connection)
-        conn.close()
-        db_status = "connected"
-        logger.info("Database connection successful")
-    except Exception as e:
-        db_status = "disconnected"
-        db_error = str(e)[:100]
-        logger.error(f"Database connection failed: {db_error}")
 
-    result = {
-        "status": "healthy",
-        "database": db_status,
+@app.get("/health/detailed")
+async def detailed_health_check():
+    """Detailed health from the background checker's snapshot (pool occupancy, last success/failure per host)"""
+    details = health.checker.details()
+    return {
+        "status": "healthy" if details["ready"] else "unhealthy",
         "service": "qc-panel-api",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        **details,
+        "log_records_dropped": logging_setup.dropped_records(),
     }
 
-    if db_error:
-        result["database_error"] = db_error
-
-    return result
-
-
-# Final initialization logs
-logger.info("=" * 50)
-logger.info("MODULE LOADED: main.py initialization complete")
-logger.info("Application is ready to receive requests")
-logger.info("Waiting for Uvicorn to start the server...")
-logger.info("=" * 50)
-
-# Signal handler for debugging
-import signal
-import sys as system
-
-def signal_handler(sig, frame):
-    sig_name = signal.Signals(sig).name
-    logger.warning(f"SIGNAL RECEIVED: {sig_name} (signal {sig})")
-    logger.warning("Application is terminating...")
-    system.exit(0)
-
-# Register signal handlers
-signal.signal(signal.SIGTERM, signal_handler)
-signal.signal(signal.SIGINT, signal_handler)
-logger.info("Signal handlers registered (SIGTERM, SIGINT)")
-
 
 if __name__ == "__main__":
     import uvicorn
+    # Development entry point; production serves through gunicorn (see gunicorn.conf.py)
     uvicorn.run(
         "main:app",
         host=settings.API_HOST,
         port=settings.API_PORT,
-        reload=True
+        reload=settings.API_RELOAD
     )
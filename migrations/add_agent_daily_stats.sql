@@ -0,0 +1,232 @@
+-- Migration: Per-agent daily rollups for the leaderboard (and other windowed analytics)
+-- Each row holds mergeable partials (sums + non-null counts) so any window of days
+-- is answered by summing rows instead of scanning conversation_analysis.
+
+CREATE TABLE IF NOT EXISTS agent_daily_stats (
+    agent_sender TEXT NOT NULL,
+    day DATE NOT NULL,
+    conversations INT NOT NULL DEFAULT 0,
+    score_sum NUMERIC NOT NULL DEFAULT 0,
+    score_count INT NOT NULL DEFAULT 0,
+    opening_sum NUMERIC NOT NULL DEFAULT 0,
+    opening_count INT NOT NULL DEFAULT 0,
+    listening_sum NUMERIC NOT NULL DEFAULT 0,
+    listening_count INT NOT NULL DEFAULT 0,
+    empathy_sum NUMERIC NOT NULL DEFAULT 0,
+    empathy_count INT NOT NULL DEFAULT 0,
+    response_process_sum NUMERIC NOT NULL DEFAULT 0,
+    response_process_count INT NOT NULL DEFAULT 0,
+    system_updation_sum NUMERIC NOT NULL DEFAULT 0,
+    system_updation_count INT NOT NULL DEFAULT 0,
+    closing_sum NUMERIC NOT NULL DEFAULT 0,
+    closing_count INT NOT NULL DEFAULT 0,
+    silence_sum NUMERIC NOT NULL DEFAULT 0,
+    silence_count INT NOT NULL DEFAULT 0,
+    start_negative INT NOT NULL DEFAULT 0,
+    end_positive INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (agent_sender, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_daily_stats_day ON agent_daily_stats (day);
+
+
+-- Every write to an agent-day row takes this transaction-level advisory lock first
+-- (same key as refresh_agent_daily_score_hist). A recompute reads the source rows in
+-- a statement that starts after the lock, so it sees everything committed by the
+-- transaction it waited for; without the lock two concurrent recomputes each miss
+-- the other's uncommitted row and the last upsert silently drops it.
+CREATE OR REPLACE FUNCTION lock_agent_day(p_agent TEXT, p_day DATE) RETURNS void AS $$
+    SELECT pg_advisory_xact_lock(hashtext('qc_agent_day:' || p_agent), p_day - DATE '2000-01-01');
+$$ LANGUAGE sql;
+
+
+-- Recompute one agent-day from source rows (cost: that agent's calls for that day);
+-- used for updates, deletes and re-attribution. New analyses are added as deltas.
+CREATE OR REPLACE FUNCTION refresh_agent_daily_stats(p_agent TEXT, p_day DATE) RETURNS void AS $$
+BEGIN
+    IF p_agent IS NULL OR p_day IS NULL THEN
+        RETURN;
+    END IF;
+
+    PERFORM lock_agent_day(p_agent, p_day);
+
+    INSERT INTO agent_daily_stats AS s (
+        agent_sender, day, conversations,
+        score_sum, score_count, opening_sum, opening_count, listening_sum, listening_count,
+        empathy_sum, empathy_count, response_process_sum, response_process_count,
+        system_updation_sum, system_updation_count, closing_sum, closing_count,
+        silence_sum, silence_count, start_negative, end_positive, updated_at
+    )
+    SELECT
+        p_agent, p_day, COUNT(*),
+        COALESCE(SUM(ca.final_percentage_score), 0), COUNT(ca.final_percentage_score),
+        COALESCE(SUM(ca.opening_score), 0), COUNT(ca.opening_score),
+        COALESCE(SUM(ca.listening_score), 0), COUNT(ca.listening_score),
+        COALESCE(SUM(ca.empathy_score), 0), COUNT(ca.empathy_score),
+        COALESCE(SUM(ca.response_process_score), 0), COUNT(ca.response_process_score),
+        COALESCE(SUM(ca.system_updation_score), 0), COUNT(ca.system_updation_score),
+        COALESCE(SUM(ca.closing_score), 0), COUNT(ca.closing_score),
+        COALESCE(SUM(cl.silence_percentage), 0), COUNT(cl.silence_percentage),
+        COUNT(*) FILTER (WHERE ca.customer_sentiment_start = 'negative'),
+        COUNT(*) FILTER (WHERE ca.customer_sentiment_end = 'positive'),
+        NOW()
+    FROM conversation_analysis ca
+    INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+    WHERE cl.agent_sender = p_agent
+        AND ca.created_at >= p_day
+        AND ca.created_at < p_day + 1
+    HAVING COUNT(*) > 0
+    ON CONFLICT (agent_sender, day) DO UPDATE
+    SET conversations = EXCLUDED.conversations,
+        score_sum = EXCLUDED.score_sum, score_count = EXCLUDED.score_count,
+        opening_sum = EXCLUDED.opening_sum, opening_count = EXCLUDED.opening_count,
+        listening_sum = EXCLUDED.listening_sum, listening_count = EXCLUDED.listening_count,
+        empathy_sum = EXCLUDED.empathy_sum, empathy_count = EXCLUDED.empathy_count,
+        response_process_sum = EXCLUDED.response_process_sum, response_process_count = EXCLUDED.response_process_count,
+        system_updation_sum = EXCLUDED.system_updation_sum, system_updation_count = EXCLUDED.system_updation_count,
+        closing_sum = EXCLUDED.closing_sum, closing_count = EXCLUDED.closing_count,
+        silence_sum = EXCLUDED.silence_sum, silence_count = EXCLUDED.silence_count,
+        start_negative = EXCLUDED.start_negative, end_positive = EXCLUDED.end_positive,
+        updated_at = EXCLUDED.updated_at;
+
+    IF NOT FOUND THEN
+        DELETE FROM agent_daily_stats WHERE agent_sender = p_agent AND day = p_day;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION track_analysis_daily_stats() RETURNS trigger AS $$
+DECLARE
+    call_agent TEXT;
+    call_silence NUMERIC;
+    analysis_day DATE;
+BEGIN
+    -- Inserts (the hot path) add the new row to the agent-day instead of rescanning it
+    IF TG_OP = 'INSERT' THEN
+        SELECT agent_sender, silence_percentage INTO call_agent, call_silence
+        FROM conversations_log WHERE id = NEW.conversation_id;
+        analysis_day := NEW.created_at::date;
+        IF call_agent IS NULL OR analysis_day IS NULL THEN
+            RETURN NULL;
+        END IF;
+
+        PERFORM lock_agent_day(call_agent, analysis_day);
+
+        INSERT INTO agent_daily_stats AS s (
+            agent_sender, day, conversations,
+            score_sum, score_count, opening_sum, opening_count, listening_sum, listening_count,
+            empathy_sum, empathy_count, response_process_sum, response_process_count,
+            system_updation_sum, system_updation_count, closing_sum, closing_count,
+            silence_sum, silence_count, start_negative, end_positive, updated_at
+        )
+        VALUES (
+            call_agent, analysis_day, 1,
+            COALESCE(NEW.final_percentage_score, 0), (NEW.final_percentage_score IS NOT NULL)::int,
+            COALESCE(NEW.opening_score, 0), (NEW.opening_score IS NOT NULL)::int,
+            COALESCE(NEW.listening_score, 0), (NEW.listening_score IS NOT NULL)::int,
+            COALESCE(NEW.empathy_score, 0), (NEW.empathy_score IS NOT NULL)::int,
+            COALESCE(NEW.response_process_score, 0), (NEW.response_process_score IS NOT NULL)::int,
+            COALESCE(NEW.system_updation_score, 0), (NEW.system_updation_score IS NOT NULL)::int,
+            COALESCE(NEW.closing_score, 0), (NEW.closing_score IS NOT NULL)::int,
+            COALESCE(call_silence, 0), (call_silence IS NOT NULL)::int,
+            COALESCE(NEW.customer_sentiment_start = 'negative', false)::int,
+            COALESCE(NEW.customer_sentiment_end = 'positive', false)::int,
+            NOW()
+        )
+        ON CONFLICT (agent_sender, day) DO UPDATE
+        SET conversations = s.conversations + EXCLUDED.conversations,
+            score_sum = s.score_sum + EXCLUDED.score_sum, score_count = s.score_count + EXCLUDED.score_count,
+            opening_sum = s.opening_sum + EXCLUDED.opening_sum, opening_count = s.opening_count + EXCLUDED.opening_count,
+            listening_sum = s.listening_sum + EXCLUDED.listening_sum, listening_count = s.listening_count + EXCLUDED.listening_count,
+            empathy_sum = s.empathy_sum + EXCLUDED.empathy_sum, empathy_count = s.empathy_count + EXCLUDED.empathy_count,
+            response_process_sum = s.response_process_sum + EXCLUDED.response_process_sum,
+            response_process_count = s.response_process_count + EXCLUDED.response_process_count,
+            system_updation_sum = s.system_updation_sum + EXCLUDED.system_updation_sum,
+            system_updation_count = s.system_updation_count + EXCLUDED.system_updation_count,
+            closing_sum = s.closing_sum + EXCLUDED.closing_sum, closing_count = s.closing_count + EXCLUDED.closing_count,
+            silence_sum = s.silence_sum + EXCLUDED.silence_sum, silence_count = s.silence_count + EXCLUDED.silence_count,
+            start_negative = s.start_negative + EXCLUDED.start_negative,
+            end_positive = s.end_positive + EXCLUDED.end_positive,
+            updated_at = EXCLUDED.updated_at;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_agent_daily_stats(
+            (SELECT agent_sender FROM conversations_log WHERE id = NEW.conversation_id),
+            NEW.created_at::date
+        );
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND (
+        OLD.conversation_id IS DISTINCT FROM NEW.conversation_id
+        OR OLD.created_at::date IS DISTINCT FROM NEW.created_at::date)) THEN
+        PERFORM refresh_agent_daily_stats(
+            (SELECT agent_sender FROM conversations_log WHERE id = OLD.conversation_id),
+            OLD.created_at::date
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only columns that feed the rollup; review status / claim updates do not fire it
+DROP TRIGGER IF EXISTS trg_track_analysis_daily_stats ON conversation_analysis;
+CREATE TRIGGER trg_track_analysis_daily_stats
+    AFTER INSERT OR DELETE OR UPDATE OF
+        conversation_id, created_at, final_percentage_score, opening_score, listening_score,
+        empathy_score, response_process_score, system_updation_score, closing_score,
+        customer_sentiment_start, customer_sentiment_end
+    ON conversation_analysis
+    FOR EACH ROW EXECUTE FUNCTION track_analysis_daily_stats();
+
+
+-- Silence metrics and agent attribution live on conversations_log
+CREATE OR REPLACE FUNCTION track_call_daily_stats() RETURNS trigger AS $$
+DECLARE
+    analysis_day DATE;
+BEGIN
+    FOR analysis_day IN
+        SELECT DISTINCT ca.created_at::date FROM conversation_analysis ca WHERE ca.conversation_id = NEW.id
+    LOOP
+        PERFORM refresh_agent_daily_stats(NEW.agent_sender, analysis_day);
+        IF OLD.agent_sender IS DISTINCT FROM NEW.agent_sender THEN
+            PERFORM refresh_agent_daily_stats(OLD.agent_sender, analysis_day);
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_call_daily_stats ON conversations_log;
+CREATE TRIGGER trg_track_call_daily_stats
+    AFTER UPDATE OF agent_sender, silence_percentage ON conversations_log
+    FOR EACH ROW EXECUTE FUNCTION track_call_daily_stats();
+
+
+-- Backfill
+INSERT INTO agent_daily_stats (
+    agent_sender, day, conversations,
+    score_sum, score_count, opening_sum, opening_count, listening_sum, listening_count,
+    empathy_sum, empathy_count, response_process_sum, response_process_count,
+    system_updation_sum, system_updation_count, closing_sum, closing_count,
+    silence_sum, silence_count, start_negative, end_positive
+)
+SELECT
+    cl.agent_sender, ca.created_at::date, COUNT(*),
+    COALESCE(SUM(ca.final_percentage_score), 0), COUNT(ca.final_percentage_score),
+    COALESCE(SUM(ca.opening_score), 0), COUNT(ca.opening_score),
+    COALESCE(SUM(ca.listening_score), 0), COUNT(ca.listening_score),
+    COALESCE(SUM(ca.empathy_score), 0), COUNT(ca.empathy_score),
+    COALESCE(SUM(ca.response_process_score), 0), COUNT(ca.response_process_score),
+    COALESCE(SUM(ca.system_updation_score), 0), COUNT(ca.system_updation_score),
+    COALESCE(SUM(ca.closing_score), 0), COUNT(ca.closing_score),
+    COALESCE(SUM(cl.silence_percentage), 0), COUNT(cl.silence_percentage),
+    COUNT(*) FILTER (WHERE ca.customer_sentiment_start = 'negative'),
+    COUNT(*) FILTER (WHERE ca.customer_sentiment_end = 'positive')
+FROM conversation_analysis ca
+INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+WHERE cl.agent_sender IS NOT NULL
+GROUP BY cl.agent_sender, ca.created_at::date
+ON CONFLICT (agent_sender, day) DO NOTHING;
@@ -0,0 +1,82 @@
+-- Migration: Agent directory maintained on insert (serves GET /agents/list)
+
+CREATE TABLE IF NOT EXISTS qc_agents (
+    agent_sender TEXT PRIMARY KEY,
+    first_seen_at TIMESTAMPTZ NOT NULL,
+    last_seen_at TIMESTAMPTZ NOT NULL,
+    call_count BIGINT NOT NULL DEFAULT 0,
+    analyzed_count BIGINT NOT NULL DEFAULT 0
+);
+
+-- Prefix search (LIKE 'abc%') on the directory
+CREATE INDEX IF NOT EXISTS idx_qc_agents_prefix
+    ON qc_agents (agent_sender text_pattern_ops);
+
+
+-- Every logged call: first/last seen and call count
+CREATE OR REPLACE FUNCTION track_agent_call() RETURNS trigger AS $$
+BEGIN
+    IF NEW.agent_sender IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO qc_agents AS a (agent_sender, first_seen_at, last_seen_at, call_count)
+    VALUES (NEW.agent_sender, NEW.created_at, NEW.created_at, 1)
+    ON CONFLICT (agent_sender) DO UPDATE
+    SET first_seen_at = LEAST(a.first_seen_at, EXCLUDED.first_seen_at),
+        last_seen_at = GREATEST(a.last_seen_at, EXCLUDED.last_seen_at),
+        call_count = a.call_count + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_agent_call ON conversations_log;
+CREATE TRIGGER trg_track_agent_call
+    AFTER INSERT ON conversations_log
+    FOR EACH ROW EXECUTE FUNCTION track_agent_call();
+
+
+-- Every analysis: analyzed count (the filter dropdown lists analyzed agents only)
+CREATE OR REPLACE FUNCTION track_agent_analysis() RETURNS trigger AS $$
+DECLARE
+    agent TEXT;
+    call_created_at TIMESTAMPTZ;
+BEGIN
+    SELECT cl.agent_sender, cl.created_at INTO agent, call_created_at
+    FROM conversations_log cl WHERE cl.id = NEW.conversation_id;
+
+    IF agent IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO qc_agents AS a (agent_sender, first_seen_at, last_seen_at, call_count, analyzed_count)
+    VALUES (agent, call_created_at, call_created_at, 0, 1)
+    ON CONFLICT (agent_sender) DO UPDATE
+    SET analyzed_count = a.analyzed_count + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_agent_analysis ON conversation_analysis;
+CREATE TRIGGER trg_track_agent_analysis
+    AFTER INSERT ON conversation_analysis
+    FOR EACH ROW EXECUTE FUNCTION track_agent_analysis();
+
+
+-- Backfill from existing data
+INSERT INTO qc_agents AS a (agent_sender, first_seen_at, last_seen_at, call_count, analyzed_count)
+SELECT
+    cl.agent_sender,
+    MIN(cl.created_at),
+    MAX(cl.created_at),
+    COUNT(DISTINCT cl.id),
+    COUNT(ca.id)
+FROM conversations_log cl
+LEFT JOIN conversation_analysis ca ON ca.conversation_id = cl.id
+WHERE cl.agent_sender IS NOT NULL
+GROUP BY cl.agent_sender
+ON CONFLICT (agent_sender) DO UPDATE
+SET first_seen_at = EXCLUDED.first_seen_at,
+    last_seen_at = EXCLUDED.last_seen_at,
+    call_count = EXCLUDED.call_count,
+    analyzed_count = EXCLUDED.analyzed_count;
@@ -0,0 +1,29 @@
+-- Migration: Persistent job table for the n8n batch analysis dispatcher
+
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    batch_id UUID NOT NULL,
+    unique_id TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    last_status_code INT,
+    last_error TEXT,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    locked_until TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+
+-- One job per call: re-submitting a unique_id never dispatches it twice
+CREATE UNIQUE INDEX IF NOT EXISTS uq_analysis_jobs_unique_id
+    ON analysis_jobs (unique_id);
+
+-- Due / stale-lease jobs for the worker's SKIP LOCKED poll
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_due
+    ON analysis_jobs (next_attempt_at)
+    WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_batch
+    ON analysis_jobs (batch_id);
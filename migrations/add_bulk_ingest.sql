@@ -0,0 +1,68 @@
+-- Migration: Bulk ingestion support (serves POST /ingest/calls and /ingest/analyses)
+-- ingest.py merges whole batches with `SET LOCAL qc.bulk_load = 'on'`; the per-row
+-- rollup, directory and notification triggers skip those rows and ingest.py updates
+-- qc_agents, refreshes each affected agent-day once and sends one notification.
+-- Requires add_agent_directory, add_change_notifications, add_agent_daily_stats and
+-- add_score_histograms; the triggers are recreated unchanged apart from the WHEN.
+
+CREATE OR REPLACE FUNCTION qc_bulk_load() RETURNS BOOLEAN AS $$
+    SELECT coalesce(current_setting('qc.bulk_load', true), '') = 'on';
+$$ LANGUAGE sql STABLE PARALLEL SAFE;
+
+
+-- conversations_log
+DROP TRIGGER IF EXISTS trg_track_agent_call ON conversations_log;
+CREATE TRIGGER trg_track_agent_call
+    AFTER INSERT ON conversations_log
+    FOR EACH ROW
+    WHEN (NOT qc_bulk_load())
+    EXECUTE FUNCTION track_agent_call();
+
+DROP TRIGGER IF EXISTS trg_track_call_daily_stats ON conversations_log;
+CREATE TRIGGER trg_track_call_daily_stats
+    AFTER UPDATE OF agent_sender, silence_percentage ON conversations_log
+    FOR EACH ROW
+    WHEN (NOT qc_bulk_load())
+    EXECUTE FUNCTION track_call_daily_stats();
+
+DROP TRIGGER IF EXISTS trg_track_call_score_hist ON conversations_log;
+CREATE TRIGGER trg_track_call_score_hist
+    AFTER UPDATE OF agent_sender ON conversations_log
+    FOR EACH ROW
+    WHEN (OLD.agent_sender IS DISTINCT FROM NEW.agent_sender AND NOT qc_bulk_load())
+    EXECUTE FUNCTION track_call_score_hist();
+
+
+-- conversation_analysis
+DROP TRIGGER IF EXISTS trg_track_agent_analysis ON conversation_analysis;
+CREATE TRIGGER trg_track_agent_analysis
+    AFTER INSERT ON conversation_analysis
+    FOR EACH ROW
+    WHEN (NOT qc_bulk_load())
+    EXECUTE FUNCTION track_agent_analysis();
+
+DROP TRIGGER IF EXISTS trg_notify_analysis_change ON conversation_analysis;
+CREATE TRIGGER trg_notify_analysis_change
+    AFTER INSERT OR UPDATE ON conversation_analysis
+    FOR EACH ROW
+    WHEN (NOT qc_bulk_load())
+    EXECUTE FUNCTION notify_analysis_change();
+
+DROP TRIGGER IF EXISTS trg_track_analysis_daily_stats ON conversation_analysis;
+CREATE TRIGGER trg_track_analysis_daily_stats
+    AFTER INSERT OR DELETE OR UPDATE OF
+        conversation_id, created_at, final_percentage_score, opening_score, listening_score,
+        empathy_score, response_process_score, system_updation_score, closing_score,
+        customer_sentiment_start, customer_sentiment_end
+    ON conversation_analysis
+    FOR EACH ROW
+    WHEN (NOT qc_bulk_load())
+    EXECUTE FUNCTION track_analysis_daily_stats();
+
+DROP TRIGGER IF EXISTS trg_track_analysis_score_hist ON conversation_analysis;
+CREATE TRIGGER trg_track_analysis_score_hist
+    AFTER INSERT OR DELETE OR UPDATE OF conversation_id, created_at, final_percentage_score
+    ON conversation_analysis
+    FOR EACH ROW
+    WHEN (NOT qc_bulk_load())
+    EXECUTE FUNCTION track_analysis_score_hist();
@@ -0,0 +1,70 @@
+-- Migration: LISTEN/NOTIFY change events for the /events/stream push channel
+-- Payloads are compact JSON on channel 'qc_events'; clients refetch what changed.
+
+CREATE OR REPLACE FUNCTION notify_analysis_change() RETURNS trigger AS $$
+DECLARE
+    agent TEXT;
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND NEW.review_status IS NOT DISTINCT FROM OLD.review_status
+        AND NEW.claimed_by IS NOT DISTINCT FROM OLD.claimed_by THEN
+        RETURN NULL;
+    END IF;
+
+    SELECT cl.agent_sender INTO agent FROM conversations_log cl WHERE cl.id = NEW.conversation_id;
+
+    PERFORM pg_notify('qc_events', json_build_object(
+        'type', CASE WHEN TG_OP = 'INSERT' THEN 'analysis_created' ELSE 'analysis_updated' END,
+        'analysis_id', NEW.id,
+        'agent', agent,
+        'review_status', NEW.review_status
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_analysis_change ON conversation_analysis;
+CREATE TRIGGER trg_notify_analysis_change
+    AFTER INSERT OR UPDATE ON conversation_analysis
+    FOR EACH ROW EXECUTE FUNCTION notify_analysis_change();
+
+
+CREATE OR REPLACE FUNCTION notify_review_change() RETURNS trigger AS $$
+DECLARE
+    agent TEXT;
+BEGIN
+    SELECT cl.agent_sender INTO agent
+    FROM conversation_analysis ca
+    INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+    WHERE ca.id = NEW.analysis_id;
+
+    PERFORM pg_notify('qc_events', json_build_object(
+        'type', 'review_submitted',
+        'analysis_id', NEW.analysis_id,
+        'agent', agent,
+        'reviewer_id', NEW.reviewer_id
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_review_change ON conversation_review_human;
+CREATE TRIGGER trg_notify_review_change
+    AFTER INSERT OR UPDATE ON conversation_review_human
+    FOR EACH ROW EXECUTE FUNCTION notify_review_change();
+
+
+CREATE OR REPLACE FUNCTION notify_settings_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('qc_events', json_build_object(
+        'type', 'settings_changed',
+        'setting_key', NEW.setting_key
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_settings_change ON qc_settings;
+CREATE TRIGGER trg_notify_settings_change
+    AFTER INSERT OR UPDATE ON qc_settings
+    FOR EACH ROW EXECUTE FUNCTION notify_settings_change();
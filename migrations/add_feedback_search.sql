@@ -0,0 +1,48 @@
+-- Migration: Search over review feedback text (serves GET /reviews/feedback/search)
+-- Expression indexes over the human review texts (conversation_review_human) and
+-- the AI justifications (conversation_analysis): tsvector + GIN for word/phrase
+-- search, trigram GIN for fuzzy (misspelled) matching. No columns are added, so
+-- SELECT ca.* / crh.* responses are unchanged and nothing is rewritten.
+-- Requires migrations/add_transcript_search.sql (public.persian, qc_normalize_persian).
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+
+-- Normalized feedback fields, one per line (NULL fields skipped); queries must call
+-- it with the same columns in the same order as the indexes below to use them
+CREATE OR REPLACE FUNCTION qc_feedback_text(VARIADIC parts TEXT[]) RETURNS TEXT AS $$
+    SELECT qc_normalize_persian(array_to_string(parts, E'\n'));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+
+CREATE INDEX IF NOT EXISTS idx_review_human_feedback_tsv
+    ON conversation_review_human USING GIN (to_tsvector('public.persian'::regconfig, qc_feedback_text(
+        opening_justification_override, listening_justification_override, empathy_justification_override,
+        response_process_justification_override, system_updation_justification_override,
+        closing_justification_override, strengths_override, areas_for_improvement_override
+    )));
+
+CREATE INDEX IF NOT EXISTS idx_review_human_feedback_trgm
+    ON conversation_review_human USING GIN (qc_feedback_text(
+        opening_justification_override, listening_justification_override, empathy_justification_override,
+        response_process_justification_override, system_updation_justification_override,
+        closing_justification_override, strengths_override, areas_for_improvement_override
+    ) gin_trgm_ops);
+
+
+CREATE INDEX IF NOT EXISTS idx_analysis_ai_feedback_tsv
+    ON conversation_analysis USING GIN (to_tsvector('public.persian'::regconfig, qc_feedback_text(
+        opening_justification, listening_justification, empathy_justification,
+        response_process_justification, system_updation_justification,
+        closing_justification, strengths, areas_for_improvement
+    )));
+
+CREATE INDEX IF NOT EXISTS idx_analysis_ai_feedback_trgm
+    ON conversation_analysis USING GIN (qc_feedback_text(
+        opening_justification, listening_justification, empathy_justification,
+        response_process_justification, system_updation_justification,
+        closing_justification, strengths, areas_for_improvement
+    ) gin_trgm_ops);
+
+ANALYZE conversation_review_human;
+ANALYZE conversation_analysis;
@@ -0,0 +1,15 @@
+-- Migration: Review work queue claims (lease per reviewer)
+
+ALTER TABLE conversation_analysis
+    ADD COLUMN IF NOT EXISTS claimed_by UUID,
+    ADD COLUMN IF NOT EXISTS claim_expires_at TIMESTAMPTZ;
+
+-- Pending queue in arrival order; keeps the SKIP LOCKED claim query on an index scan
+CREATE INDEX IF NOT EXISTS idx_conversation_analysis_pending_queue
+    ON conversation_analysis (created_at)
+    WHERE review_status = 'pending_review';
+
+-- Lookups of a reviewer's active claims (release / heartbeat)
+CREATE INDEX IF NOT EXISTS idx_conversation_analysis_claimed_by
+    ON conversation_analysis (claimed_by)
+    WHERE claimed_by IS NOT NULL;
@@ -0,0 +1,185 @@
+-- Migration: Daily fixed-bucket score histograms per agent (AI and human scores)
+-- One row per (agent, day, source, 1-point bucket); windows merge by summing counts,
+-- and percentiles are read off the merged histogram (accurate to one score point).
+
+CREATE TABLE IF NOT EXISTS agent_daily_score_hist (
+    agent_sender TEXT NOT NULL,
+    day DATE NOT NULL,
+    source TEXT NOT NULL CHECK (source IN ('ai', 'human')),
+    bucket SMALLINT NOT NULL CHECK (bucket BETWEEN 0 AND 100),
+    count INT NOT NULL,
+    PRIMARY KEY (agent_sender, day, source, bucket)
+);
+
+CREATE INDEX IF NOT EXISTS idx_agent_daily_score_hist_day ON agent_daily_score_hist (day);
+
+
+CREATE OR REPLACE FUNCTION score_bucket(score NUMERIC) RETURNS SMALLINT AS $$
+    SELECT LEAST(100, GREATEST(0, FLOOR(score)))::smallint;
+$$ LANGUAGE sql IMMUTABLE;
+
+
+-- Rebuild the histograms of one agent-day; days are the analysis day for both sources.
+-- Rebuilds of the same agent-day are serialized with a transaction-level advisory lock
+-- (same key as refresh_agent_daily_stats): without it two concurrent transactions both
+-- delete, both insert and the second fails on the primary key inside the trigger,
+-- aborting the analysis insert or review submit. Statements after the lock take a new
+-- snapshot, so the rebuild also sees rows committed by the transaction it waited for.
+CREATE OR REPLACE FUNCTION refresh_agent_daily_score_hist(p_agent TEXT, p_day DATE) RETURNS void AS $$
+BEGIN
+    IF p_agent IS NULL OR p_day IS NULL THEN
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('qc_agent_day:' || p_agent), p_day - DATE '2000-01-01');
+
+    DELETE FROM agent_daily_score_hist WHERE agent_sender = p_agent AND day = p_day;
+
+    INSERT INTO agent_daily_score_hist (agent_sender, day, source, bucket, count)
+    SELECT p_agent, p_day, source, bucket, COUNT(*)
+    FROM (
+        SELECT 'ai' AS source, score_bucket(ca.final_percentage_score) AS bucket
+        FROM conversation_analysis ca
+        INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+        WHERE cl.agent_sender = p_agent
+            AND ca.created_at >= p_day AND ca.created_at < p_day + 1
+            AND ca.final_percentage_score IS NOT NULL
+        UNION ALL
+        SELECT 'human', score_bucket(crh.final_percentage_score_human)
+        FROM conversation_analysis ca
+        INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+        INNER JOIN conversation_review_human crh ON crh.analysis_id = ca.id
+        WHERE cl.agent_sender = p_agent
+            AND ca.created_at >= p_day AND ca.created_at < p_day + 1
+            AND crh.final_percentage_score_human IS NOT NULL
+    ) scores
+    GROUP BY source, bucket;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Count one new score into its agent-day bucket (the insert hot path), under the same
+-- agent-day lock as the rebuild so a concurrent rebuild cannot drop the increment
+CREATE OR REPLACE FUNCTION add_agent_daily_score(p_agent TEXT, p_day DATE, p_source TEXT, p_score NUMERIC)
+RETURNS void AS $$
+BEGIN
+    IF p_agent IS NULL OR p_day IS NULL OR p_score IS NULL THEN
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('qc_agent_day:' || p_agent), p_day - DATE '2000-01-01');
+
+    INSERT INTO agent_daily_score_hist AS h (agent_sender, day, source, bucket, count)
+    VALUES (p_agent, p_day, p_source, score_bucket(p_score), 1)
+    ON CONFLICT (agent_sender, day, source, bucket) DO UPDATE
+    SET count = h.count + 1;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Inserts add one count; updates and deletes rebuild the agent-day, since the old
+-- bucket is not known reliably (the call's agent may have changed since)
+CREATE OR REPLACE FUNCTION track_analysis_score_hist() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        -- A new analysis has no human review yet
+        PERFORM add_agent_daily_score(
+            (SELECT agent_sender FROM conversations_log WHERE id = NEW.conversation_id),
+            NEW.created_at::date, 'ai', NEW.final_percentage_score
+        );
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM refresh_agent_daily_score_hist(
+            (SELECT agent_sender FROM conversations_log WHERE id = NEW.conversation_id),
+            NEW.created_at::date
+        );
+    END IF;
+    IF TG_OP = 'DELETE' OR (TG_OP = 'UPDATE' AND (
+        OLD.conversation_id IS DISTINCT FROM NEW.conversation_id
+        OR OLD.created_at::date IS DISTINCT FROM NEW.created_at::date)) THEN
+        PERFORM refresh_agent_daily_score_hist(
+            (SELECT agent_sender FROM conversations_log WHERE id = OLD.conversation_id),
+            OLD.created_at::date
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_analysis_score_hist ON conversation_analysis;
+CREATE TRIGGER trg_track_analysis_score_hist
+    AFTER INSERT OR DELETE OR UPDATE OF conversation_id, created_at, final_percentage_score
+    ON conversation_analysis
+    FOR EACH ROW EXECUTE FUNCTION track_analysis_score_hist();
+
+
+CREATE OR REPLACE FUNCTION track_review_score_hist() RETURNS trigger AS $$
+DECLARE
+    target_analysis UUID;
+BEGIN
+    target_analysis := CASE WHEN TG_OP = 'DELETE' THEN OLD.analysis_id ELSE NEW.analysis_id END;
+
+    IF TG_OP = 'INSERT' THEN
+        PERFORM add_agent_daily_score(cl.agent_sender, ca.created_at::date, 'human', NEW.final_percentage_score_human)
+        FROM conversation_analysis ca
+        INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+        WHERE ca.id = target_analysis;
+        RETURN NULL;
+    END IF;
+
+    PERFORM refresh_agent_daily_score_hist(cl.agent_sender, ca.created_at::date)
+    FROM conversation_analysis ca
+    INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+    WHERE ca.id = target_analysis;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_review_score_hist ON conversation_review_human;
+CREATE TRIGGER trg_track_review_score_hist
+    AFTER INSERT OR DELETE OR UPDATE OF final_percentage_score_human
+    ON conversation_review_human
+    FOR EACH ROW EXECUTE FUNCTION track_review_score_hist();
+
+
+CREATE OR REPLACE FUNCTION track_call_score_hist() RETURNS trigger AS $$
+DECLARE
+    analysis_day DATE;
+BEGIN
+    FOR analysis_day IN
+        SELECT DISTINCT ca.created_at::date FROM conversation_analysis ca WHERE ca.conversation_id = NEW.id
+    LOOP
+        PERFORM refresh_agent_daily_score_hist(NEW.agent_sender, analysis_day);
+        PERFORM refresh_agent_daily_score_hist(OLD.agent_sender, analysis_day);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_track_call_score_hist ON conversations_log;
+CREATE TRIGGER trg_track_call_score_hist
+    AFTER UPDATE OF agent_sender ON conversations_log
+    FOR EACH ROW
+    WHEN (OLD.agent_sender IS DISTINCT FROM NEW.agent_sender)
+    EXECUTE FUNCTION track_call_score_hist();
+
+
+-- Backfill
+INSERT INTO agent_daily_score_hist (agent_sender, day, source, bucket, count)
+SELECT agent_sender, day, source, bucket, COUNT(*)
+FROM (
+    SELECT cl.agent_sender, ca.created_at::date AS day, 'ai' AS source, score_bucket(ca.final_percentage_score) AS bucket
+    FROM conversation_analysis ca
+    INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+    WHERE cl.agent_sender IS NOT NULL AND ca.final_percentage_score IS NOT NULL
+    UNION ALL
+    SELECT cl.agent_sender, ca.created_at::date, 'human', score_bucket(crh.final_percentage_score_human)
+    FROM conversation_analysis ca
+    INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+    INNER JOIN conversation_review_human crh ON crh.analysis_id = ca.id
+    WHERE cl.agent_sender IS NOT NULL AND crh.final_percentage_score_human IS NOT NULL
+) scores
+GROUP BY agent_sender, day, source, bucket
+ON CONFLICT (agent_sender, day, source, bucket) DO NOTHING;
@@ -0,0 +1,33 @@
+-- Migration: Packed silence intervals (serves GET /dashboard/silence and silence_format=packed)
+-- conversations_log.silence_ms holds each silence_timeline as one flat INT[] of
+-- millisecond bounds, [start_1, end_1, start_2, end_2, ...] ordered by start: about
+-- a tenth of the JSON size and readable without parsing. silence_timeline stays the
+-- source of truth (n8n and /ingest write it); the packed column is generated from it,
+-- so it can never disagree. Adding the column rewrites conversations_log once; run
+-- it off-peak.
+
+-- Gaps without a numeric start and end are skipped (numeric strings are accepted);
+-- an end before its start is clamped to the start. Non-array timelines pack to '{}'
+CREATE OR REPLACE FUNCTION qc_pack_silence(timeline JSONB) RETURNS INT[] AS $$
+    SELECT coalesce(array_agg(b.bound ORDER BY gaps.start_ms, gaps.end_ms, b.side), '{}')
+    FROM (
+        SELECT s.start_ms, greatest(s.start_ms, s.end_ms) AS end_ms
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(timeline) = 'array' THEN timeline ELSE '[]'::jsonb END
+        ) AS g(gap),
+        LATERAL (
+            SELECT
+                round((jsonb_path_query_first(gap, 'strict $.start.double()', '{}', true))::float8 * 1000)::int AS start_ms,
+                round((jsonb_path_query_first(gap, 'strict $.end.double()', '{}', true))::float8 * 1000)::int AS end_ms
+        ) AS s
+        WHERE s.start_ms IS NOT NULL AND s.end_ms IS NOT NULL
+    ) AS gaps
+    CROSS JOIN LATERAL (VALUES (0, gaps.start_ms), (1, gaps.end_ms)) AS b(side, bound);
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+
+ALTER TABLE conversations_log
+    ADD COLUMN IF NOT EXISTS silence_ms INT[]
+    GENERATED ALWAYS AS (qc_pack_silence(silence_timeline)) STORED;
+
+ANALYZE conversations_log;
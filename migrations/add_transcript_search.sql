@@ -0,0 +1,53 @@
+-- Migration: Full-text search over call transcripts (serves GET /conversations/search)
+-- A stored generated tsvector over the message texts of conversations_log.conversation_data,
+-- indexed with GIN. Adding the column rewrites conversations_log once; run it off-peak.
+
+-- PostgreSQL ships no Persian dictionary: `persian` is the `simple` configuration
+-- (lowercasing, no stemming, no stop words) on text normalized by qc_normalize_persian
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_ts_config c JOIN pg_namespace n ON n.oid = c.cfgnamespace
+        WHERE c.cfgname = 'persian' AND n.nspname = 'public'
+    ) THEN
+        CREATE TEXT SEARCH CONFIGURATION public.persian (COPY = pg_catalog.simple);
+    END IF;
+END;
+$$;
+
+
+-- Arabic yeh/kaf/heh variants to their Persian forms, Arabic-Indic and Persian digits
+-- to ASCII, ZWNJ (U+200C) to a space; diacritics and tatweel are dropped.
+-- Used for both the indexed text and the search query so the two always agree.
+CREATE OR REPLACE FUNCTION qc_normalize_persian(value TEXT) RETURNS TEXT AS $$
+    SELECT translate(
+        value,
+        'يىكۀةأإٱؤ' || '٠١٢٣٤٥٦٧٨٩' || '۰۱۲۳۴۵۶۷۸۹' || U&'\200C'
+            || U&'\064B\064C\064D\064E\064F\0650\0651\0652\0640',
+        'ییکههاااو' || '0123456789' || '0123456789' || ' '
+    );
+$$ LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE;
+
+
+-- Searchable text of a transcript: every "text" value in the JSON (messages of any
+-- nesting), or every string value when there are none (other transcript shapes).
+-- Strict mode so .** does not return duplicates; silent so non-objects are skipped
+CREATE OR REPLACE FUNCTION qc_transcript_text(data JSONB) RETURNS TEXT AS $$
+    SELECT qc_normalize_persian(coalesce(
+        (SELECT string_agg(t #>> '{}', ' ')
+         FROM jsonb_path_query(data, 'strict $.**.text ? (@.type() == "string")', '{}', true) AS t),
+        (SELECT string_agg(t #>> '{}', ' ')
+         FROM jsonb_path_query(data, 'strict $.** ? (@.type() == "string")', '{}', true) AS t),
+        ''
+    ));
+$$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+
+ALTER TABLE conversations_log
+    ADD COLUMN IF NOT EXISTS transcript_tsv TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('public.persian'::regconfig, qc_transcript_text(conversation_data))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_conversations_log_transcript_tsv
+    ON conversations_log USING GIN (transcript_tsv);
+
+ANALYZE conversations_log;
@@ -0,0 +1,176 @@
+"""
+Password hashing off the event loop
+
+bcrypt is deliberately slow (~250 ms at cost 12), so hashing and verification
+run on a small dedicated thread pool (bcrypt releases the GIL) and are awaited
+from async routes: a login storm queues here instead of occupying the event
+loop or the shared threadpool other endpoints run in. The queue is bounded;
+past PASSWORD_HASH_MAX_PENDING callers get 503 with Retry-After.
+
+Hashes whose cost differs from BCRYPT_ROUNDS, and legacy plain-text values left
+by the old insert fallback, are replaced on the next successful login.
+
+LoginRateLimiter caps failed logins per username and attempts per client IP
+over a sliding window (429 with Retry-After).
+"""
+import asyncio
+import functools
+import hmac
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+from fastapi import HTTPException
+
+from config import get_settings
+
+settings = get_settings()
+
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+_pending_lock = threading.Lock()
+
+# bcrypt only uses the first 72 bytes; newer releases refuse longer input instead of truncating
+_MAX_PASSWORD_BYTES = 72
+
+
+def _encode(password: str) -> bytes:
+    return password.encode('utf-8')[:_MAX_PASSWORD_BYTES]
+
+
+def _hash_sync(password: str) -> str:
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(settings.BCRYPT_ROUNDS)).decode()
+
+
+@functools.lru_cache(maxsize=1)
+def _dummy_hash() -> bytes:
+    # Verified against when the username does not exist, so timing does not reveal it
+    return bcrypt.hashpw(b"dummy-password", bcrypt.gensalt(settings.BCRYPT_ROUNDS))
+
+
+def _rounds(stored_hash: str) -> Optional[int]:
+    try:
+        return int(stored_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _verify_sync(password: str, stored_hash: Optional[str]) -> Tuple[bool, Optional[str]]:
+    if not stored_hash:
+        bcrypt.checkpw(_encode(password), _dummy_hash())
+        return False, None
+
+    if stored_hash.startswith('$2'):
+        if not bcrypt.checkpw(_encode(password), stored_hash.encode()):
+            return False, None
+        if _rounds(stored_hash) != settings.BCRYPT_ROUNDS:
+            return True, _hash_sync(password)
+        return True, None
+
+    # Legacy plain-text value: accept once and upgrade
+    if hmac.compare_digest(password.encode('utf-8'), stored_hash.encode('utf-8')):
+        return True, _hash_sync(password)
+    return False, None
+
+
+async def _run(func, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+            raise HTTPException(
+                status_code=503,
+                detail="سرور در حال حاضر مشغول است، لطفاً چند لحظه بعد دوباره تلاش کنید",
+                headers={"Retry-After": "2"}
+            )
+        _pending += 1
+    try:
+        return await asyncio.wrap_future(_executor.submit(func, *args))
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    """bcrypt hash at BCRYPT_ROUNDS"""
+    return await _run(_hash_sync, password)
+
+
+async def verify_password(password: str, stored_hash: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """(matches, replacement hash or None); stored_hash None = unknown user"""
+    return await _run(_verify_sync, password, stored_hash)
+
+
+def shutdown():
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+class LoginRateLimiter:
+    """
+    Sliding-window counters of failed logins per username and per client IP
+
+    Failures for a username slow further attempts down (exponential delay, capped)
+    instead of locking the account, so nobody can lock a colleague out by guessing.
+    Only failures count against the IP, so a shift-start burst of successful logins
+    from one office never hits the limit. The IP is request.client.host, which the
+    server rewrites from X-Forwarded-For for trusted proxies (FORWARDED_ALLOW_IPS).
+    """
+
+    def __init__(self, window_seconds: float, max_failures_per_user: int, max_failures_per_ip: int,
+                 max_delay_seconds: float, max_keys: int = 10000):
+        self.window_seconds = window_seconds
+        self.max_failures_per_user = max_failures_per_user
+        self.max_failures_per_ip = max_failures_per_ip
+        self.max_delay_seconds = max_delay_seconds
+        self.max_keys = max_keys
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _recent(self, key: str, now: float) -> deque:
+        events = self._events.get(key)
+        if events is None:
+            events = self._events[key] = deque()
+            while len(self._events) > self.max_keys:
+                self._events.popitem(last=False)
+        self._events.move_to_end(key)
+        while events and events[0] <= now - self.window_seconds:
+            events.popleft()
+        return events
+
+    def _reject(self, events: deque, now: float):
+        retry_after = max(1, int(events[0] + self.window_seconds - now) + 1)
+        raise HTTPException(
+            status_code=429,
+            detail="تعداد تلاش‌های ورود بیش از حد مجاز است، لطفاً بعداً دوباره تلاش کنید",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    def check(self, username: str, client_ip: str) -> float:
+        """Raise 429 if the IP is over its failure limit; return the delay (seconds) for this username"""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._recent(f"ip:{client_ip}", now)
+            if len(failures) >= self.max_failures_per_ip:
+                self._reject(failures, now)
+            excess = len(self._recent(f"user:{username.lower()}", now)) - self.max_failures_per_user
+        return 0.0 if excess < 0 else min(self.max_delay_seconds, 2.0 ** excess)
+
+    def record_failure(self, username: str, client_ip: str):
+        now = time.monotonic()
+        with self._lock:
+            self._recent(f"user:{username.lower()}", now).append(now)
+            self._recent(f"ip:{client_ip}", now).append(now)
+
+    def record_success(self, username: str):
+        with self._lock:
+            self._events.pop(f"user:{username.lower()}", None)
+
+
+login_limiter = LoginRateLimiter(
+    window_seconds=settings.LOGIN_RATE_WINDOW_SECONDS,
+    max_failures_per_user=settings.LOGIN_MAX_FAILURES_PER_USER,
+    max_failures_per_ip=settings.LOGIN_MAX_FAILURES_PER_IP,
+    max_delay_seconds=settings.LOGIN_MAX_DELAY_SECONDS,
+)
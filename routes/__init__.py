@@ -1,25 +1,3 @@
 # Routes module
-from . import (
-    auth,
-    users,
-    conversations,
-    reviews,
-    comparison,
-    dashboard,
-    leaderboard,
-    agents,
-    settings
-)
-
-__all__ = [
-    'auth',
-    'users',
-    'conversations',
-    'reviews',
-    'comparison',
-    'dashboard',
-    'leaderboard',
-    'agents',
-    'settings'
-]
-
+# Routers are imported by main.py one by one (optional ones only when enabled), so
+# importing a single router does not pull in every other route module.
@@ -1,32 +1,174 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+import threading
 from database import execute_query
+from admission import analytics
+from analytics.profile import build_profile, fetch_profile, fetch_rank
+from analytics.windows import resolve_window
+from cache import TTLCache
+from config import get_settings
+from events import broker
 from utils import sanitize_error_message
 
-router = APIRouter(prefix="/agents", tags=["Agents"])
+router = APIRouter(prefix="/agents", tags=["Agents"], dependencies=[analytics])
+
+settings = get_settings()
+
+# The whole directory is one cache entry; filtering happens in memory (O(agents))
+_directory_cache = TTLCache(maxsize=1, ttl=settings.AGENTS_CACHE_TTL_SECONDS)
+# Set when an event dropped the directory: replicas may lag the write, so reload from the primary
+_directory_recent_writes = TTLCache(maxsize=1, ttl=settings.REPLICA_MAX_LAG_SECONDS)
+
+# (agent, window key, topics limit) -> profile. Entries of an agent are dropped when
+# its analyses or reviews change; the rank also depends on other agents and is only
+# refreshed by the TTL
+_profile_cache = TTLCache(maxsize=settings.AGENT_PROFILE_CACHE_SIZE, ttl=settings.AGENT_PROFILE_CACHE_TTL_SECONDS)
+
+# agent -> invalidation count, plus a count of resyncs; a profile is only cached if
+# neither changed while it was being queried
+_profile_generations = {}
+_profile_resyncs = 0
+_profile_lock = threading.Lock()
+
+# agent (None after a resync) -> True while replicas may not have the change that
+# invalidated its profiles yet; those reloads read from the primary
+_profile_recent_writes = TTLCache(maxsize=10000, ttl=settings.REPLICA_MAX_LAG_SECONDS)
+
+
+def _load_directory() -> List[dict]:
+    directory = _directory_cache.get('directory')
+    if directory is not None:
+        return directory
+
+    query = """
+        SELECT agent_sender, first_seen_at, last_seen_at, call_count, analyzed_count
+        FROM qc_agents
+        WHERE analyzed_count > 0
+        ORDER BY agent_sender
+    """
+    read_only = _directory_recent_writes.get('directory') is None
+    directory = execute_query(query, fetch_all=True, read_only=read_only) or []
+    _directory_cache.set('directory', directory)
+    return directory
+
+
+def _invalidate_directory():
+    _directory_recent_writes.set('directory', True)
+    _directory_cache.clear()
+
+
+def _profile_generation(agent: str) -> tuple:
+    with _profile_lock:
+        return _profile_resyncs, _profile_generations.get(agent, 0)
+
+
+def _invalidate_profiles(agent: Optional[str] = None):
+    """Drop one agent's profiles, or all of them"""
+    global _profile_resyncs
+    _profile_recent_writes.set(agent, True)
+    with _profile_lock:
+        if agent is None:
+            _profile_resyncs += 1
+            _profile_generations.clear()
+        else:
+            _profile_generations[agent] = _profile_generations.get(agent, 0) + 1
+    if agent is None:
+        _profile_cache.clear()
+    else:
+        _profile_cache.invalidate_where(lambda key: key[0] == agent)
+
+
+def _on_event(event: dict):
+    if event.get('type') == 'resync':
+        _invalidate_directory()
+        _invalidate_profiles()
+        return
+
+    if event.get('type') in ('analysis_created', 'analysis_updated', 'review_submitted') and event.get('agent') is not None:
+        _invalidate_profiles(str(event['agent']))
+
+    # A first analysis for an unknown agent must show up in the dropdown right away
+    if event.get('type') == 'analysis_created' and event.get('agent') is not None:
+        directory = _directory_cache.get('directory')
+        if directory is not None and not any(row['agent_sender'] == str(event['agent']) for row in directory):
+            _invalidate_directory()
+
+
+broker.add_handler(_on_event)
 
 
 @router.get("/list")
-async def get_agents_list():
+def get_agents_list(
+    search: Optional[str] = Query(None, description="Case-insensitive substring match"),
+    prefix: Optional[str] = Query(None, description="Agent extension prefix"),
+    include_stats: bool = Query(False, description="Include first/last seen and call counts")
+):
     """
     Get unique list of agents from analyzed conversations
-    Used for filter dropdowns
+    Used for filter dropdowns; served from the qc_agents directory through an in-memory cache
     """
     try:
-        query = """
-            SELECT DISTINCT cl.agent_sender
-            FROM conversations_log cl
-            INNER JOIN conversation_analysis ca ON ca.conversation_id = cl.id
-            WHERE cl.agent_sender IS NOT NULL
-            ORDER BY cl.agent_sender
-        """
+        directory = _load_directory()
 
-        results = execute_query(query, fetch_all=True)
+        if prefix:
+            directory = [row for row in directory if str(row['agent_sender']).startswith(prefix)]
+        if search:
+            needle = search.lower()
+            directory = [row for row in directory if needle in str(row['agent_sender']).lower()]
 
-        agents = [str(row['agent_sender']) for row in results] if results else []
+        agents = [str(row['agent_sender']) for row in directory]
+        response = {"agents": agents, "total": len(agents)}
 
-        return {"agents": agents, "total": len(agents)}
+        if include_stats:
+            response["details"] = directory
+
+        return response
 
     except Exception as e:
 #        print(f"Error fetching agents list: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت لیست اپراتورها: {sanitize_error_message(e)}")
+
+
+@router.get("/{agent_sender}/profile")
+def get_agent_profile(
+    agent_sender: str,
+    date_range: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    topics_limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Get an agent's profile: KPIs, AI and human criteria averages, sentiment, top topics,
+    rank and daily trend in one response
+    Built from one query over the agent's analyses plus the daily rollups; cached per
+    agent and window and invalidated by that agent's analysis and review events
+    """
+    try:
+        if not any(str(row['agent_sender']) == agent_sender for row in _load_directory()):
+            raise HTTPException(status_code=404, detail="اپراتور یافت نشد")
+
+        window = resolve_window(date_range, start_date, end_date)
+        key = (agent_sender, window.key if window is not None else None, topics_limit)
+        profile = _profile_cache.get(key)
+        if profile is not None:
+            return profile
+
+        generation = _profile_generation(agent_sender)
+        read_only = _profile_recent_writes.get(agent_sender) is None and _profile_recent_writes.get(None) is None
+
+        profile = build_profile(
+            agent_sender,
+            fetch_profile(agent_sender, window, topics_limit=topics_limit, read_only=read_only),
+            fetch_rank(agent_sender, window, read_only=read_only)
+        )
+
+        with _profile_lock:
+            if (_profile_resyncs, _profile_generations.get(agent_sender, 0)) == generation:
+                _profile_cache.set(key, profile)
+        return profile
+
+    except HTTPException:
+        raise
+    except Exception as e:
+#        print(f"Error fetching agent profile: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در دریافت پروفایل اپراتور: {sanitize_error_message(e)}")
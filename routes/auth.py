@@ -1,11 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
-from database import execute_query, execute_procedure
-from passlib.hash import bcrypt
+from database import execute_query
+from admission import interactive
+from passwords import login_limiter, verify_password
+from security import create_access_token, current_user
 from utils import safe_print
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/auth", tags=["Authentication"], dependencies=[interactive])
 
 
 class LoginRequest(BaseModel):
@@ -18,27 +25,67 @@ class LoginResponse(BaseModel):
     username: str
     full_name: Optional[str]
     role: str
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: int
+
+
+class CurrentUserResponse(BaseModel):
+    id: str
+    username: str
+    full_name: Optional[str]
+    role: str
 
 
 @router.post("/login", response_model=LoginResponse)
-async def login(credentials: LoginRequest):
+async def login(credentials: LoginRequest, request: Request):
     """
-    Login endpoint - verifies username and password
-    Uses PostgreSQL crypt() function for bcrypt verification
+    Login endpoint - verifies username and password and issues a JWT
+    bcrypt runs on the dedicated password pool (passwords.py); failures slow the username down and are limited per IP
     """
+    # Behind the ingress, client.host is the X-Forwarded-For client (see FORWARDED_ALLOW_IPS)
+    client_ip = request.client.host if request.client else "unknown"
+    delay = login_limiter.check(credentials.username, client_ip)
+    if delay:
+        await asyncio.sleep(delay)
+
     try:
-        # Call verify_user_password function
-        query = "SELECT * FROM call.qc_users WHERE username = $username AND password = $password"
-        result = execute_query(query, (credentials.username, credentials.password), fetch_one=True)
+        query = """
+            SELECT id::text, username, full_name, role, password_hash
+            FROM qc_users
+            WHERE username = %s AND is_active = true
+        """
+        user = await run_in_threadpool(execute_query, query, (credentials.username,), fetch_one=True)
 
-        if not result:
+        valid, new_hash = await verify_password(credentials.password, user['password_hash'] if user else None)
+        if not valid:
+            login_limiter.record_failure(credentials.username, client_ip)
             raise HTTPException(status_code=401, detail="نام کاربری یا رمز عبور اشتباه است")
+        login_limiter.record_success(credentials.username)
 
+        if new_hash:
+            # Cost factor changed (or legacy plain text): upgrade transparently
+            try:
+                await run_in_threadpool(
+                    execute_query, "UPDATE qc_users SET password_hash = %s WHERE id = %s",
+                    (new_hash, user['id']), fetch_all=False
+                )
+            except Exception as e:
+                logger.warning(f"Password rehash failed for user {user['id']}: {e}")
 
-        return LoginResponse(**result)
+        profile = {key: user[key] for key in ('id', 'username', 'full_name', 'role')}
+        return LoginResponse(**profile, **create_access_token(profile))
 
     except HTTPException:
         raise
     except Exception as e:
         safe_print(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="خطا در ورود به سیستم")
+
+
+@router.get("/me", response_model=CurrentUserResponse)
+def get_me(user: dict = current_user):
+    """
+    Current user from the bearer token (verified locally, no database query)
+    """
+    return CurrentUserResponse(**user)
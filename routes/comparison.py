@@ -1,13 +1,17 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, List, Dict, Any
 from database import execute_query
+from admission import analytics
+from analytics.windows import resolve_window
+import conversation_detail
+import uuid
 
 from utils import sanitize_error_message
-router = APIRouter(prefix="/comparison", tags=["AI vs Human Comparison"])
+router = APIRouter(prefix="/comparison", tags=["AI vs Human Comparison"], dependencies=[analytics])
 
 
 @router.get("/reviewed-conversations")
-async def get_reviewed_conversations(
+def get_reviewed_conversations(
     agent_id: Optional[str] = Query(None),
     date_range: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -55,7 +59,7 @@ async def get_reviewed_conversations(
             INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
             WHERE {where_sql}
         """
-        count_result = execute_query(count_query, tuple(params), fetch_one=True)
+        count_result = execute_query(count_query, tuple(params), fetch_one=True, read_only=True)
         total = count_result['count'] if count_result else 0
 
         # Data query
@@ -100,7 +104,7 @@ async def get_reviewed_conversations(
         """
         params.extend([page_size, offset])
 
-        data = execute_query(query, tuple(params), fetch_all=True)
+        data = execute_query(query, tuple(params), fetch_all=True, read_only=True)
 
         total_pages = (total + page_size - 1) // page_size
 
@@ -118,62 +122,19 @@ async def get_reviewed_conversations(
 
 
 @router.get("/conversation/{analysis_id}")
-async def get_conversation_comparison(analysis_id: str):
+def get_conversation_comparison(analysis_id: str):
     """
     Get detailed AI vs Human comparison for a single conversation
     """
     try:
-        query = """
-            SELECT
-                ca.*,
-                cl.conversation_data,
-                cl.agent_sender,
-                cl.unique_id,
-                cl.total_duration_seconds,
-                cl.total_silence_seconds,
-                cl.longest_silence_gap_seconds,
-                cl.silence_percentage,
-                cl.silence_timeline,
-                cl.user_sentiment_overall,
-                cl.agent_tone,
-                cl.agent_energy,
-                cl.agent_clarity,
-                cl.agent_patience,
-                crh.id as human_review_id,
-                crh.opening_score_override,
-                crh.listening_score_override,
-                crh.empathy_score_override,
-                crh.response_process_score_override,
-                crh.system_updation_score_override,
-                crh.closing_score_override,
-                crh.opening_justification_override,
-                crh.listening_justification_override,
-                crh.empathy_justification_override,
-                crh.response_process_justification_override,
-                crh.system_updation_justification_override,
-                crh.closing_justification_override,
-                crh.strengths_override,
-                crh.areas_for_improvement_override,
-                crh.total_weighted_score_human,
-                crh.final_percentage_score_human,
-                crh.other_criteria_weighted_score_human,
-                crh.other_criteria_percentage_score_human,
-                crh.reviewer_id,
-                qu.full_name as reviewer_full_name,
-                qu.username as reviewer_username,
-                cl.created_at as created_at
-            FROM conversation_analysis ca
-            INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
-            LEFT JOIN conversation_review_human crh ON ca.id = crh.analysis_id
-            LEFT JOIN qc_users qu ON crh.reviewer_id = qu.id
-            WHERE ca.id = %s
-        """
-
-        result = execute_query(query, (analysis_id,), fetch_one=True)
+        result = conversation_detail.load(analysis_id)
 
         if not result:
             raise HTTPException(status_code=404, detail="مکالمه یافت نشد")
 
+        # The cached row is shared; add the differences to a copy
+        result = dict(result)
+
         # Calculate score differences
         if result.get('human_review_id'):
             result['score_differences'] = {
@@ -192,3 +153,66 @@ async def get_conversation_comparison(analysis_id: str):
     except Exception as e:
 #        print(f"Error fetching conversation comparison: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت مقایسه: {sanitize_error_message(e)}")
+
+
+def _is_uuid(value) -> bool:
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+@router.get("/agreement")
+def get_agreement(
+    agent_id: Optional[str] = Query(None),
+    reviewer_id: Optional[str] = Query(None),
+    date_range: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    group_by: Optional[str] = Query(None, pattern="^(agent|reviewer)$"),
+    include_matrix: bool = Query(True, description="Include confusion matrices")
+):
+    """
+    Get aggregate AI vs human agreement per criterion (MAE, bias, correlation, kappa, confusion matrix)
+    Computed with NumPy over all reviewed conversations in the filter
+    """
+    # NumPy is only loaded when this report is first requested
+    from analytics.agreement import compute_agreement, fetch_pairs
+
+    try:
+        window = resolve_window(date_range, start_date, end_date)
+        columns = fetch_pairs(
+            window,
+            agent=agent_id if agent_id and agent_id != 'all' else None,
+            reviewer=reviewer_id,
+            group_by=group_by
+        )
+
+        overall = compute_agreement(columns, include_matrix=include_matrix)[0]
+        response = {"total": overall["count"], "overall": overall["metrics"]}
+
+        if group_by:
+            groups = compute_agreement(columns, grouped=True, include_matrix=include_matrix)
+
+            if group_by == 'reviewer' and groups:
+                # Only well-formed ids are looked up (NULL reviewers are not grouped)
+                reviewer_ids = [entry["group"] for entry in groups if _is_uuid(entry["group"])]
+                users = (execute_query(
+                    "SELECT id, full_name, username FROM qc_users WHERE id = ANY(%s::uuid[])",
+                    (reviewer_ids,), fetch_all=True, read_only=True
+                ) or []) if reviewer_ids else []
+                names = {str(user['id']): user for user in users}
+                for entry in groups:
+                    user = names.get(entry["group"], {})
+                    entry["reviewer_full_name"] = user.get('full_name')
+                    entry["reviewer_username"] = user.get('username')
+
+            response["groupBy"] = group_by
+            response["groups"] = groups
+
+        return response
+
+    except Exception as e:
+#        print(f"Error computing agreement: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در محاسبه میزان توافق: {sanitize_error_message(e)}")
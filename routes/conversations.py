@@ -2,11 +2,21 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
-from utils import sanitize_error_message
-from database import execute_query
+from utils import json_rows_response, sanitize_error_message
+from database import execute_query, iter_query
+from admission import analytics, interactive
+from analysis_dispatcher import enqueue_batch
+from config import get_settings
+import conversation_detail
+import base64
+from pydantic_core import to_json
+import json
+import uuid
 
 router = APIRouter(prefix="/conversations", tags=["Conversations"])
 
+settings = get_settings()
+
 
 class PaginatedResponse(BaseModel):
     data: List[Dict[str, Any]]
@@ -16,14 +26,50 @@ class PaginatedResponse(BaseModel):
     total_pages: int
 
 
-@router.get("/analyzed", response_model=PaginatedResponse)
-async def get_analyzed_conversations(
+def _analysis_filters(agent_id: Optional[str], date_range: Optional[str], start_date: Optional[str],
+                      end_date: Optional[str], status: Optional[str]):
+    """WHERE clauses and params for the agent / date / review status filters on ca + cl"""
+    where_clauses = []
+    params = []
+
+    # Agent filter
+    if agent_id and agent_id != 'all':
+        where_clauses.append(f"cl.agent_sender = %s")
+        params.append(agent_id)
+
+    # Review status filter
+    if status:
+        where_clauses.append(f"ca.review_status = %s")
+        params.append(status)
+
+    # Date range filter
+    if date_range or (start_date and end_date):
+        if date_range == 'today':
+            where_clauses.append(f"ca.created_at >= CURRENT_DATE")
+        elif date_range == 'yesterday':
+            where_clauses.append(f"ca.created_at >= CURRENT_DATE - INTERVAL '1 day' AND ca.created_at < CURRENT_DATE")
+        elif date_range == 'last7days':
+            where_clauses.append(f"ca.created_at >= CURRENT_DATE - INTERVAL '7 days'")
+        elif date_range == 'last30days':
+            where_clauses.append(f"ca.created_at >= CURRENT_DATE - INTERVAL '30 days'")
+        elif date_range == 'custom' and start_date and end_date:
+            where_clauses.append(f"ca.created_at >= %s::date AND ca.created_at < %s::date + INTERVAL '1 day'")
+            params.extend([start_date, end_date])
+
+    return where_clauses, params
+
+
+@router.get("/analyzed", response_model=PaginatedResponse, dependencies=[analytics])
+def get_analyzed_conversations(
     agent_id: Optional[str] = Query(None, description="Filter by agent extension"),
     unique_id: Optional[str] = Query(None, description="Search by call ID"),
     date_range: Optional[str] = Query(None, description="today, yesterday, last7days, last30days, custom"),
     start_date: Optional[str] = Query(None, description="Start date for custom range (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="End date for custom range (YYYY-MM-DD)"),
     status: Optional[str] = Query(None, description="pending_review or review_completed"),
+    include_transcript: bool = Query(True, description="Include conversation_data and silence_timeline"),
+    silence_format: str = Query("json", pattern="^(json|packed)$",
+                                description="packed: silence_ms [start, end, ...] in ms instead of silence_timeline"),
     page: int = Query(1, ge=1),
     page_size: int = Query(100, ge=1, le=10000)
 ):
@@ -33,40 +79,13 @@ async def get_analyzed_conversations(
     try:
         offset = (page - 1) * page_size
 
-        # Build WHERE clauses
-        where_clauses = []
-        params = []
-        param_counter = 1
-
-        # Agent filter
-        if agent_id and agent_id != 'all':
-            where_clauses.append(f"cl.agent_sender = %s")
-            params.append(agent_id)
+        where_clauses, params = _analysis_filters(agent_id, date_range, start_date, end_date, status)
 
         # Call ID search
         if unique_id and unique_id.strip():
             where_clauses.append(f"cl.unique_id ILIKE %s")
             params.append(f"%{unique_id.strip()}%")
 
-        # Review status filter
-        if status:
-            where_clauses.append(f"ca.review_status = %s")
-            params.append(status)
-
-        # Date range filter
-        if date_range or (start_date and end_date):
-            if date_range == 'today':
-                where_clauses.append(f"ca.created_at >= CURRENT_DATE")
-            elif date_range == 'yesterday':
-                where_clauses.append(f"ca.created_at >= CURRENT_DATE - INTERVAL '1 day' AND ca.created_at < CURRENT_DATE")
-            elif date_range == 'last7days':
-                where_clauses.append(f"ca.created_at >= CURRENT_DATE - INTERVAL '7 days'")
-            elif date_range == 'last30days':
-                where_clauses.append(f"ca.created_at >= CURRENT_DATE - INTERVAL '30 days'")
-            elif date_range == 'custom' and start_date and end_date:
-                where_clauses.append(f"ca.created_at >= %s::date AND ca.created_at < %s::date + INTERVAL '1 day'")
-                params.extend([start_date, end_date])
-
         where_sql = " AND " + " AND ".join(where_clauses) if where_clauses else ""
 
         # Count query
@@ -76,129 +95,230 @@ async def get_analyzed_conversations(
             INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
             WHERE 1=1 {where_sql}
         """
-        count_result = execute_query(count_query, tuple(params), fetch_one=True)
+        count_result = execute_query(count_query, tuple(params), fetch_one=True, read_only=True)
         total = count_result['count'] if count_result else 0
 
         # Data query
         data_query = f"""
-            SELECT
-                ca.*,
-                cl.conversation_data,
-                cl.agent_sender,
-                cl.unique_id,
-                cl.total_duration_seconds,
-                cl.total_silence_seconds,
-                cl.longest_silence_gap_seconds,
-                cl.silence_percentage,
-                cl.silence_timeline,
-                cl.user_sentiment_overall,
-                cl.agent_tone,
-                cl.agent_energy,
-                cl.agent_clarity,
-                cl.agent_patience,
-                crh.id as human_review_id,
-                crh.opening_score_override,
-                crh.listening_score_override,
-                crh.empathy_score_override,
-                crh.response_process_score_override,
-                crh.system_updation_score_override,
-                crh.closing_score_override,
-                crh.opening_justification_override,
-                crh.listening_justification_override,
-                crh.empathy_justification_override,
-                crh.response_process_justification_override,
-                crh.system_updation_justification_override,
-                crh.closing_justification_override,
-                crh.strengths_override,
-                crh.areas_for_improvement_override,
-                crh.total_weighted_score_human,
-                crh.final_percentage_score_human,
-                crh.other_criteria_weighted_score_human,
-                crh.other_criteria_percentage_score_human,
-                crh.reviewer_id,
-                qu.full_name as reviewer_full_name,
-                qu.username as reviewer_username,
-                cl.created_at as created_at
-            FROM conversation_analysis ca
-            INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
-            LEFT JOIN conversation_review_human crh ON ca.id = crh.analysis_id
-            LEFT JOIN qc_users qu ON crh.reviewer_id = qu.id
+            {conversation_detail.detail_select(include_transcript, packed_silence=silence_format == 'packed')}
             WHERE 1=1 {where_sql}
             ORDER BY cl.created_at DESC
             LIMIT %s OFFSET %s
         """
         params.extend([page_size, offset])
 
-        data = execute_query(data_query, tuple(params), fetch_all=True)
-
         total_pages = (total + page_size - 1) // page_size
 
-        return {
-            "data": data or [],
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": total_pages
-        }
+        # Pages go up to 10000 rows: stream them from the cursor, encoded as the
+        # PaginatedResponse model would be
+        return json_rows_response(
+            iter_query(data_query, tuple(params), read_only=True), encode=to_json,
+            total=total, page=page, page_size=page_size, total_pages=total_pages
+        )
 
     except Exception as e:
 #        print(f"Error fetching analyzed conversations: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت مکالمات تحلیل شده: {sanitize_error_message(e)}")
 
 
-@router.get("/analyzed/{analysis_id}")
-async def get_analyzed_conversation_by_id(analysis_id: str):
+# Same normalization as the indexed text (migrations/add_transcript_search.sql)
+TRANSCRIPT_QUERY = "websearch_to_tsquery('public.persian', qc_normalize_persian(%s))"
+# Normalization 1: divide by 1 + log(length) so long calls do not win by size alone
+TRANSCRIPT_RANK = f"ts_rank(cl.transcript_tsv, {TRANSCRIPT_QUERY}, 1)"
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=3, MinWords=5, MaxWords=20, FragmentDelimiter=" … "'
+
+SEARCH_SORTS = ('relevance', 'recent')
+
+
+def _encode_cursor(sort: str, row: dict) -> str:
+    key = [row['created_at'].isoformat(), str(row['id'])]
+    if sort == 'relevance':
+        key.insert(0, row['rank'])
+    return base64.urlsafe_b64encode(json.dumps({"s": sort, "k": key}).encode()).decode()
+
+
+def _decode_cursor(cursor: str, sort: str) -> list:
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key = decoded["k"]
+        if decoded["s"] != sort or len(key) != (3 if sort == 'relevance' else 2):
+            raise ValueError(cursor)
+        if sort == 'relevance':
+            float(key[0])
+        datetime.fromisoformat(key[-2])
+        uuid.UUID(key[-1])
+        return key
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="cursor نامعتبر است")
+
+
+@router.get("/search", dependencies=[analytics])
+def search_conversations(
+    q: str = Query(..., min_length=2, max_length=200, description="Words or \"exact phrase\"; -word excludes, or combines"),
+    agent_id: Optional[str] = Query(None, description="Filter by agent extension"),
+    date_range: Optional[str] = Query(None, description="today, yesterday, last7days, last30days, custom"),
+    start_date: Optional[str] = Query(None, description="Start date for custom range (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date for custom range (YYYY-MM-DD)"),
+    status: Optional[str] = Query(None, description="pending_review or review_completed"),
+    sort: str = Query('relevance', description="relevance or recent"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    page_size: int = Query(20, ge=1, le=100)
+):
     """
-    Get single analyzed conversation with all details
+    Search analyzed conversations by what was said in the call
+
+    Matches the transcript against the GIN-indexed transcript_tsv column and
+    returns the detail rows without the transcript, each with its rank and a
+    highlighted snippet. Pages are keyset-based: pass next_cursor to continue.
     """
     try:
-        query = """
-            SELECT
-                ca.*,
-                cl.conversation_data,
-                cl.agent_sender,
-                cl.unique_id,
-                cl.total_duration_seconds,
-                cl.total_silence_seconds,
-                cl.longest_silence_gap_seconds,
-                cl.silence_percentage,
-                cl.silence_timeline,
-                cl.user_sentiment_overall,
-                cl.agent_tone,
-                cl.agent_energy,
-                cl.agent_clarity,
-                cl.agent_patience,
-                crh.id as human_review_id,
-                crh.opening_score_override,
-                crh.listening_score_override,
-                crh.empathy_score_override,
-                crh.response_process_score_override,
-                crh.system_updation_score_override,
-                crh.closing_score_override,
-                crh.opening_justification_override,
-                crh.listening_justification_override,
-                crh.empathy_justification_override,
-                crh.response_process_justification_override,
-                crh.system_updation_justification_override,
-                crh.closing_justification_override,
-                crh.strengths_override,
-                crh.areas_for_improvement_override,
-                crh.total_weighted_score_human,
-                crh.final_percentage_score_human,
-                crh.other_criteria_weighted_score_human,
-                crh.other_criteria_percentage_score_human,
-                crh.reviewer_id,
-                qu.full_name as reviewer_full_name,
-                qu.username as reviewer_username,
-                cl.created_at as created_at
-            FROM conversation_analysis ca
-            INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
-            LEFT JOIN conversation_review_human crh ON ca.id = crh.analysis_id
-            LEFT JOIN qc_users qu ON crh.reviewer_id = qu.id
-            WHERE ca.id = %s
+        text = q.strip()
+        if not text:
+            raise HTTPException(status_code=400, detail="عبارت جستجو خالی است")
+        if sort not in SEARCH_SORTS:
+            raise HTTPException(status_code=400, detail=f"مرتب‌سازی نامعتبر: {sort}")
+
+        filter_clauses, filter_params = _analysis_filters(agent_id, date_range, start_date, end_date, status)
+        where_clauses = [f"cl.transcript_tsv @@ {TRANSCRIPT_QUERY}", *filter_clauses]
+        params = [text, text, *filter_params]
+
+        if cursor:
+            key = _decode_cursor(cursor, sort)
+            if sort == 'relevance':
+                where_clauses.append(f"({TRANSCRIPT_RANK}, cl.created_at, ca.id) < (%s::real, %s::timestamptz, %s::uuid)")
+                params.extend([text, *key])
+            else:
+                where_clauses.append("(cl.created_at, ca.id) < (%s::timestamptz, %s::uuid)")
+                params.extend(key)
+
+        if sort == 'relevance':
+            hit_order = "rank DESC, cl.created_at DESC, ca.id DESC"
+            page_order = "hits.rank DESC, hits.created_at DESC, hits.id DESC"
+        else:
+            hit_order = "cl.created_at DESC, ca.id DESC"
+            page_order = "hits.created_at DESC, hits.id DESC"
+
+        # Rank and filter over the index matches, then join the details and
+        # build snippets for the page rows only
+        query = f"""
+            WITH hits AS (
+                SELECT ca.id, cl.created_at, {TRANSCRIPT_RANK} AS rank
+                FROM conversation_analysis ca
+                INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+                WHERE {" AND ".join(where_clauses)}
+                ORDER BY {hit_order}
+                LIMIT %s
+            )
+            SELECT {conversation_detail.DETAIL_COLUMNS_LIGHT},
+                hits.rank,
+                ts_headline('public.persian', qc_transcript_text(cl.conversation_data), {TRANSCRIPT_QUERY}, %s) as headline
+            {conversation_detail.DETAIL_FROM}
+            INNER JOIN hits ON hits.id = ca.id
+            ORDER BY {page_order}
         """
+        params.extend([page_size + 1, text, HEADLINE_OPTIONS])
+
+        rows = execute_query(query, tuple(params), fetch_all=True, read_only=True) or []
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        return {
+            "data": rows,
+            "next_cursor": _encode_cursor(sort, rows[-1]) if has_more else None,
+            "page_size": page_size
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+#        print(f"Error searching conversations: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در جستجوی مکالمات: {sanitize_error_message(e)}")
+
+
+class DetailBatchRequest(BaseModel):
+    analysis_ids: List[str]
+    include_transcript: bool = True
+
+
+def _canonical_uuid(value: str) -> Optional[str]:
+    """Lowercase hyphenated form (as ids come back from the database), or None if not a UUID"""
+    try:
+        return str(uuid.UUID(value))
+    except ValueError:
+        return None
+
+
+def _load_batch(analysis_ids: List[str], include_transcript: bool) -> dict:
+    values = [str(value).strip() for value in analysis_ids if str(value).strip()]
+
+    if not values:
+        raise HTTPException(status_code=400, detail="حداقل یک شناسه تحلیل لازم است")
+    invalid = [value for value in values if _canonical_uuid(value) is None]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"شناسه تحلیل نامعتبر: {', '.join(invalid[:5])}")
+
+    # Canonical form (hyphenless, {...} and urn:uuid: variants match their rows), order of first appearance
+    requested = list(dict.fromkeys(_canonical_uuid(value) for value in values))
+    if len(requested) > settings.DETAIL_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"حداکثر {settings.DETAIL_BATCH_MAX_IDS} مکالمه در هر درخواست مجاز است"
+        )
+
+    rows = conversation_detail.load_many(requested, include_transcript)
+
+    return {
+        "data": [rows[analysis_id] for analysis_id in requested if analysis_id in rows],
+        "missing": [analysis_id for analysis_id in requested if analysis_id not in rows],
+        "total": len(rows)
+    }
+
+
+# Declared before /analyzed/{analysis_id} so "batch" is not taken as an ID
+@router.get("/analyzed/batch", dependencies=[interactive])
+def get_analyzed_conversations_batch(
+    ids: str = Query(..., description="Comma-separated analysis IDs"),
+    include_transcript: bool = Query(True, description="Include conversation_data and silence_timeline")
+):
+    """
+    Get several analyzed conversations in one request, in the requested order
+
+    Rows are served from the detail cache where possible; the rest come from a
+    single query. IDs that do not exist are listed in `missing`.
+    """
+    try:
+        return _load_batch(ids.split(","), include_transcript)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+#        print(f"Error fetching conversation batch: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در دریافت مکالمات: {sanitize_error_message(e)}")
 
-        result = execute_query(query, (analysis_id,), fetch_one=True)
+
+@router.post("/analyzed/batch", dependencies=[interactive])
+def post_analyzed_conversations_batch(request: DetailBatchRequest):
+    """
+    Same as GET /analyzed/batch, for ID lists too long for a query string
+    """
+    try:
+        return _load_batch(request.analysis_ids, request.include_transcript)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+#        print(f"Error fetching conversation batch: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در دریافت مکالمات: {sanitize_error_message(e)}")
+
+
+@router.get("/analyzed/{analysis_id}", dependencies=[interactive])
+def get_analyzed_conversation_by_id(analysis_id: str):
+    """
+    Get single analyzed conversation with all details
+    """
+    try:
+        result = conversation_detail.load(analysis_id)
 
         if not result:
             raise HTTPException(status_code=404, detail="مکالمه یافت نشد")
@@ -212,8 +332,8 @@ async def get_analyzed_conversation_by_id(analysis_id: str):
         raise HTTPException(status_code=500, detail=f"خطا در دریافت مکالمه: {sanitize_error_message(e)}")
 
 
-@router.get("/unanalyzed", response_model=PaginatedResponse)
-async def get_unanalyzed_conversations(
+@router.get("/unanalyzed", response_model=PaginatedResponse, dependencies=[analytics])
+def get_unanalyzed_conversations(
     agent_id: Optional[str] = Query(None),
     unique_id: Optional[str] = Query(None),
     page: int = Query(1, ge=1),
@@ -241,7 +361,7 @@ async def get_unanalyzed_conversations(
 
         # Count query
         count_query = f"SELECT COUNT(*) FROM conversations_log WHERE {where_sql}"
-        count_result = execute_query(count_query, tuple(params), fetch_one=True)
+        count_result = execute_query(count_query, tuple(params), fetch_one=True, read_only=True)
         total = count_result['count'] if count_result else 0
 
         # Data query
@@ -254,39 +374,125 @@ async def get_unanalyzed_conversations(
         """
         params.extend([page_size, offset])
 
-        data = execute_query(data_query, tuple(params), fetch_all=True)
-
         total_pages = (total + page_size - 1) // page_size
 
-        return {
-            "data": data or [],
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": total_pages
-        }
+        # Pages go up to 10000 rows: stream them from the cursor, encoded as the
+        # PaginatedResponse model would be
+        return json_rows_response(
+            iter_query(data_query, tuple(params), read_only=True), encode=to_json,
+            total=total, page=page, page_size=page_size, total_pages=total_pages
+        )
 
     except Exception as e:
 #        print(f"Error fetching unanalyzed conversations: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت مکالمات تحلیل نشده: {sanitize_error_message(e)}")
 
 
-@router.post("/analyze/batch")
-async def trigger_batch_analysis(unique_ids: List[str]):
+@router.post("/analyze/batch", dependencies=[interactive])
+def trigger_batch_analysis(unique_ids: List[str]):
     """
-    Trigger AI analysis for multiple conversations via n8n webhook
-    Note: This is a placeholder - actual n8n triggering should be implemented
+    Queue AI analysis for multiple conversations via the n8n webhook
+
+    Returns immediately; analysis_dispatcher drains the queue at a controlled
+    rate. IDs that are already queued, dispatched or analyzed are skipped and
+    listed with the job and batch they already belong to; batch_id is null when
+    nothing new was queued.
     """
     try:
-        # TODO: Implement n8n webhook calls
-        # For each unique_id, call: https://n8n.basalam.dev/webhook/analysis?unique_id={unique_id}
+        if len(unique_ids) > settings.ANALYSIS_BATCH_MAX_IDS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"حداکثر {settings.ANALYSIS_BATCH_MAX_IDS} مکالمه در هر درخواست مجاز است"
+            )
+
+        batch_id = str(uuid.uuid4())
+        jobs = enqueue_batch(batch_id, unique_ids)
+        queued = [job for job in jobs if job['queued']]
+        skipped = [
+            {key: job[key] for key in ('unique_id', 'job_id', 'batch_id', 'status')}
+            for job in jobs if not job['queued']
+        ]
 
         return {
-            "message": f"{len(unique_ids)} مکالمه برای تحلیل ارسال شد",
-            "unique_ids": unique_ids,
-            "note": "این قابلیت نیاز به پیاده‌سازی فراخوانی webhook دارد"
+            "message": f"{len(queued)} مکالمه برای تحلیل ارسال شد",
+            # No jobs were created under a new batch when everything was skipped
+            "batch_id": batch_id if queued else None,
+            "queued": len(queued),
+            "skipped": len(unique_ids) - len(queued),
+            "skipped_jobs": skipped
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
 #        print(f"Error triggering batch analysis: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در ارسال برای تحلیل: {sanitize_error_message(e)}")
+
+
+@router.get("/analyze/batch/{batch_id}", dependencies=[interactive])
+def get_batch_analysis_status(batch_id: uuid.UUID):
+    """
+    Get progress of a batch analysis request (job counts by status, failed jobs)
+    """
+    try:
+        counts_query = """
+            SELECT status, COUNT(*) as count
+            FROM analysis_jobs
+            WHERE batch_id = %s
+            GROUP BY status
+        """
+        counts = execute_query(counts_query, (str(batch_id),), fetch_all=True, row_type='tuple')
+
+        if not counts:
+            raise HTTPException(status_code=404, detail="درخواست تحلیل یافت نشد")
+
+        failed_query = """
+            SELECT id, unique_id, attempts, last_status_code, last_error, updated_at
+            FROM analysis_jobs
+            WHERE batch_id = %s AND status = 'failed'
+            ORDER BY updated_at DESC
+            LIMIT 100
+        """
+        failed = execute_query(failed_query, (str(batch_id),), fetch_all=True)
+
+        by_status = {status: int(count) for status, count in counts}
+
+        return {
+            "batch_id": batch_id,
+            "total": sum(by_status.values()),
+            "queued": by_status.get('queued', 0),
+            "running": by_status.get('running', 0),
+            "succeeded": by_status.get('succeeded', 0),
+            "failed": by_status.get('failed', 0),
+            "failed_jobs": failed or []
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در دریافت وضعیت تحلیل: {sanitize_error_message(e)}")
+
+
+@router.get("/analyze/jobs/{job_id}", dependencies=[interactive])
+def get_analysis_job(job_id: uuid.UUID):
+    """
+    Get a single analysis job
+    """
+    try:
+        query = """
+            SELECT id, batch_id, unique_id, status, attempts, last_status_code, last_error,
+                   next_attempt_at, created_at, updated_at, completed_at
+            FROM analysis_jobs
+            WHERE id = %s
+        """
+        result = execute_query(query, (str(job_id),), fetch_one=True)
+
+        if not result:
+            raise HTTPException(status_code=404, detail="درخواست تحلیل یافت نشد")
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در دریافت وضعیت تحلیل: {sanitize_error_message(e)}")
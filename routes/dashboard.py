@@ -1,13 +1,16 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import Optional, Dict, Any
 from database import execute_query
+from admission import analytics
+from analytics.distribution import SOURCES, fetch_histograms, summarize
+from analytics.windows import resolve_window
 
 from utils import sanitize_error_message
-router = APIRouter(prefix="/dashboard", tags=["Dashboard & Statistics"])
+router = APIRouter(prefix="/dashboard", tags=["Dashboard & Statistics"], dependencies=[analytics])
 
 
 @router.get("/kpis")
-async def get_dashboard_kpis(
+def get_dashboard_kpis(
     agent_id: Optional[str] = Query(None),
     date_range: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -74,7 +77,7 @@ async def get_dashboard_kpis(
             WHERE 1=1 {where_sql}
         """
 
-        result = execute_query(query, tuple(params) if params else None, fetch_one=True)
+        result = execute_query(query, tuple(params) if params else None, fetch_one=True, read_only=True)
 
         if not result:
             # Return zeros if no data
@@ -131,7 +134,7 @@ async def get_dashboard_kpis(
 
 
 @router.get("/score-trends")
-async def get_score_trends(
+def get_score_trends(
     agent_id: Optional[str] = Query(None),
     date_range: Optional[str] = Query('last7days'),
     start_date: Optional[str] = Query(None),
@@ -174,7 +177,7 @@ async def get_score_trends(
             ORDER BY DATE(ca.created_at) ASC
         """
 
-        results = execute_query(query, tuple(params) if params else None, fetch_all=True)
+        results = execute_query(query, tuple(params) if params else None, fetch_all=True, read_only=True)
 
         return {"data": results or []}
 
@@ -184,7 +187,7 @@ async def get_score_trends(
 
 
 @router.get("/criteria-scores")
-async def get_criteria_scores(
+def get_criteria_scores(
     agent_id: Optional[str] = Query(None),
     date_range: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -227,7 +230,7 @@ async def get_criteria_scores(
             WHERE 1=1 {where_sql}
         """
 
-        result = execute_query(query, tuple(params) if params else None, fetch_one=True)
+        result = execute_query(query, tuple(params) if params else None, fetch_one=True, read_only=True)
 
         return {
             "opening": float(result['average_opening'] or 0) if result else 0,
@@ -242,7 +245,7 @@ async def get_criteria_scores(
 
 
 @router.get("/human-criteria-scores")
-async def get_human_criteria_scores(
+def get_human_criteria_scores(
     agent_id: Optional[str] = Query(None),
     date_range: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -283,7 +286,7 @@ async def get_human_criteria_scores(
             WHERE {where_sql}
         """
 
-        result = execute_query(query, tuple(params) if params else None, fetch_one=True)
+        result = execute_query(query, tuple(params) if params else None, fetch_one=True, read_only=True)
 
         return {
             "responseProcess": float(result['average_response_process'] or 0) if result else 0,
@@ -296,7 +299,7 @@ async def get_human_criteria_scores(
 
 
 @router.get("/sentiment-distribution")
-async def get_sentiment_distribution(
+def get_sentiment_distribution(
     agent_id: Optional[str] = Query(None),
     date_range: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -338,7 +341,7 @@ async def get_sentiment_distribution(
             GROUP BY customer_sentiment_label
         """
 
-        results = execute_query(query, tuple(params) if params else None, fetch_all=True)
+        results = execute_query(query, tuple(params) if params else None, fetch_all=True, read_only=True)
 
         # Convert to dict
         distribution = {row['customer_sentiment_label']: row['count'] for row in results} if results else {}
@@ -355,7 +358,7 @@ async def get_sentiment_distribution(
 
 
 @router.get("/top-topics")
-async def get_top_topics(
+def get_top_topics(
     agent_id: Optional[str] = Query(None),
     date_range: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
@@ -403,10 +406,87 @@ async def get_top_topics(
         """
         params.append(limit)
 
-        results = execute_query(query, tuple(params) if params else (limit,), fetch_all=True)
+        results = execute_query(query, tuple(params) if params else (limit,), fetch_all=True, read_only=True)
 
         return {"topics": results or []}
 
     except Exception as e:
 #        print(f"Error fetching top topics: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت موضوعات پربسامد: {sanitize_error_message(e)}")
+
+
+@router.get("/score-distribution")
+def get_score_distribution(
+    agent_id: Optional[str] = Query(None),
+    date_range: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    bucket_size: int = Query(10, ge=1, le=50, description="Histogram bucket width in score points"),
+    by_agent: bool = Query(False, description="Return one distribution per agent")
+):
+    """
+    Get AI and human final score distributions (p10/p50/p90 + histogram)
+    Served from the daily score histograms; percentiles are accurate to one score point
+    """
+    try:
+        window = resolve_window(date_range, start_date, end_date)
+        agent = agent_id if agent_id and agent_id != 'all' else None
+        histograms = fetch_histograms(window, agent=agent, by_agent=by_agent)
+
+        def _distributions(per_source):
+            return {source: summarize(per_source[source], bucket_size) for source in SOURCES}
+
+        if by_agent:
+            agents = [
+                {"agentExtension": str(agent_sender), **_distributions(per_source)}
+                for agent_sender, per_source in sorted(histograms.items(), key=lambda item: str(item[0]))
+            ]
+            return {"agents": agents, "total": len(agents)}
+
+        empty = {source: [0] * 101 for source in SOURCES}
+        return _distributions(histograms.get(None, empty))
+
+    except Exception as e:
+#        print(f"Error fetching score distribution: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در دریافت توزیع امتیازات: {sanitize_error_message(e)}")
+
+
+# Window for /silence when the request gives none (or an incomplete custom range)
+SILENCE_DEFAULT_RANGE = 'last30days'
+
+
+@router.get("/silence")
+def get_silence_analytics(
+    agent_id: Optional[str] = Query(None),
+    date_range: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    long_gap_seconds: float = Query(10, gt=0, le=600, description="Gap length counted as a long silence"),
+    by_agent: bool = Query(True, description="Include per-agent silence distributions")
+):
+    """
+    Get silence analytics over call timelines: gap length histogram, silence by call
+    phase (opening 15% / middle / closing 15%) and per-agent silence distributions
+    Computed with NumPy from the packed silence intervals of every call in the filter;
+    without a date range it covers the last 30 days
+    """
+    # NumPy is only loaded when this report is first requested
+    from analytics.silence import agent_distributions, fetch_gaps, gap_histogram, silence_by_phase
+
+    try:
+        # Every gap of every call is loaded into memory: never scan all time
+        window = resolve_window(date_range, start_date, end_date) or resolve_window(SILENCE_DEFAULT_RANGE)
+        gaps = fetch_gaps(window, agent=agent_id if agent_id and agent_id != 'all' else None)
+
+        response = {
+            "calls": gaps.calls,
+            "gapLengths": gap_histogram(gaps),
+            "phases": silence_by_phase(gaps),
+        }
+        if by_agent:
+            response["agents"] = agent_distributions(gaps, long_gap_seconds=long_gap_seconds)
+        return response
+
+    except Exception as e:
+#        print(f"Error computing silence analytics: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در محاسبه تحلیل سکوت: {sanitize_error_message(e)}")
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from config import get_settings
+from events import broker
+from security import verify_token
+import asyncio
+import json
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+settings = get_settings()
+
+
+def _format_event(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    agent_id: Optional[str] = Query(None, description="Only events for this agent extension"),
+    types: Optional[str] = Query(None, description="Comma-separated event types, e.g. analysis_created,review_submitted"),
+    access_token: Optional[str] = Query(None, description="JWT from /auth/login (EventSource cannot send headers)")
+):
+    """
+    Server-Sent Events stream of queue/dashboard changes
+
+    Event types: analysis_created, analysis_updated, review_submitted,
+    settings_changed and resync (client should refetch everything).
+    Clients refresh only the views affected by an event instead of polling.
+    With AUTH_REQUIRED the token is taken from `access_token` or the Authorization header.
+    """
+    if settings.AUTH_REQUIRED:
+        header = request.headers.get("authorization", "")
+        token = access_token or (header[7:] if header.lower().startswith("bearer ") else None)
+        if not token:
+            raise HTTPException(status_code=401, detail="احراز هویت لازم است",
+                                headers={"WWW-Authenticate": "Bearer"})
+        # May refresh the revocation list from the database: keep it off the event loop
+        await run_in_threadpool(verify_token, token)
+
+    agent = agent_id if agent_id and agent_id != 'all' else None
+    type_filter = {t.strip() for t in types.split(',') if t.strip()} if types else None
+    subscription = broker.subscribe(agent=agent, types=type_filter)
+
+    async def event_stream():
+        try:
+            yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    # Server is draining
+                    break
+                yield _format_event(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,185 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from database import statement_timeout_ms
+from config import get_settings
+from ingest import AnalysisBatch, Batch, CallBatch, IngestError, merge_analyses, merge_calls
+from utils import sanitize_error_message
+import io
+import json
+import psycopg2
+import tempfile
+
+router = APIRouter(prefix="/ingest", tags=["Ingestion"])
+
+settings = get_settings()
+
+NDJSON_TYPES = ("ndjson", "jsonl", "jsonlines")
+
+# JSON arrays are decoded one element at a time from chunks of this size; a single
+# row may not exceed MAX_ROW_CHARS, so parsing memory stays bounded whatever the body size
+READ_CHUNK_CHARS = 64 * 1024
+MAX_ROW_CHARS = 16 * 1024 * 1024
+
+
+async def _spool_body(request: Request):
+    """Request body in a temp file (memory up to 16 MB), so parsing can run off the event loop"""
+    limit = settings.INGEST_MAX_BODY_MB * 1024 * 1024
+    body = tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024)
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > limit:
+                raise HTTPException(status_code=413, detail=f"حجم درخواست بیش از {settings.INGEST_MAX_BODY_MB} مگابایت است")
+            body.write(chunk)
+    except BaseException:
+        body.close()
+        raise
+    body.seek(0)
+    return body
+
+
+def _iter_array(text):
+    """Elements of a top-level JSON array, decoded incrementally (never the whole body at once)"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    state = "start"  # start -> first (after '[') -> separator / value -> ... -> end
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+        if state == "end":
+            if position < len(buffer):
+                raise IngestError("بدنه درخواست JSON معتبر نیست")
+            if eof:
+                return
+        elif position < len(buffer):
+            char = buffer[position]
+            if state == "start":
+                if char != "[":
+                    raise IngestError("بدنه درخواست باید آرایه‌ای از ردیف‌ها باشد")
+                position += 1
+                state = "first"
+                continue
+            if char == "]" and state in ("first", "separator"):
+                position += 1
+                state = "end"
+                continue
+            if state == "separator":
+                if char != ",":
+                    raise IngestError("بدنه درخواست JSON معتبر نیست")
+                position += 1
+                state = "value"
+                continue
+
+            try:
+                row, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                # Incomplete element: read more, unless the body has ended
+                if eof:
+                    raise IngestError("بدنه درخواست JSON معتبر نیست")
+                if len(buffer) - position > MAX_ROW_CHARS:
+                    raise IngestError("حجم یک ردیف بیش از حد مجاز است")
+            else:
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(buffer) or eof:
+                    position = end
+                    state = "separator"
+                    yield row
+                    continue
+        elif eof:
+            raise IngestError("بدنه درخواست JSON معتبر نیست" if state != "start" else "هیچ ردیفی ارسال نشده است")
+
+        chunk = text.read(READ_CHUNK_CHARS)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def _parse(body, ndjson: bool, batch: Batch):
+    text = io.TextIOWrapper(body, encoding="utf-8")
+    if ndjson:
+        # One JSON object per line, rows are added as they are read
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                raise IngestError(f"خط {line_number}: JSON نامعتبر است")
+            batch.add(row)
+    else:
+        # Rows go straight into the batch file as they are decoded
+        for row in _iter_array(text):
+            batch.add(row)
+
+    if not batch.rows:
+        raise IngestError("هیچ ردیفی ارسال نشده است")
+
+
+def _ingest(body, ndjson: bool, batch_class, merge) -> dict:
+    batch = batch_class()
+    try:
+        _parse(body, ndjson, batch)
+        return merge(batch)
+    finally:
+        batch.close()
+        body.close()
+
+
+async def _handle(request: Request, batch_class, merge) -> dict:
+    content_type = request.headers.get("content-type", "").lower()
+    ndjson = any(kind in content_type for kind in NDJSON_TYPES)
+
+    # Whole-batch statements (COPY, merge, rollup refresh) need more than the interactive budget
+    statement_timeout_ms.set(settings.INGEST_STATEMENT_TIMEOUT_MS)
+    body = await _spool_body(request)
+    try:
+        return await run_in_threadpool(_ingest, body, ndjson, batch_class, merge)
+
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (psycopg2.DataError, psycopg2.IntegrityError) as e:
+        # Values the database rejects (bad number / timestamp / JSON, missing required column)
+        raise HTTPException(status_code=400, detail=f"داده نامعتبر: {sanitize_error_message(e)}")
+
+
+@router.post("/calls")
+async def ingest_calls(request: Request):
+    """
+    Upsert call logs (conversations_log) by unique_id
+
+    Body: JSON array of call objects, or NDJSON (Content-Type: application/x-ndjson).
+    Fields that are missing or null keep their stored value; the last row for a
+    unique_id wins. One transaction and one change notification per batch.
+    """
+    try:
+        return await _handle(request, CallBatch, merge_calls)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+#        print(f"Error ingesting calls: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در ثبت تماس‌ها: {sanitize_error_message(e)}")
+
+
+@router.post("/analyses")
+async def ingest_analyses(request: Request):
+    """
+    Upsert AI analyses (conversation_analysis) by conversation_id and mark the calls analyzed
+
+    Each row names its call by conversation_id or by the call's unique_id. Rows
+    whose call does not exist are skipped and listed in `unmatched`. Same body
+    formats and merge rules as /ingest/calls.
+    """
+    try:
+        return await _handle(request, AnalysisBatch, merge_analyses)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+#        print(f"Error ingesting analyses: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در ثبت تحلیل‌ها: {sanitize_error_message(e)}")
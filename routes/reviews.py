@@ -1,13 +1,24 @@
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-from database import execute_query
-from utils import sanitize_error_message
+from database import execute_query, iter_query
+from admission import analytics, interactive
+from analytics.windows import resolve_window
+from config import get_settings
+from utils import json_rows_response, sanitize_error_message
+from security import session_user
 import json
+import uuid
 from psycopg2.extras import Json
+import conversation_detail
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/reviews", tags=["QC Reviews"])
 
+settings = get_settings()
+
 
 class ReviewSubmission(BaseModel):
     analysis_id: str
@@ -32,8 +43,25 @@ class ReviewSubmission(BaseModel):
     other_criteria_percentage_score_human: float
 
 
-@router.get("/pending")
-async def get_pending_reviews(
+class ClaimUpdate(BaseModel):
+    reviewer_id: Optional[str] = None  # Taken from the token with AUTH_REQUIRED
+    analysis_ids: Optional[List[str]] = None  # None = all of the reviewer's claims
+
+
+def _claim_reviewer(reviewer_id: Optional[str], user: Optional[dict]) -> str:
+    """Reviewer the claim endpoints act for: the signed-in user with AUTH_REQUIRED, else a valid reviewer_id"""
+    if user is not None:
+        if reviewer_id and reviewer_id.lower() != user['id'].lower():
+            raise HTTPException(status_code=403, detail="امکان تغییر بررسی‌های ناظر دیگر وجود ندارد")
+        return user['id']
+    try:
+        return str(uuid.UUID(reviewer_id))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="شناسه ناظر نامعتبر است")
+
+
+@router.get("/pending", dependencies=[interactive])
+def get_pending_reviews(
     agent_id: Optional[str] = Query(None, description="Filter by agent extension")
 ):
     """
@@ -70,33 +98,86 @@ async def get_pending_reviews(
             ORDER BY cl.created_at ASC
         """
 
-        data = execute_query(query, tuple(params) if params else None, fetch_all=True)
-
-        return {"data": data or [], "total": len(data or [])}
+        # Unbounded list with transcripts: stream rows from the cursor
+        return json_rows_response(
+            iter_query(query, tuple(params) if params else None, read_only=False), count_field="total"
+        )
 
     except Exception as e:
 #        print(f"Error fetching pending reviews: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت بررسی‌های در انتظار: {sanitize_error_message(e)}")
 
 
-@router.get("/completed")
-async def get_completed_reviews(
-    agent_id: Optional[str] = Query(None, description="Filter by agent extension")
+@router.post("/claim", dependencies=[interactive])
+def claim_reviews(
+    reviewer_id: Optional[str] = Query(None, description="Reviewer (qc_users.id) claiming the work; from the token with AUTH_REQUIRED"),
+    n: int = Query(10, ge=1, le=settings.REVIEW_CLAIM_MAX_BATCH, description="Number of conversations to claim"),
+    agent_id: Optional[str] = Query(None, description="Filter by agent extension"),
+    user: Optional[dict] = session_user
 ):
     """
-    Get completed QC reviews
+    Atomically claim the next N pending reviews for a reviewer
+
+    Rows locked or leased by other reviewers are skipped (FOR UPDATE SKIP LOCKED),
+    so concurrent reviewers always receive disjoint work. The reviewer's own
+    unexpired claims are renewed and returned first (up to N), then new rows fill
+    the rest, so refreshes are idempotent.
     """
+    reviewer_id = _claim_reviewer(reviewer_id, user)
     try:
-        where_clause = "ca.review_status = 'review_completed'"
-        params = []
+        agent_filter = ""
+        agent_params = []
 
         if agent_id and agent_id != 'all':
-            where_clause += " AND cl.agent_sender = %s"
-            params.append(agent_id)
+            agent_filter = """
+                AND EXISTS (
+                    SELECT 1 FROM conversations_log cl
+                    WHERE cl.id = ca.conversation_id AND cl.agent_sender = %s
+                )
+            """
+            agent_params.append(agent_id)
+
+        params = [reviewer_id, *agent_params, n, *agent_params, n,
+                  reviewer_id, settings.REVIEW_CLAIM_LEASE_SECONDS]
 
+        # The reviewer's live claims come first so a refresh never drops them,
+        # then the oldest free (or expired) rows fill the batch up to n
         query = f"""
+            WITH own AS (
+                SELECT ca.id
+                FROM conversation_analysis ca
+                WHERE ca.review_status = 'pending_review'
+                    AND ca.claimed_by = %s AND ca.claim_expires_at >= NOW()
+                    {agent_filter}
+                ORDER BY ca.created_at ASC
+                LIMIT %s
+                FOR UPDATE
+            ),
+            fresh AS (
+                SELECT ca.id
+                FROM conversation_analysis ca
+                WHERE ca.review_status = 'pending_review'
+                    AND (ca.claimed_by IS NULL OR ca.claim_expires_at < NOW())
+                    {agent_filter}
+                ORDER BY ca.created_at ASC
+                LIMIT GREATEST(%s - (SELECT COUNT(*) FROM own), 0)
+                FOR UPDATE SKIP LOCKED
+            ),
+            next_batch AS (
+                SELECT id FROM own
+                UNION ALL
+                SELECT id FROM fresh
+            ),
+            claimed AS (
+                UPDATE conversation_analysis ca
+                SET claimed_by = %s,
+                    claim_expires_at = NOW() + make_interval(secs => %s)
+                FROM next_batch
+                WHERE ca.id = next_batch.id
+                RETURNING ca.*
+            )
             SELECT
-                ca.*,
+                claimed.*,
                 cl.conversation_data,
                 cl.agent_sender,
                 cl.unique_id,
@@ -110,48 +191,299 @@ async def get_completed_reviews(
                 cl.agent_energy,
                 cl.agent_clarity,
                 cl.agent_patience,
-                crh.id as human_review_id,
-                crh.opening_score_override,
-                crh.listening_score_override,
-                crh.empathy_score_override,
-                crh.response_process_score_override,
-                crh.system_updation_score_override,
-                crh.closing_score_override,
-                crh.opening_justification_override,
-                crh.listening_justification_override,
-                crh.empathy_justification_override,
-                crh.response_process_justification_override,
-                crh.system_updation_justification_override,
-                crh.closing_justification_override,
-                crh.strengths_override,
-                crh.areas_for_improvement_override,
-                crh.total_weighted_score_human,
-                crh.final_percentage_score_human,
-                crh.other_criteria_weighted_score_human,
-                crh.other_criteria_percentage_score_human,
-                crh.reviewer_id,
-                qu.full_name as reviewer_full_name,
-                qu.username as reviewer_username,
                 cl.created_at as created_at
-            FROM conversation_analysis ca
-            INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
-            LEFT JOIN conversation_review_human crh ON ca.id = crh.analysis_id
-            LEFT JOIN qc_users qu ON crh.reviewer_id = qu.id
+            FROM claimed
+            INNER JOIN conversations_log cl ON claimed.conversation_id = cl.id
+            ORDER BY claimed.created_at ASC
+        """
+
+        data = execute_query(query, tuple(params), fetch_all=True)
+
+        for row in data or []:
+            conversation_detail.invalidate(row['id'])
+
+        return {
+            "data": data or [],
+            "total": len(data or []),
+            "lease_seconds": settings.REVIEW_CLAIM_LEASE_SECONDS
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در تخصیص بررسی‌ها: {sanitize_error_message(e)}")
+
+
+@router.post("/claim/heartbeat", dependencies=[interactive])
+def heartbeat_claims(claim: ClaimUpdate, user: Optional[dict] = session_user):
+    """
+    Extend the lease on a reviewer's active claims
+
+    Returns the renewed analysis IDs; IDs missing from the result were lost
+    (lease expired and claimed by someone else, or already reviewed).
+    """
+    reviewer_id = _claim_reviewer(claim.reviewer_id, user)
+    try:
+        id_filter = ""
+        params = [settings.REVIEW_CLAIM_LEASE_SECONDS, reviewer_id]
+
+        if claim.analysis_ids is not None:
+            id_filter = "AND id = ANY(%s::uuid[])"
+            params.append(claim.analysis_ids)
+
+        query = f"""
+            UPDATE conversation_analysis
+            SET claim_expires_at = NOW() + make_interval(secs => %s)
+            WHERE claimed_by = %s
+                AND claim_expires_at > NOW()
+                AND review_status = 'pending_review'
+                {id_filter}
+            RETURNING id, claim_expires_at
+        """
+
+        renewed = execute_query(query, tuple(params), fetch_all=True) or []
+        for row in renewed:
+            conversation_detail.invalidate(row['id'])
+
+        return {"renewed": renewed, "total": len(renewed)}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در تمدید بررسی‌ها: {sanitize_error_message(e)}")
+
+
+@router.post("/claim/release", dependencies=[interactive])
+def release_claims(claim: ClaimUpdate, user: Optional[dict] = session_user):
+    """
+    Release a reviewer's claims back to the pending queue
+    """
+    reviewer_id = _claim_reviewer(claim.reviewer_id, user)
+    try:
+        id_filter = ""
+        params = [reviewer_id]
+
+        if claim.analysis_ids is not None:
+            id_filter = "AND id = ANY(%s::uuid[])"
+            params.append(claim.analysis_ids)
+
+        query = f"""
+            UPDATE conversation_analysis
+            SET claimed_by = NULL,
+                claim_expires_at = NULL
+            WHERE claimed_by = %s
+                {id_filter}
+        """
+
+        released = execute_query(query, tuple(params), fetch_all=False)
+
+        return {"message": "بررسی‌ها آزاد شدند", "released": released}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"خطا در آزادسازی بررسی‌ها: {sanitize_error_message(e)}")
+
+
+@router.get("/completed", dependencies=[analytics])
+def get_completed_reviews(
+    agent_id: Optional[str] = Query(None, description="Filter by agent extension")
+):
+    """
+    Get completed QC reviews
+    """
+    try:
+        where_clause = "ca.review_status = 'review_completed'"
+        params = []
+
+        if agent_id and agent_id != 'all':
+            where_clause += " AND cl.agent_sender = %s"
+            params.append(agent_id)
+
+        query = f"""
+            {conversation_detail.DETAIL_SELECT}
             WHERE {where_clause}
             ORDER BY cl.created_at DESC
         """
 
-        data = execute_query(query, tuple(params) if params else None, fetch_all=True)
-
-        return {"data": data or [], "total": len(data or [])}
+        # Unbounded list with transcripts: stream rows from the cursor
+        return json_rows_response(
+            iter_query(query, tuple(params) if params else None, read_only=False), count_field="total"
+        )
 
     except Exception as e:
 #        print(f"Error fetching completed reviews: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در دریافت بررسی‌های تکمیل شده: {sanitize_error_message(e)}")
 
 
-@router.get("/analysis/{analysis_id}")
-async def get_review_by_analysis_id(analysis_id: str):
+# Must match the index expressions in migrations/add_feedback_search.sql
+HUMAN_FEEDBACK_TEXT = """qc_feedback_text(
+    crh.opening_justification_override, crh.listening_justification_override, crh.empathy_justification_override,
+    crh.response_process_justification_override, crh.system_updation_justification_override,
+    crh.closing_justification_override, crh.strengths_override, crh.areas_for_improvement_override
+)"""
+AI_FEEDBACK_TEXT = """qc_feedback_text(
+    ca.opening_justification, ca.listening_justification, ca.empathy_justification,
+    ca.response_process_justification, ca.system_updation_justification,
+    ca.closing_justification, ca.strengths, ca.areas_for_improvement
+)"""
+
+FEEDBACK_QUERY = "websearch_to_tsquery('public.persian', qc_normalize_persian(%s))"
+FEEDBACK_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=3, MinWords=5, MaxWords=20, FragmentDelimiter=" … "'
+
+FEEDBACK_SOURCES = ('human', 'ai')
+
+
+def _feedback_matches(text: str, fuzzy: bool, sources, filter_clauses: List[str], filter_params: List,
+                      reviewer_id: Optional[str], with_details: bool):
+    """UNION ALL of the matching human reviews and/or AI analyses, with its params"""
+    parts = []
+    params = []
+    for source in sources:
+        source_clauses = list(filter_clauses)
+        source_params = list(filter_params)
+        feedback_text = HUMAN_FEEDBACK_TEXT if source == 'human' else AI_FEEDBACK_TEXT
+        document = f"to_tsvector('public.persian'::regconfig, {feedback_text})"
+
+        match = f"{document} @@ {FEEDBACK_QUERY}"
+        match_params = [text]
+        if fuzzy:
+            # Trigram word similarity: finds misspelled / differently written words
+            match = f"({match} OR qc_normalize_persian(%s) <%% {feedback_text})"
+            match_params.append(text)
+
+        if source == 'human':
+            from_sql = """
+                FROM conversation_review_human crh
+                INNER JOIN conversation_analysis ca ON ca.id = crh.analysis_id
+                INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+                LEFT JOIN qc_users qu ON crh.reviewer_id = qu.id
+            """
+            reviewer_columns = "crh.reviewer_id, qu.full_name as reviewer_full_name"
+            if reviewer_id:
+                source_clauses.append("crh.reviewer_id = %s")
+                source_params.append(reviewer_id)
+        else:
+            from_sql = """
+                FROM conversation_analysis ca
+                INNER JOIN conversations_log cl ON ca.conversation_id = cl.id
+            """
+            reviewer_columns = "NULL::uuid as reviewer_id, NULL::text as reviewer_full_name"
+
+        columns = f"'{source}' as source, cl.agent_sender"
+        select_params = []
+        if with_details:
+            rank = f"ts_rank({document}, {FEEDBACK_QUERY})"
+            select_params.append(text)
+            if fuzzy:
+                rank = f"{rank} + word_similarity(qc_normalize_persian(%s), {feedback_text})"
+                select_params.append(text)
+            columns += f"""
+                , ca.id as analysis_id, ca.review_status, cl.unique_id, ca.created_at, {reviewer_columns},
+                {feedback_text} as feedback_text, {rank} as rank
+            """
+
+        parts.append(f"""
+            SELECT {columns}
+            {from_sql}
+            WHERE {" AND ".join([match, *source_clauses])}
+        """)
+        params.extend([*select_params, *match_params, *source_params])
+
+    return " UNION ALL ".join(parts), params
+
+
+@router.get("/feedback/search", dependencies=[analytics])
+def search_feedback(
+    q: str = Query(..., min_length=2, max_length=200, description="Words or \"exact phrase\"; -word excludes, or combines"),
+    source: str = Query('all', description="human, ai or all"),
+    fuzzy: bool = Query(False, description="Also match misspelled words (trigram similarity)"),
+    agent_id: Optional[str] = Query(None, description="Filter by agent extension"),
+    reviewer_id: Optional[str] = Query(None, description="Filter by reviewer (human reviews only)"),
+    date_range: Optional[str] = Query(None, description="today, yesterday, last7days, last30days, custom"),
+    start_date: Optional[str] = Query(None, description="Start date for custom range (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date for custom range (YYYY-MM-DD)"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200)
+):
+    """
+    Search reviewer feedback (justification overrides, strengths, areas for
+    improvement) and/or the AI justifications
+
+    Returns the matching reviews, best match first, with highlighted fragments,
+    plus match counts per agent over all matches (not only the page).
+    """
+    try:
+        text = q.strip()
+        if not text:
+            raise HTTPException(status_code=400, detail="عبارت جستجو خالی است")
+        if source not in ('all', *FEEDBACK_SOURCES):
+            raise HTTPException(status_code=400, detail=f"منبع نامعتبر: {source}")
+
+        sources = FEEDBACK_SOURCES if source == 'all' else (source,)
+        if reviewer_id:
+            # AI analyses have no reviewer
+            sources = tuple(s for s in sources if s == 'human')
+            if not sources:
+                raise HTTPException(status_code=400, detail="فیلتر بررسی‌کننده فقط برای بررسی‌های انسانی معتبر است")
+
+        filter_clauses = []
+        filter_params = []
+        if agent_id and agent_id != 'all':
+            filter_clauses.append("cl.agent_sender = %s")
+            filter_params.append(agent_id)
+        window = resolve_window(date_range, start_date, end_date)
+        if window:
+            clause, window_params = window.timestamp_filter("ca.created_at")
+            filter_clauses.append(clause)
+            filter_params.extend(window_params)
+
+        counts_sql, counts_params = _feedback_matches(text, fuzzy, sources, filter_clauses, filter_params,
+                                                      reviewer_id, with_details=False)
+        counts_query = f"""
+            SELECT agent_sender,
+                COUNT(*) as total,
+                COUNT(*) FILTER (WHERE source = 'human') as human,
+                COUNT(*) FILTER (WHERE source = 'ai') as ai
+            FROM ({counts_sql}) m
+            GROUP BY agent_sender
+            ORDER BY total DESC, agent_sender
+        """
+        agents = execute_query(counts_query, tuple(counts_params), fetch_all=True, read_only=True) or []
+        total = sum(agent['total'] for agent in agents)
+
+        data = []
+        if total > (page - 1) * page_size:
+            page_sql, page_params = _feedback_matches(text, fuzzy, sources, filter_clauses, filter_params,
+                                                      reviewer_id, with_details=True)
+            # Fragments are built for the page rows only
+            page_query = f"""
+                WITH hits AS (
+                    {page_sql}
+                    ORDER BY rank DESC, created_at DESC, analysis_id, source
+                    LIMIT %s OFFSET %s
+                )
+                SELECT source, analysis_id, agent_sender, unique_id, review_status, created_at,
+                    reviewer_id, reviewer_full_name, rank,
+                    ts_headline('public.persian', feedback_text, {FEEDBACK_QUERY}, %s) as headline
+                FROM hits
+                ORDER BY rank DESC, created_at DESC, analysis_id, source
+            """
+            page_params.extend([page_size, (page - 1) * page_size, text, FEEDBACK_HEADLINE_OPTIONS])
+            data = execute_query(page_query, tuple(page_params), fetch_all=True, read_only=True) or []
+
+        return {
+            "data": data,
+            "agents": agents,
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+#        print(f"Error searching feedback: {e}")
+        raise HTTPException(status_code=500, detail=f"خطا در جستجوی بازخوردها: {sanitize_error_message(e)}")
+
+
+@router.get("/analysis/{analysis_id}", dependencies=[interactive])
+def get_review_by_analysis_id(analysis_id: str):
     """
     Get existing human review for an analysis
     """
@@ -172,8 +504,8 @@ async def get_review_by_analysis_id(analysis_id: str):
         raise HTTPException(status_code=500, detail=f"خطا در دریافت بررسی: {sanitize_error_message(e)}")
 
 
-@router.post("/submit")
-async def submit_review(review: ReviewSubmission):
+@router.post("/submit", dependencies=[interactive])
+def submit_review(review: ReviewSubmission):
     """
     Submit or update a human QC review
     """
@@ -234,34 +566,19 @@ async def submit_review(review: ReviewSubmission):
 
         else:
             # INSERT new review - must get weights_snapshot from original analysis
-            import sys
-            sys.stdout.write(f"[DEBUG] Starting INSERT path for analysis_id: {review.analysis_id}\n")
-            sys.stdout.flush()
-
             analysis_query = "SELECT weights_snapshot FROM conversation_analysis WHERE id = %s"
-            sys.stdout.write(f"[DEBUG] About to execute analysis_query\n")
-            sys.stdout.flush()
             analysis_data = execute_query(analysis_query, (review.analysis_id,), fetch_one=True)
-            sys.stdout.write(f"[DEBUG] Executed analysis_query successfully\n")
-            sys.stdout.flush()
 
             if not analysis_data or not analysis_data.get('weights_snapshot'):
                 raise HTTPException(status_code=404, detail="تحلیل یافت نشد یا weights_snapshot موجود نیست")
 
             weights_snapshot = analysis_data['weights_snapshot']
-            sys.stdout.write(f"[DEBUG] weights_snapshot type: {type(weights_snapshot)}\n")
-            sys.stdout.write(f"[DEBUG] weights_snapshot value: {weights_snapshot}\n")
-            sys.stdout.flush()
 
             # Get max score per metric from settings
             max_score_query = """
                 SELECT setting_value FROM qc_settings WHERE setting_key = 'max_score_per_metric'
             """
-            sys.stdout.write(f"[DEBUG] About to execute max_score_query\n")
-            sys.stdout.flush()
             max_score_result = execute_query(max_score_query, fetch_one=True)
-            sys.stdout.write(f"[DEBUG] Executed max_score_query successfully\n")
-            sys.stdout.flush()
             max_score_per_metric = max_score_result['setting_value'] if max_score_result else 4
 
             # Calculate max_possible_overall_score (ALL 6 criteria)
@@ -275,9 +592,6 @@ async def submit_review(review: ReviewSubmission):
                 weights.get('closing', 4)
             )
 
-            # Use psycopg2 Json adapter for JSONB field
-            print(f"[DEBUG] weights_snapshot before Json(): {weights_snapshot}")
-
             insert_query = """
                 INSERT INTO conversation_review_human (
                     analysis_id,
@@ -330,10 +644,12 @@ async def submit_review(review: ReviewSubmission):
                 max_possible_overall_score
             ), fetch_all=False)
 
-        # Update analysis status to completed
+        # Update analysis status to completed and drop any work-queue claim
         status_update = """
             UPDATE conversation_analysis
-            SET review_status = 'completed'
+            SET review_status = 'completed',
+                claimed_by = NULL,
+                claim_expires_at = NULL
             WHERE id = %s
         """
         execute_query(status_update, (review.analysis_id,), fetch_all=False)
@@ -355,10 +671,8 @@ async def submit_review(review: ReviewSubmission):
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        import sys
-        error_traceback = traceback.format_exc()
-        sys.stderr.write(f"[ERROR] Full traceback:\n{error_traceback}\n")
-        sys.stderr.flush()
-#        print(f"Error submitting review: {e}")
+        logger.exception(f"Error submitting review {review.analysis_id}: {e}")
         raise HTTPException(status_code=500, detail=f"خطا در ثبت بررسی: {sanitize_error_message(e)}")
+    finally:
+        # Each statement commits on its own, so drop the cached row even after a partial write
+        conversation_detail.invalidate(review.analysis_id)
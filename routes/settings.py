@@ -2,9 +2,10 @@ from fastapi import APIRouter, HTTPException, Body
 from pydantic import BaseModel
 from typing import Dict
 from database import execute_query
+from admission import interactive
 from utils import sanitize_error_message
 
-router = APIRouter(prefix="/settings", tags=["QC Settings"])
+router = APIRouter(prefix="/settings", tags=["QC Settings"], dependencies=[interactive])
 
 
 class WeightsUpdate(BaseModel):
@@ -18,7 +19,7 @@ class WeightsUpdate(BaseModel):
 
 
 @router.get("/weights")
-async def get_current_weights():
+def get_current_weights():
     """
     Get current QC weights from qc_settings
     """
@@ -59,7 +60,7 @@ async def get_current_weights():
 
 
 @router.put("/weights")
-async def update_weights(weights: WeightsUpdate):
+def update_weights(weights: WeightsUpdate):
     """
     Update QC weights (Admin only)
     """
@@ -95,7 +96,7 @@ async def update_weights(weights: WeightsUpdate):
 
 
 @router.get("/max-score")
-async def get_max_score():
+def get_max_score():
     """
     Get max score per metric from qc_settings
     """
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional, List
 from database import execute_query
+from admission import interactive
+from passwords import hash_password
+from security import active_users
 from utils import sanitize_error_message
 
-router = APIRouter(prefix="/users", tags=["User Management"])
+router = APIRouter(prefix="/users", tags=["User Management"], dependencies=[interactive])
 
 
 class UserCreate(BaseModel):
@@ -34,7 +38,7 @@ class UserResponse(BaseModel):
 
 
 @router.get("/", response_model=List[UserResponse])
-async def get_all_users():
+def get_all_users():
     """Get all users"""
     try:
         query = """
@@ -51,48 +55,30 @@ async def get_all_users():
 
 @router.post("/", status_code=201)
 async def create_user(user: UserCreate):
-    """Create a new user with bcrypt hashed password"""
+    """Create a new user with bcrypt hashed password (hashed on the password pool)"""
+    password_hash = await hash_password(user.password)
     try:
-        # Try using RPC function first
-        query = "SELECT create_qc_user(%s, %s, %s, %s)"
-        execute_query(
+        query = """
+            INSERT INTO qc_users (username, password_hash, full_name, role, is_active)
+            VALUES (%s, %s, %s, %s, true)
+        """
+        await run_in_threadpool(
+            execute_query,
             query,
-            (user.full_name, user.password, user.role, user.username),
+            (user.username, password_hash, user.full_name, user.role),
             fetch_all=False
         )
         return {"message": "کاربر با موفقیت ایجاد شد"}
 
     except Exception as e:
-        error_msg = str(e)
-
         # Check for duplicate username
-        if 'duplicate key' in error_msg or 'already exists' in error_msg:
+        if 'duplicate key' in str(e) or 'already exists' in str(e):
             raise HTTPException(status_code=400, detail="نام کاربری تکراری است")
-
-        # If function doesn't exist, use direct insert (fallback)
-        if 'does not exist' in error_msg or 'function' in error_msg.lower():
-            try:
-                query = """
-                    INSERT INTO qc_users (username, password_hash, full_name, role, is_active)
-                    VALUES (%s, %s, %s, %s, true)
-                """
-                execute_query(
-                    query,
-                    (user.username, user.password, user.full_name, user.role),
-                    fetch_all=False
-                )
-#                print("[WARNING] User created with plain text password")
-                return {"message": "کاربر ایجاد شد (⚠️ بدون hash)"}
-            except Exception as e2:
-                if 'duplicate key' in str(e2):
-                    raise HTTPException(status_code=400, detail="نام کاربری تکراری است")
-                raise HTTPException(status_code=500, detail=f"خطا در ایجاد کاربر: {str(e2)}")
-
         raise HTTPException(status_code=500, detail="خطا در ایجاد کاربر")
 
 
 @router.put("/{user_id}")
-async def update_user(user_id: str, user_update: UserUpdate):
+def update_user(user_id: str, user_update: UserUpdate):
     """Update user information"""
     try:
         # Build dynamic update query
@@ -118,6 +104,13 @@ async def update_user(user_id: str, user_update: UserUpdate):
         query = f"UPDATE qc_users SET {', '.join(updates)} WHERE id = %s"
 
         execute_query(query, tuple(params), fetch_all=False)
+
+        # Cut off (or restore) this user's tokens without waiting for the next snapshot refresh
+        if user_update.is_active is False:
+            active_users.deactivate(user_id)
+        elif user_update.is_active:
+            active_users.activate(user_id)
+
         return {"message": "کاربر با موفقیت به‌روزرسانی شد"}
 
     except HTTPException:
@@ -129,33 +122,27 @@ async def update_user(user_id: str, user_update: UserUpdate):
 
 @router.put("/{user_id}/password")
 async def change_password(user_id: str, password_data: PasswordChange):
-    """Change user password"""
+    """Change user password (hashed on the password pool)"""
+    password_hash = await hash_password(password_data.new_password)
     try:
-        # Try using RPC function
-        query = "SELECT change_user_password(%s, %s)"
-        execute_query(query, (password_data.new_password, user_id), fetch_all=False)
-        return {"message": "رمز عبور با موفقیت تغییر کرد"}
-
+        query = "UPDATE qc_users SET password_hash = %s WHERE id = %s"
+        updated = await run_in_threadpool(execute_query, query, (password_hash, user_id), fetch_all=False)
     except Exception as e:
-        # Fallback to direct update
-        if 'does not exist' in str(e) or 'function' in str(e).lower():
-            try:
-                query = "UPDATE qc_users SET password_hash = %s WHERE id = %s"
-                execute_query(query, (password_data.new_password, user_id), fetch_all=False)
-#                print("[WARNING] Password stored as plain text")
-                return {"message": "رمز عبور تغییر کرد (⚠️ بدون hash)"}
-            except Exception as e2:
-                raise HTTPException(status_code=500, detail=f"خطا در تغییر رمز: {str(e2)}")
-
+#        print(f"Error changing password: {e}")
         raise HTTPException(status_code=500, detail="خطا در تغییر رمز عبور")
 
+    if not updated:
+        raise HTTPException(status_code=404, detail="کاربر یافت نشد")
+    return {"message": "رمز عبور با موفقیت تغییر کرد"}
+
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: str):
+def delete_user(user_id: str):
     """Delete a user"""
     try:
         query = "DELETE FROM qc_users WHERE id = %s"
         execute_query(query, (user_id,), fetch_all=False)
+        active_users.deactivate(user_id)
         return {"message": "کاربر با موفقیت حذف شد"}
 
     except Exception as e:
@@ -4,21 +4,23 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from database import get_db_connection
 
-def run_migration():
+DEFAULT_MIGRATION = 'migrations/add_completed_to_review_status.sql'
+
+
+def run_migration(path: str = DEFAULT_MIGRATION):
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
         # Read the migration SQL file
-        with open('migrations/add_completed_to_review_status.sql', 'r') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             migration_sql = f.read()
 
         # Execute the migration
         cursor.execute(migration_sql)
         conn.commit()
 
-        print("[SUCCESS] Migration completed successfully!")
-        print("[SUCCESS] 'completed' has been added to analysis_review_status enum")
+        print(f"[SUCCESS] Migration completed successfully: {path}")
 
     except Exception as e:
         conn.rollback()
@@ -29,4 +31,6 @@ def run_migration():
         conn.close()
 
 if __name__ == "__main__":
-    run_migration()
+    # Usage: python run_migration.py [migrations/<file>.sql ...]
+    for migration_path in sys.argv[1:] or [DEFAULT_MIGRATION]:
+        run_migration(migration_path)
@@ -0,0 +1,164 @@
+"""
+JWT sessions for the QC panel
+
+Login issues an HS256 token (settings.JWT_*). Requests are authenticated
+locally: a verified token's claims are kept in a small LRU keyed by the raw
+token, so repeat requests skip signature verification too, and the only
+per-request check is membership in an in-memory snapshot of active user IDs.
+
+The snapshot (SELECT id FROM qc_users WHERE is_active) is refreshed at most
+every JWT_REVOCATION_REFRESH_SECONDS by whichever request notices it is stale;
+other requests keep using the previous snapshot meanwhile. A token is accepted
+if its user is in the snapshot or it was issued after the snapshot was taken
+(new users), so deactivated and deleted users are cut off within one refresh
+interval. Changes made through /users in this process apply immediately.
+"""
+import logging
+import threading
+import time
+import uuid
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from cache import TTLCache
+from config import get_settings
+from database import execute_query
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_bearer = HTTPBearer(auto_error=False)
+
+# token -> claims; entries never outlive the token (ttl is capped at exp on insert)
+_verified_tokens = TTLCache(maxsize=settings.JWT_VERIFIED_CACHE_SIZE, ttl=settings.JWT_EXPIRE_MINUTES * 60)
+
+
+class _ActiveUsers:
+    """Periodically refreshed snapshot of active user IDs"""
+
+    def __init__(self):
+        self.ids = None
+        self.taken_at = 0.0
+        # Deactivated through this process since the snapshot: user_id -> time
+        self._revoked = {}
+        self._refresh_lock = threading.Lock()
+
+    def _refresh(self):
+        started = time.time()
+        rows = execute_query("SELECT id::text FROM qc_users WHERE is_active", fetch_all=True, row_type='tuple') or []
+        self.ids = frozenset(row[0] for row in rows)
+        self.taken_at = started
+        # Older local revocations are reflected in the new snapshot
+        self._revoked = {user_id: at for user_id, at in self._revoked.items() if at >= started}
+
+    def ensure_fresh(self):
+        if self.ids is not None and time.time() - self.taken_at < settings.JWT_REVOCATION_REFRESH_SECONDS:
+            return
+        # Only one request refreshes; the others keep the previous snapshot (first load waits)
+        if not self._refresh_lock.acquire(blocking=self.ids is None):
+            return
+        try:
+            self._refresh()
+        except Exception as e:
+            logger.warning(f"Active user refresh failed, keeping previous snapshot: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def allows(self, user_id: str, issued_at: float) -> bool:
+        self.ensure_fresh()
+        if user_id in self._revoked:
+            return False
+        if self.ids is None:
+            # Never loaded (database down): signature and expiry still apply
+            return True
+        # iat has one-second resolution
+        return user_id in self.ids or issued_at >= int(self.taken_at)
+
+    def deactivate(self, user_id: str):
+        self._revoked = {**self._revoked, user_id: time.time()}
+
+    def activate(self, user_id: str):
+        self._revoked = {k: v for k, v in self._revoked.items() if k != user_id}
+        if self.ids is not None:
+            self.ids = self.ids | {user_id}
+
+
+active_users = _ActiveUsers()
+
+
+def create_access_token(user: dict) -> dict:
+    """Signed token for a qc_users row; returns token, type and expiry (unix seconds)"""
+    from jose import jwt
+
+    issued_at = int(time.time())
+    expires_at = issued_at + settings.JWT_EXPIRE_MINUTES * 60
+    claims = {
+        "sub": str(user['id']),
+        "username": user['username'],
+        "full_name": user.get('full_name'),
+        "role": user['role'],
+        "iat": issued_at,
+        "exp": expires_at,
+        "jti": uuid.uuid4().hex,
+    }
+    token = jwt.encode(claims, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+    return {"access_token": token, "token_type": "bearer", "expires_at": expires_at}
+
+
+def verify_token(token: str) -> dict:
+    """Claims of a valid, unexpired, unrevoked token; raises 401 otherwise"""
+    claims = _verified_tokens.get(token)
+    if claims is None:
+        # jose (and cryptography) load on first use, not at startup
+        from jose import JWTError, jwt
+
+        try:
+            claims = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="توکن نامعتبر یا منقضی شده است",
+                                headers={"WWW-Authenticate": "Bearer"})
+        _verified_tokens.set(token, claims, ttl=max(0, claims['exp'] - time.time()))
+    elif claims['exp'] <= time.time():
+        _verified_tokens.invalidate(token)
+        raise HTTPException(status_code=401, detail="توکن نامعتبر یا منقضی شده است",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+    if not active_users.allows(claims['sub'], claims['iat']):
+        raise HTTPException(status_code=401, detail="حساب کاربری غیرفعال است",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+
+def _current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> dict:
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="احراز هویت لازم است",
+                            headers={"WWW-Authenticate": "Bearer"})
+    claims = verify_token(credentials.credentials)
+    return {
+        "id": claims['sub'],
+        "username": claims['username'],
+        "full_name": claims.get('full_name'),
+        "role": claims['role'],
+    }
+
+
+def _session_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(_bearer)) -> Optional[dict]:
+    # Routes that act as the caller: the token's user with AUTH_REQUIRED, else None
+    if not settings.AUTH_REQUIRED:
+        return None
+    return _current_user(credentials)
+
+
+def _admin_user(user: dict = Depends(_current_user)) -> dict:
+    if user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="دسترسی فقط برای مدیر مجاز است")
+    return user
+
+
+# Route parameter (`user: dict = current_user`) or router-level (`dependencies=[current_user]`)
+current_user = Depends(_current_user)
+admin_user = Depends(_admin_user)
+session_user = Depends(_session_user)
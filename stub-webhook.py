@@ -0,0 +1,62 @@
+"""
+Local stub for the n8n analysis webhook
+
+Run it and point the dispatcher at it to exercise batch analysis without n8n:
+
+    python stub-webhook.py --port 9000 --latency 0.2 --failure-rate 0.1
+    ANALYSIS_WEBHOOK_URL=http://localhost:9000/webhook/analysis python main.py
+
+Every request is logged with a running count; duplicate unique_ids are flagged
+so idempotency problems show up immediately.
+"""
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+seen = Counter()
+lock = threading.Lock()
+
+
+def make_handler(latency: float, failure_rate: float):
+    class StubHandler(BaseHTTPRequestHandler):
+        def _handle(self):
+            unique_id = parse_qs(urlparse(self.path).query).get('unique_id', [''])[0]
+            time.sleep(latency)
+
+            with lock:
+                seen[unique_id] += 1
+                count = seen[unique_id]
+                total = sum(seen.values())
+
+            status = 503 if random.random() < failure_rate else 200
+            duplicate = " DUPLICATE" if count > 1 and status == 200 else ""
+            print(f"[{total}] {self.command} unique_id={unique_id} -> {status}{duplicate}")
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b'{"ok": true}' if status == 200 else b'{"ok": false}')
+
+        do_GET = _handle
+        do_POST = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub n8n analysis webhook")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), make_handler(args.latency, args.failure_rate))
+    print(f"Stub webhook listening on http://localhost:{args.port}/webhook/analysis")
+    server.serve_forever()
@@ -2,7 +2,12 @@
 Safe print utility for Windows console
 Handles encoding issues with emojis and special characters
 """
+import json
 import sys
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
 
 def safe_print(*args, **kwargs):
@@ -31,3 +36,58 @@ def sanitize_error_message(error: Exception) -> str:
     except:
         # If that fails, return a generic message
         return "Database error occurred"
+
+
+def jsonable_bytes(value) -> bytes:
+    """value as FastAPI's default JSONResponse would send it (Decimal as float, isoformat datetimes)"""
+    return json.dumps(
+        jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def json_rows_response(
+    rows: Iterator[dict],
+    count_field: Optional[str] = None,
+    encode: Callable[[Any], bytes] = jsonable_bytes,
+    **fields
+) -> StreamingResponse:
+    """
+    Stream {"data": [...rows], **fields}, encoding each row as it is read
+
+    For large lists fed by database.iter_query. The first row is read here, so a
+    failing query still raises inside the route; the rest are read and sent while
+    the response body is written, and rows (with its connection) is closed when
+    the body ends. encode defaults to the encoding of routes without a
+    response_model; routes with one pass pydantic_core.to_json, which matches the
+    validated output (Decimal as string, UTC datetimes with Z). count_field, if
+    given, is set to the number of rows; fields follow the data array.
+    """
+    try:
+        first = next(rows, None)
+    except Exception:
+        _close(rows)
+        raise
+
+    def body():
+        try:
+            yield b'{"data":['
+            count = 0
+            if first is not None:
+                yield encode(first)
+                count = 1
+                for row in rows:
+                    yield b',' + encode(row)
+                    count += 1
+            if count_field:
+                fields[count_field] = count
+            yield b']' + (b',' + encode(fields)[1:-1] if fields else b'') + b'}'
+        finally:
+            _close(rows)
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+def _close(rows):
+    close = getattr(rows, 'close', None)
+    if close:
+        close()